@@ -14,6 +14,7 @@ PLUGINS_CONFIG = {
         "dynamic_update_enable": True,
         "dynamic_update_interval": 5,
         "nb_endpoints_url": "http://netbox.local:8000/api/plugins/endpoints_plugin/get-data",
+        "nb_endpoints_stream_url": "http://netbox.local:8000/api/plugins/endpoints_plugin/stream",
         "alerts_device_base_url": "https://someurl.com/alerts?filter=(value=replace_to_name)",
         "interface_bw_base_url": "https://some_monitoring.com?device=device_name&inteface=interface_name)",
     },
@@ -1,74 +1,197 @@
 import json
 import logging
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse, parse_qs
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from service_core.server import (
+    EncodedDocument, ServiceRequestHandler, get_device_filter, tail_file,
+)
+from service_core.server import run_server as run_service
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Alert events are read from lines appended to this file (JSON per line).
+# Events can also be pushed with POST requests.
+ALERTS_FILE = os.environ.get("ALERTS_FILE", "")
+ALERTS_FILE_INTERVAL = float(os.environ.get("ALERTS_FILE_INTERVAL", 1))
 
-class WebRequestHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        try:
-            query_components = parse_qs(urlparse(self.path).query)
-            device_filter = query_components.get("device", [])
-
-            # Health check endpoint
-            if self.path == "/health":
-                self.send_response(200)
-                self.end_headers()
-                self.wfile.write(b"OK")
-                return
-
-            result = {
-                "core_sw_1": {
-                    "status": "error",
-                    "interfaces": {
-                        "g0/3": "warning"
-                    },
-                },
-                "dist_sw_1": {
-                    "status": "warning",
-                    "interfaces": {},
-                },
-                "edge_ro_1": {
-                    "status": "warning",
-                    "interfaces": {
-                        "g0/1": "error"
-                    },
+# Severities clearing an alert
+CLEARED_SEVERITIES = ("ok", "clear", "cleared", "resolved")
+
+# State reported by '?since=' queries for devices without alerts
+CLEARED_STATE = {"status": "ok", "interfaces": {}}
+
+# Alert events seeded for the demo topology
+SAMPLE_EVENTS = [
+    {"device": "core_sw_1", "severity": "error"},
+    {"device": "core_sw_1", "interface": "g0/3", "severity": "warning"},
+    {"device": "dist_sw_1", "severity": "warning"},
+    {"device": "edge_ro_1", "severity": "warning"},
+    {"device": "edge_ro_1", "interface": "g0/1", "severity": "error"},
+]
+
+
+class AlertStore:
+    """
+    Current alert state indexed as
+    device -> {"status": severity, "interfaces": {interface: severity}}.
+
+    Every change increments the store revision, and devices are kept
+    ordered by the revision of their last change, so '?since=' queries
+    only visit devices changed after the given revision.
+    Revisions are given to clients as "<epoch>:<revision>" tokens, the epoch
+    of a store being unique per run of the service, so clients polling across
+    a restart are resynced instead of getting changes of another run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.epoch = uuid.uuid4().hex[:12]
+        self.revision = 0
+        self._states = {}
+        # device -> revision of the last change, the most recent last
+        self._changes = OrderedDict()
+        self.document = EncodedDocument()
+
+    @staticmethod
+    def parse_event(event):
+        if not isinstance(event, dict) or not event.get("device") or not event.get("severity"):
+            raise ValueError(f"Invalid alert event: {event}")
+        return event["device"], event.get("interface"), str(event["severity"]).lower()
+
+    def get_token(self, revision):
+        return f"{self.epoch}:{revision}"
+
+    def parse_token(self, token):
+        """Revision of the token, 0 for tokens of another run of the service."""
+        epoch, _, revision = token.rpartition(":")
+        if epoch != self.epoch:
+            return 0
+        return int(revision)
+
+    def apply_events(self, events):
+        """
+        Apply {"device", "interface" (optional), "severity"} events.
+        Returns the store revision token after applying them.
+        """
+        events = [self.parse_event(event) for event in events]
+        with self._lock:
+            changed = {}
+            for device, interface, severity in events:
+                state = changed.get(device) or self._states.get(device) or CLEARED_STATE
+                status, interfaces = state["status"], dict(state["interfaces"])
+                if interface is None:
+                    status = "ok" if severity in CLEARED_SEVERITIES else severity
+                elif severity in CLEARED_SEVERITIES:
+                    interfaces.pop(interface, None)
+                else:
+                    interfaces[interface] = severity
+                changed[device] = {"status": status, "interfaces": interfaces}
+
+            updated, cleared = {}, []
+            for device, state in changed.items():
+                if state == self._states.get(device, CLEARED_STATE):
+                    continue
+                self.revision += 1
+                self._changes[device] = self.revision
+                self._changes.move_to_end(device)
+                if state == CLEARED_STATE:
+                    self._states.pop(device, None)
+                    cleared.append(device)
+                else:
+                    self._states[device] = updated[device] = state
+            self.document.set_many(updated)
+            if cleared:
+                self.document.remove_many(cleared)
+            return self.get_token(self.revision)
+
+    def get_changes(self, since, devices=None):
+        """
+        Current state of devices changed after the since revision token,
+        cleared devices are reported with the "ok" status.
+        Returns {"revision": token, "full": bool, "devices": {device: state}},
+        with full set when every alerted device is listed, so clients
+        drop the alerts of devices missing from it.
+        Raises ValueError if the token is invalid.
+        """
+        since = self.parse_token(since)
+        with self._lock:
+            if since > self.revision:
+                # Not a revision of this store, resync with the full state
+                since = 0
+            changed = []
+            for device, revision in reversed(self._changes.items()):
+                if revision <= since:
+                    break
+                changed.append(device)
+            if devices is not None:
+                devices = set(devices)
+                changed = [device for device in changed if device in devices]
+            return {
+                "revision": self.get_token(self.revision),
+                "full": since == 0,
+                "devices": {
+                    device: self._states.get(device, CLEARED_STATE) for device in reversed(changed)
                 },
             }
 
-            if device_filter:
-                device_filter = device_filter[0].split(",")
-                result = {k: v for k, v in result.items() if k in device_filter}
 
-            response_json = json.dumps(result)
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Content-Length", str(len(response_json)))
-            self.end_headers()
-            self.wfile.write(response_json.encode("utf-8"))
+store = AlertStore()
+
 
-            logging.info(f"Responded to request: {self.path}")
+def load_lines(lines):
+    events = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logging.warning(f"Skipping invalid alert event line: '{line}'")
+    if events:
+        store.apply_events(events)
 
-        except Exception as e:
-            logging.error(f"Error handling request: {e}")
-            self.send_response(500)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Internal Server Error"}).encode("utf-8"))
 
-    def log_message(self, format, *args):
-        """Disable default access logs (useful for clean Docker logs)."""
-        return
+class WebRequestHandler(ServiceRequestHandler):
+    def handle_get(self, path, query_components):
+        """
+        GET / returns the alert state of all or the requested devices,
+        GET /?since=<revision> the devices changed after a revision (see AlertStore.get_changes).
+        Polling clients start with since=0 and pass the revision of the previous response.
+        """
+        devices = get_device_filter(query_components)
+        since = query_components.get("since", [None])[0]
+        if since is None:
+            # Revision is read before rendering, so clients never skip a change
+            revision = store.get_token(store.revision)
+            self.send_document(store.document, devices, headers={"X-Revision": revision})
+            return
+        try:
+            changes = store.get_changes(since, devices)
+        except ValueError:
+            self.send_json({"error": f"Invalid revision '{since}'"}, status=400)
+            return
+        self.send_json(changes, headers={"X-Revision": changes["revision"]})
+
+    def handle_post(self, path, query_components, body):
+        """Push endpoint: POST / with an alert event or a list of events as JSON."""
+        if path != "/":
+            self.send_json({"error": "Not Found"}, status=404)
+            return
+        events = json.loads(body)
+        revision = store.apply_events(events if isinstance(events, list) else [events])
+        self.send_json({"revision": revision}, headers={"X-Revision": revision})
 
 
 def run_server(host="0.0.0.0", port=8888):
-    server = HTTPServer((host, port), WebRequestHandler)
-    logging.info(f"Starting server on {host}:{port}")
-    server.serve_forever()
+    if ALERTS_FILE:
+        tail_file(ALERTS_FILE, load_lines, ALERTS_FILE_INTERVAL)
+    else:
+        store.apply_events(SAMPLE_EVENTS)
+    run_service(WebRequestHandler, host, port)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+import importlib.util
+import os
+import sys
+import unittest
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+# service_core is mounted next to the service directory in the container
+sys.path.insert(0, os.path.dirname(SERVICE_DIR))
+spec = importlib.util.spec_from_file_location(
+    "elk_alerts_main", os.path.join(SERVICE_DIR, "main.py")
+)
+main = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(main)
+
+
+class AlertStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = main.AlertStore()
+
+    def token(self, revision):
+        return f"{self.store.epoch}:{revision}"
+
+    def test_apply_events(self):
+        revision = self.store.apply_events([
+            {"device": "r1", "severity": "error"},
+            {"device": "r1", "interface": "g0/1", "severity": "Warning"},
+        ])
+        self.assertEqual(revision, self.token(1))
+        self.assertEqual(
+            self.store.get_changes("0")["devices"],
+            {"r1": {"status": "error", "interfaces": {"g0/1": "warning"}}},
+        )
+        with self.assertRaises(ValueError):
+            self.store.apply_events([{"device": "r1"}])
+
+    def test_unchanged_state_keeps_revision(self):
+        self.store.apply_events([{"device": "r1", "severity": "error"}])
+        self.assertEqual(
+            self.store.apply_events([{"device": "r1", "severity": "error"}]), self.token(1)
+        )
+        self.assertEqual(
+            self.store.apply_events([{"device": "r2", "severity": "ok"}]), self.token(1)
+        )
+
+    def test_changes_since(self):
+        first = self.store.apply_events([
+            {"device": "r1", "severity": "error"},
+            {"device": "r2", "severity": "warning"},
+        ])
+        self.store.apply_events([
+            {"device": "r1", "severity": "cleared"},
+            {"device": "r3", "severity": "error"},
+        ])
+        changes = self.store.get_changes(first)
+        self.assertEqual(changes["revision"], self.token(4))
+        self.assertFalse(changes["full"])
+        self.assertEqual(changes["devices"], {
+            "r1": main.CLEARED_STATE,
+            "r3": {"status": "error", "interfaces": {}},
+        })
+        self.assertEqual(self.store.get_changes(first, devices=["r3"])["devices"], {
+            "r3": {"status": "error", "interfaces": {}},
+        })
+        self.assertEqual(self.store.get_changes(self.token(4))["devices"], {})
+
+    def test_unknown_revision_resyncs(self):
+        self.store.apply_events([{"device": "r1", "severity": "error"}])
+        changes = self.store.get_changes(self.token(10))
+        self.assertTrue(changes["full"])
+        self.assertEqual(changes["devices"], {"r1": {"status": "error", "interfaces": {}}})
+
+    def test_restart_resyncs(self):
+        previous = main.AlertStore()
+        previous.apply_events([{"device": "r1", "severity": "error"}])
+        since = previous.apply_events([{"device": "r2", "severity": "error"}])
+        # The restarted service passes the revision of the previous run
+        self.store.apply_events([{"device": "r2", "severity": "error"}])
+        self.store.apply_events([{"device": "r2", "severity": "warning"}])
+        self.store.apply_events([{"device": "r3", "severity": "error"}])
+        changes = self.store.get_changes(since)
+        self.assertTrue(changes["full"])
+        self.assertEqual(set(changes["devices"]), {"r2", "r3"})
+
+    def test_invalid_revision(self):
+        with self.assertRaises(ValueError):
+            self.store.get_changes(self.token("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
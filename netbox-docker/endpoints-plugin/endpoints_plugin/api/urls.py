@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import GetEndpointData
+from .views import GetEndpointData, StreamEndpointData
 
 urlpatterns = [
     path("get-data/", GetEndpointData.as_view(), name="get_data"),
+    path("stream/", StreamEndpointData.as_view(), name="stream"),
 ]
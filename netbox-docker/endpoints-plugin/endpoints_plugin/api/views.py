@@ -1,18 +1,113 @@
 from rest_framework.permissions import DjangoObjectPermissions
+import json
 import requests
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from dcim.models import Device  # Import NetBox's Device model
-from django.conf import settings
-from urllib.parse import urlencode
+from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
+from endpoints_plugin.cache import (
+    MAX_SUBSCRIPTION_DEVICES, SUBSCRIPTION_TIMEOUT, cached_fetch, create_subscription,
+    get_subscription,
+)
+from endpoints_plugin.client import EndpointUnavailable, fetch_many, get_endpoints
+from endpoints_plugin.stream import hub
+from endpoints_plugin.encoding import COMPACT_CONTENT_TYPE, compact_encode
 
 
+def get_error(external_api_url, exc):
+    """
+    Map an upstream request exception to an error message and HTTP status.
+    """
+    if isinstance(exc, EndpointUnavailable):
+        return {"error": str(exc)}, 503
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return {"error": f"Failed to connect to {external_api_url}"}, 502
+    if isinstance(exc, requests.exceptions.Timeout):
+        return {"error": f"Request to {external_api_url} timed out"}, 504
+    return {"error": f"API request failed: {str(exc)}"}, 500
+
+
+def get_endpoint_keys(query_params, available_endpoints):
+    """
+    Return (endpoint_keys, error) of comma-separated endpoints
+    requested with the 'endpoint' parameter.
+    """
+    endpoint_keys = [k.strip() for k in query_params.get("endpoint", "").split(",") if k.strip()]
+    if not endpoint_keys:
+        return [], {
+            "error": "Missing 'endpoint' parameter. Available options: "
+            + ", ".join(available_endpoints.keys())
+        }
+
+    for endpoint_key in endpoint_keys:
+        if endpoint_key not in available_endpoints:
+            return [], {"error": f"Invalid endpoint '{endpoint_key}'"}
+    return endpoint_keys, None
+
+
+def resolve_subscription(query_params):
+    """
+    Replace the 'subscription' parameter with the 'device' list of the subscription
+    (see GetEndpointData.post). Returns an error if the subscription is not known.
+    """
+    subscription_id = query_params.pop("subscription", [None])[0]
+    if subscription_id is None:
+        return None
+    devices = get_subscription(subscription_id)
+    if devices is None:
+        # Unknown or expired, the client has to subscribe again
+        return {"error": f"Unknown subscription '{subscription_id}'"}
+    query_params.setlist("device", [",".join(devices)])
+    return None
+
+
+class CompactJSONRenderer(BaseRenderer):
+    """
+    Compact JSON with interned keys and numeric rates,
+    requested with 'Accept: application/vnd.nextbox.compact+json'.
+    """
+    media_type = COMPACT_CONTENT_TYPE
+    format = "compact"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return compact_encode(data)
+
+
+@method_decorator(gzip_page, name="dispatch")
 class GetEndpointData(APIView):
     """
     API endpoint to fetch data from multiple external APIs, passing all query parameters dynamically.
+    Multiple comma-separated endpoints (e.g. endpoint=alerts,bw) are queried concurrently
+    and returned as a single {endpoint: data} document.
+    Responses are gzip-compressed when accepted by the client.
+
+    Large device lists can be posted once to get a subscription id,
+    passed as 'subscription=<id>' instead of 'device=a,b,...' afterwards.
     """
 
     permission_classes = [DjangoObjectPermissions]  # Enforce NetBox object permissions
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer]
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        # Render here for gzip_page, DRF responses are rendered after the view returns
+        if not getattr(response, "is_rendered", True):
+            response.render()
+        return response
+
+    def get_permissions(self):
+        # Subscribing only stores a list of device names to read
+        if self.request.method == "POST":
+            return [IsAuthenticatedOrLoginNotRequired()]
+        return super().get_permissions()
 
     def get_queryset(self):
         """
@@ -20,43 +115,116 @@ class GetEndpointData(APIView):
         """
         return Device.objects.all()
 
-    def get(self, request, *args, **kwargs):
-        # Ensure user has `view_device` permission
+    def post(self, request, *args, **kwargs):
+        """
+        Subscribe to a device set:
+        {"device": ["a", "b", ...]} returns {"subscription": id, "timeout": seconds}.
+        The subscription expires when not used for the timeout.
+        """
         if not request.user.has_perm("dcim.view_device"):
             return Response({"error": "Permission denied"}, status=403)
 
-        # Get the requested endpoint
-        endpoint_key = request.query_params.get("endpoint", "").strip()
-        if not endpoint_key:
+        devices = request.data.get("device") if isinstance(request.data, dict) else None
+        if not isinstance(devices, list) or not all(isinstance(d, str) for d in devices):
+            return Response({"error": "Expected a list of device names in 'device'"}, status=400)
+        if len(devices) > MAX_SUBSCRIPTION_DEVICES:
             return Response(
-                {"error": "Missing 'endpoint' parameter. Available options: " + ", ".join(settings.PLUGINS_CONFIG.get("endpoints_plugin", {}).keys())},
+                {"error": f"At most {MAX_SUBSCRIPTION_DEVICES} devices can be subscribed"},
                 status=400,
             )
 
-        # Get the external URLs from the plugin settings
-        available_endpoints = settings.PLUGINS_CONFIG.get("endpoints_plugin", {})
-        external_api_url = available_endpoints.get(endpoint_key, "").rstrip("/")
+        return Response(
+            {"subscription": create_subscription(devices), "timeout": SUBSCRIPTION_TIMEOUT},
+            status=201,
+        )
+
+    def get(self, request, *args, **kwargs):
+        # Ensure user has `view_device` permission
+        if not request.user.has_perm("dcim.view_device"):
+            return Response({"error": "Permission denied"}, status=403)
 
-        if not external_api_url:
-            return Response({"error": f"Invalid endpoint '{endpoint_key}'"}, status=400)
+        available_endpoints = get_endpoints()
+
+        # Get the requested endpoint(s)
+        endpoint_keys, error = get_endpoint_keys(request.query_params, available_endpoints)
+        if error:
+            return Response(error, status=400)
 
         # Extract all query parameters except 'endpoint'
         query_params = request.query_params.copy()
         query_params.pop("endpoint", None)  # Remove 'endpoint' key if present
-        query_string = urlencode(query_params, doseq=True)
+        error = resolve_subscription(query_params)
+        if error:
+            return Response(error, status=404)
 
-        # Construct the full API URL with all remaining query parameters
-        full_url = f"{external_api_url}/?{query_string}" if query_string else external_api_url
+        if len(endpoint_keys) > 1:
+            # Combined document, failed upstreams are reported in place of their data
+            endpoints = {k: available_endpoints[k] for k in endpoint_keys}
+            results = fetch_many(cached_fetch, endpoints, query_params)
+            for endpoint_key, result in results.items():
+                if isinstance(result, Exception):
+                    results[endpoint_key], _ = get_error(endpoints[endpoint_key]["url"], result)
+            return Response(results)
 
+        endpoint_key = endpoint_keys[0]
+        endpoint = available_endpoints[endpoint_key]
         try:
             # Fetch JSON from the selected external API
-            response = requests.get(full_url, timeout=10)
-            response.raise_for_status()
-            return Response(response.json())
-
-        except requests.exceptions.ConnectionError:
-            return Response({"error": f"Failed to connect to {external_api_url}"}, status=502)
-        except requests.exceptions.Timeout:
-            return Response({"error": f"Request to {external_api_url} timed out"}, status=504)
-        except requests.exceptions.RequestException as e:
-            return Response({"error": f"API request failed: {str(e)}"}, status=500)
+            return Response(cached_fetch(endpoint_key, endpoint, query_params))
+        except (requests.exceptions.RequestException, EndpointUnavailable) as e:
+            error, status = get_error(endpoint["url"], e)
+            return Response(error, status=status)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets EventSource clients (Accept: text/event-stream) pass content negotiation.
+    Only error responses are rendered, as JSON.
+    """
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode("utf-8")
+
+
+class StreamEndpointData(GetEndpointData):
+    """
+    Server-Sent Events stream of data from one or more comma-separated endpoints.
+    Upstreams are polled once per distinct endpoint and device set on the server
+    for all connected clients. The full state is sent first, then only changed
+    device and interface entries.
+    Streams hold a worker thread each, so they are limited per worker and closed
+    when idle, with a 'close' event telling clients to poll get-data meanwhile.
+    """
+
+    renderer_classes = [EventStreamRenderer, JSONRenderer]
+
+    # Event streams are not compressed, gzip_page would buffer their messages
+    dispatch = APIView.dispatch
+
+    def get(self, request, *args, **kwargs):
+        # Ensure user has `view_device` permission
+        if not request.user.has_perm("dcim.view_device"):
+            return Response({"error": "Permission denied"}, status=403)
+
+        available_endpoints = get_endpoints()
+
+        endpoint_keys, error = get_endpoint_keys(request.query_params, available_endpoints)
+        if error:
+            return Response(error, status=400)
+
+        query_params = request.query_params.copy()
+        query_params.pop("endpoint", None)
+        error = resolve_subscription(query_params)
+        if error:
+            return Response(error, status=404)
+
+        response = StreamingHttpResponse(
+            hub.stream({k: available_endpoints[k] for k in endpoint_keys}, query_params),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Disable proxy buffering of the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
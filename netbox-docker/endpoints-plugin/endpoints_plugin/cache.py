@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlencode
+from django.core.cache import cache
+from endpoints_plugin.client import fetch
+
+
+CACHE_KEY_PREFIX = "endpoints_plugin"
+SUBSCRIPTION_KEY_PREFIX = f"{CACHE_KEY_PREFIX}.subscription"
+
+# Device sets posted by clients are kept for this many seconds since their last use
+SUBSCRIPTION_TIMEOUT = 600
+MAX_SUBSCRIPTION_DEVICES = 100000
+
+# Other workers wait for an in-flight upstream request
+# checking for its result with this interval.
+CACHE_LOCK_POLL_INTERVAL = 0.05
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key within the process
+    into a single call. Waiting callers get the leader's result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+        if not is_leader:
+            return future.result()
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_single_flight = SingleFlight()
+
+
+def get_devices(query_params):
+    """Device names requested as 'device=a,b' and/or repeated 'device' parameters."""
+    devices = []
+    for value in query_params.getlist("device"):
+        devices.extend(d.strip() for d in value.split(",") if d.strip())
+    return list(dict.fromkeys(devices))
+
+
+def create_subscription(devices):
+    """
+    Store a device set and return its id to reference it in later requests.
+    Ids are derived from the set, so equal sets share a single entry.
+    """
+    devices = sorted(set(devices))
+    subscription_id = hashlib.sha1("\n".join(devices).encode("utf-8")).hexdigest()
+    cache.set(f"{SUBSCRIPTION_KEY_PREFIX}.{subscription_id}", devices, timeout=SUBSCRIPTION_TIMEOUT)
+    return subscription_id
+
+
+def get_subscription(subscription_id):
+    """Device names of the subscription, None if it's unknown or expired."""
+    key = f"{SUBSCRIPTION_KEY_PREFIX}.{subscription_id}"
+    devices = cache.get(key)
+    if devices is not None:
+        cache.touch(key, timeout=SUBSCRIPTION_TIMEOUT)
+    return devices
+
+
+def get_cache_key(name, query_params, device=None):
+    params = sorted(
+        (k, sorted(query_params.getlist(k))) for k in query_params.keys() if k != "device"
+    )
+    key_data = f"{name}|{params}|{device}"
+    return f"{CACHE_KEY_PREFIX}.{hashlib.sha1(key_data.encode('utf-8')).hexdigest()}"
+
+
+def get_query_string(query_params, devices=None):
+    query_params = query_params.copy()
+    if devices is not None:
+        query_params.setlist("device", [",".join(devices)])
+    return urlencode(query_params, doseq=True)
+
+
+def _fetch_coalesced(name, endpoint, query_string, coalesce_key, cache_keys):
+    """
+    Fetch from upstream unless another request for the same data is in flight,
+    in this process or in another worker. In the latter case wait for
+    its result to appear in the cache under cache_keys.
+    Returns upstream JSON or None if data has been cached by another worker.
+    """
+    def fetch_once():
+        lock_key = f"{coalesce_key}.lock"
+        if cache.add(lock_key, True, timeout=endpoint["timeout"]):
+            try:
+                return fetch(name, endpoint, query_string)
+            finally:
+                cache.delete(lock_key)
+        deadline = time.monotonic() + endpoint["timeout"]
+        while time.monotonic() < deadline:
+            time.sleep(CACHE_LOCK_POLL_INTERVAL)
+            if len(cache.get_many(cache_keys)) == len(cache_keys):
+                return None
+        return fetch(name, endpoint, query_string)
+
+    return _single_flight.do(coalesce_key, fetch_once)
+
+
+def cached_fetch(name, endpoint, query_params):
+    """
+    Fetch JSON from the endpoint through the shared response cache.
+
+    Device-keyed responses are cached per requested device, so requests
+    with overlapping device lists reuse each other's results and only
+    devices missing in the cache are requested from upstream.
+    Responses to '?since=' queries are changes since a revision rather than
+    device-keyed data, they are cached whole for the requested device list.
+    Identical concurrent requests result in a single upstream call.
+    """
+    timeout = endpoint["cache_timeout"]
+    if not timeout:
+        return fetch(name, endpoint, get_query_string(query_params))
+
+    devices = get_devices(query_params)
+    if not devices or "since" in query_params:
+        cache_key = get_cache_key(name, query_params, ",".join(sorted(devices)) or None)
+        result = cache.get(cache_key)
+        if result is None:
+            result = _fetch_coalesced(
+                name, endpoint, get_query_string(query_params), cache_key, [cache_key]
+            )
+            if result is None:
+                return cache.get(cache_key)
+            cache.set(cache_key, result, timeout=timeout)
+        return result
+
+    device_keys = {device: get_cache_key(name, query_params, device) for device in devices}
+    # Cached values are wrapped to tell devices missing upstream from cache misses
+    cached = cache.get_many(device_keys.values())
+    missing = [device for device, key in device_keys.items() if key not in cached]
+    if missing:
+        missing_keys = [device_keys[device] for device in missing]
+        data = _fetch_coalesced(
+            name, endpoint, get_query_string(query_params, missing),
+            get_cache_key(name, query_params, ",".join(sorted(missing))), missing_keys,
+        )
+        if data is None:
+            cached.update(cache.get_many(missing_keys))
+        elif not isinstance(data, dict):
+            # Response is not keyed by device, nothing to cache per device
+            return data
+        else:
+            fetched = {device_keys[device]: {"data": data.get(device)} for device in missing}
+            cache.set_many(fetched, timeout=timeout)
+            cached.update(fetched)
+
+    result = {}
+    for device, key in device_keys.items():
+        value = cached.get(key)
+        if value is not None and value["data"] is not None:
+            result[device] = value["data"]
+    return result
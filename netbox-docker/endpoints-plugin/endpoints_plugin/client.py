@@ -0,0 +1,214 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+# Defaults for endpoints configured as plain URLs.
+# An endpoint may also be configured as a dict to override them:
+#   "bw": {"url": "http://interface_utilization:7777", "pool_maxsize": 20,
+#          "timeout": 5, "cache_timeout": 10}
+# 'timeout' is the read timeout, connecting is limited by 'connect_timeout'
+DEFAULT_TIMEOUT = 10
+DEFAULT_CONNECT_TIMEOUT = 3
+DEFAULT_POOL_MAXSIZE = 10
+# Upstream responses are cached for this many seconds, 0 disables caching
+DEFAULT_CACHE_TIMEOUT = 5
+# Max number of concurrent requests to the endpoint per worker process
+DEFAULT_MAX_CONCURRENCY = 20
+# Endpoint is not called for 'breaker_reset_timeout' seconds
+# after this many consecutive failures
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_TIMEOUT = 30
+
+# Max number of upstreams queried concurrently by a single multi-endpoint request
+FANOUT_MAX_WORKERS = 8
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_breakers = {}
+_semaphores = {}
+_limits_lock = threading.Lock()
+_executor = ThreadPoolExecutor(
+    max_workers=FANOUT_MAX_WORKERS, thread_name_prefix="endpoints_plugin"
+)
+
+
+def get_endpoints():
+    """
+    Return {endpoint_name: endpoint_config} of the configured upstream APIs.
+    Entries other than URLs and endpoint dicts are plugin options.
+    """
+    endpoints = {}
+    for name, config in settings.PLUGINS_CONFIG.get("endpoints_plugin", {}).items():
+        if isinstance(config, str):
+            config = {"url": config}
+        if not isinstance(config, dict) or not config.get("url"):
+            continue
+        endpoints[name] = {
+            "url": config["url"].rstrip("/"),
+            "timeout": config.get("timeout", DEFAULT_TIMEOUT),
+            "connect_timeout": config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+            "pool_maxsize": config.get("pool_maxsize", DEFAULT_POOL_MAXSIZE),
+            "cache_timeout": config.get("cache_timeout", DEFAULT_CACHE_TIMEOUT),
+            "max_concurrency": config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+            "breaker_threshold": config.get("breaker_threshold", DEFAULT_BREAKER_THRESHOLD),
+            "breaker_reset_timeout": config.get(
+                "breaker_reset_timeout", DEFAULT_BREAKER_RESET_TIMEOUT
+            ),
+        }
+    return endpoints
+
+
+class EndpointUnavailable(Exception):
+    """
+    Raised instead of calling an endpoint when its circuit is open
+    or its concurrency limit is reached.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop calling an endpoint after consecutive failures.
+    Once the reset timeout has passed, a single trial call is let through:
+    its success closes the circuit, a failure keeps it open for another period.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def cancel_trial(self):
+        """Let the next call through as the trial, the allowed one didn't reach the endpoint."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+def get_breaker(name, endpoint):
+    """Return the circuit breaker of the endpoint shared by the worker process."""
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+    with _limits_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                endpoint["breaker_threshold"], endpoint["breaker_reset_timeout"]
+            )
+        return _breakers[name]
+
+
+def check_breaker(name, endpoint):
+    breaker = get_breaker(name, endpoint)
+    if not breaker.allow():
+        raise EndpointUnavailable(
+            f"Endpoint '{name}' is temporarily disabled after repeated failures"
+        )
+    return breaker
+
+
+def get_semaphore(name, endpoint):
+    semaphore = _semaphores.get(name)
+    if semaphore is not None:
+        return semaphore
+    with _limits_lock:
+        if name not in _semaphores:
+            _semaphores[name] = threading.BoundedSemaphore(endpoint["max_concurrency"])
+        return _semaphores[name]
+
+
+def get_session(name, endpoint):
+    """
+    Return a persistent HTTP session of the endpoint.
+    Sessions keep upstream connections alive in a pool
+    shared by all requests of the worker process.
+    """
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        if name not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=endpoint["pool_maxsize"])
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[name] = session
+        return _sessions[name]
+
+
+def fetch(name, endpoint, query_string):
+    """
+    Fetch JSON from the endpoint passing the query string through.
+    Raises requests exceptions on failures, and EndpointUnavailable without waiting
+    when the circuit of the endpoint is open or all of its slots are taken.
+    """
+    url = endpoint["url"]
+    full_url = f"{url}/?{query_string}" if query_string else url
+    breaker = check_breaker(name, endpoint)
+    semaphore = get_semaphore(name, endpoint)
+    if not semaphore.acquire(blocking=False):
+        if breaker.is_open:
+            breaker.cancel_trial()
+        raise EndpointUnavailable(f"Too many concurrent requests to endpoint '{name}'")
+    try:
+        response = get_session(name, endpoint).get(
+            full_url, timeout=(endpoint["connect_timeout"], endpoint["timeout"])
+        )
+    except Exception:
+        # Endpoints responding with an error status do not open the circuit
+        breaker.record_failure()
+        raise
+    finally:
+        semaphore.release()
+    breaker.record_success()
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_many(fetch_func, endpoints, *args):
+    """
+    Call fetch_func(name, endpoint, *args) for multiple endpoints concurrently.
+    Returns {endpoint_name: JSON data or raised exception}.
+    """
+    futures = {
+        name: _executor.submit(fetch_func, name, endpoint, *args)
+        for name, endpoint in endpoints.items()
+    }
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = e
+    return results
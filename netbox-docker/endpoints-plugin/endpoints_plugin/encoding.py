@@ -0,0 +1,49 @@
+import json
+
+
+# Compact JSON: keys are interned into a string table and referenced by index,
+# rates like "3.5 Mbit/s" are sent as numbers of bit/s:
+#   {"strings": ["bw", "core_sw_1", "g0/3", "in", "out"],
+#    "data": {"0": {"1": {"2": {"3": 3500000, "4": 19500000}}}}}
+# The format is shared with the telemetry services (service_core/encoding.py),
+# their test_encoding checks that both encoders produce the same documents.
+COMPACT_CONTENT_TYPE = "application/vnd.nextbox.compact+json"
+
+RATE_UNITS = ("bit/s", "kbit/s", "Mbit/s", "Gbit/s", "Tbit/s")
+
+
+def parse_rate(rate):
+    """Bits per second of a rate formatted like '3.5 Mbit/s', None if it isn't a rate."""
+    value, _, unit = rate.partition(" ")
+    if unit not in RATE_UNITS:
+        return None
+    try:
+        return float(value) * 1000 ** RATE_UNITS.index(unit)
+    except ValueError:
+        return None
+
+
+def compact_encode(data):
+    """Encode a JSON document as compact JSON bytes."""
+    strings, index = [], {}
+
+    def encode(value):
+        if isinstance(value, dict):
+            encoded = {}
+            for key, item in value.items():
+                if key not in index:
+                    index[key] = len(strings)
+                    strings.append(key)
+                encoded[str(index[key])] = encode(item)
+            return encoded
+        if isinstance(value, list):
+            return [encode(item) for item in value]
+        if isinstance(value, str):
+            bps = parse_rate(value)
+            if bps is None:
+                return value
+            return int(bps) if bps.is_integer() else bps
+        return value
+
+    encoded = encode(data)
+    return json.dumps({"strings": strings, "data": encoded}, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,189 @@
+import json
+import logging
+import threading
+import time
+from django.conf import settings
+from endpoints_plugin.cache import cached_fetch, get_devices
+from endpoints_plugin.client import fetch_many
+
+
+logger = logging.getLogger("endpoints_plugin")
+
+PLUGIN_SETTINGS = settings.PLUGINS_CONFIG.get("endpoints_plugin", {})
+
+# Upstreams of a stream channel are polled with this interval (seconds)
+STREAM_POLL_INTERVAL = PLUGIN_SETTINGS.get("stream_interval", 5)
+
+# Streams send a keep-alive comment when idle for this long (seconds).
+# It also lets the server notice disconnected clients.
+STREAM_HEARTBEAT_INTERVAL = 15
+
+# Every open stream holds a thread of the WSGI worker it's served by, so streams
+# per worker process are limited and idle ones are closed. Clients get a 'close'
+# event instead and poll the get-data endpoint until they retry the stream.
+STREAM_MAX_CONNECTIONS = PLUGIN_SETTINGS.get("stream_max_connections", 4)
+# Streams sending no update for this long are closed (seconds)
+STREAM_IDLE_TIMEOUT = PLUGIN_SETTINGS.get("stream_idle_timeout", 120)
+# Closed streams are retried by clients after this long (seconds)
+STREAM_RETRY_AFTER = PLUGIN_SETTINGS.get("stream_retry_after", 60)
+
+
+def get_close_event(reason):
+    """SSE message telling the client the stream is closed and when to retry it."""
+    return f"event: close\ndata: {json.dumps({'reason': reason, 'retry': STREAM_RETRY_AFTER})}\n\n"
+
+
+def get_status_delta(old, new):
+    """
+    Return changes between two {endpoint: {device: data}} documents.
+    Device data is compared one level deep, so only changed entries
+    (e.g. interfaces) of a device are included. Removed devices
+    and entries are set to None.
+    """
+    delta = {}
+    for endpoint, new_devices in new.items():
+        old_devices = old.get(endpoint) or {}
+        new_devices = new_devices or {}
+        endpoint_delta = {}
+        for device in old_devices.keys() - new_devices.keys():
+            endpoint_delta[device] = None
+        for device, new_data in new_devices.items():
+            old_data = old_devices.get(device)
+            if old_data == new_data:
+                continue
+            if isinstance(old_data, dict) and isinstance(new_data, dict):
+                device_delta = {k: None for k in old_data.keys() - new_data.keys()}
+                device_delta.update({k: v for k, v in new_data.items() if old_data.get(k) != v})
+                endpoint_delta[device] = device_delta
+            else:
+                endpoint_delta[device] = new_data
+        if endpoint_delta:
+            delta[endpoint] = endpoint_delta
+    return delta
+
+
+class StatusChannel:
+    """
+    Upstream poll loop for a distinct set of endpoints and devices.
+    A single loop runs for all subscribers of the channel
+    and stops once the last one disconnects.
+    """
+
+    def __init__(self, key, endpoints, query_params):
+        self.key = key
+        self.endpoints = endpoints
+        self.query_params = query_params
+        self.condition = threading.Condition()
+        self.data = {name: {} for name in endpoints}
+        self.revision = 0
+        self.subscribers = 0
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, name="endpoints_plugin_stream", daemon=True).start()
+
+    def run(self):
+        while not self.stopped.is_set():
+            results = fetch_many(cached_fetch, self.endpoints, self.query_params)
+            with self.condition:
+                data = dict(self.data)
+                for name, result in results.items():
+                    if isinstance(result, Exception):
+                        # Keep the last known data of a failed upstream
+                        logger.warning(f"Stream upstream '{name}' failed: {result}")
+                        continue
+                    data[name] = result
+                if data != self.data:
+                    self.data = data
+                    self.revision += 1
+                    self.condition.notify_all()
+            self.stopped.wait(STREAM_POLL_INTERVAL)
+
+    def events(self):
+        """
+        Generate SSE messages for a subscriber: the full state first,
+        then only entries changed since the previously sent state.
+        """
+        sent = {}
+        revision = 0
+        last_update = time.monotonic()
+        yield f"retry: {STREAM_POLL_INTERVAL * 1000}\n\n"
+        while True:
+            if time.monotonic() - last_update >= STREAM_IDLE_TIMEOUT:
+                yield get_close_event("idle")
+                return
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.revision != revision, timeout=STREAM_HEARTBEAT_INTERVAL
+                )
+                data, new_revision = self.data, self.revision
+            if new_revision == revision:
+                yield ": keep-alive\n\n"
+                continue
+            delta = get_status_delta(sent, data)
+            sent, revision = data, new_revision
+            if delta:
+                last_update = time.monotonic()
+                yield f"event: update\ndata: {json.dumps(delta)}\n\n"
+
+
+class StatusHub:
+    """Registry of active stream channels of the worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        # Open streams of the worker process
+        self._connections = 0
+
+    @staticmethod
+    def get_key(endpoints, query_params):
+        params = sorted(
+            (k, sorted(query_params.getlist(k))) for k in query_params.keys() if k != "device"
+        )
+        return tuple(sorted(endpoints)), tuple(sorted(get_devices(query_params))), str(params)
+
+    def subscribe(self, endpoints, query_params):
+        key = self.get_key(endpoints, query_params)
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = StatusChannel(key, endpoints, query_params)
+                self._channels[key] = channel
+                channel.start()
+            channel.subscribers += 1
+        return channel
+
+    def unsubscribe(self, channel):
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers <= 0:
+                channel.stopped.set()
+                self._channels.pop(channel.key, None)
+
+    def stream(self, endpoints, query_params):
+        """
+        SSE messages of the channel for the endpoints and query.
+        Subscribes on the first iteration, so an unsubscribe
+        is guaranteed once the response is closed.
+        Only a 'close' event is sent if the worker has no stream slot left.
+        """
+        with self._lock:
+            busy = self._connections >= STREAM_MAX_CONNECTIONS
+            if not busy:
+                self._connections += 1
+        if busy:
+            yield get_close_event("busy")
+            return
+        try:
+            channel = self.subscribe(endpoints, query_params)
+            try:
+                yield from channel.events()
+            finally:
+                self.unsubscribe(channel)
+        finally:
+            with self._lock:
+                self._connections -= 1
+
+
+hub = StatusHub()
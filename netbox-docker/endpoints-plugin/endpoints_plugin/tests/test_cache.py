@@ -0,0 +1,48 @@
+from unittest import mock
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from endpoints_plugin import cache
+from endpoints_plugin.cache import cached_fetch
+
+
+ENDPOINT = {"url": "http://alerts", "timeout": 10, "cache_timeout": 5}
+
+
+@mock.patch.object(cache, "fetch")
+class CachedFetchTest(SimpleTestCase):
+
+    def setUp(self):
+        response_cache = LocMemCache("endpoints_plugin.tests", {})
+        patcher = mock.patch.object(cache, "cache", response_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(response_cache.clear)
+
+    def test_devices_are_cached_separately(self, fetch):
+        fetch.return_value = {"r1": {"g0/1": "1M"}, "r2": {"g0/1": "2M"}}
+        self.assertEqual(
+            cached_fetch("bw", ENDPOINT, QueryDict("device=r1,r2")), fetch.return_value
+        )
+        self.assertEqual(
+            cached_fetch("bw", ENDPOINT, QueryDict("device=r2")), {"r2": {"g0/1": "2M"}}
+        )
+        fetch.assert_called_once()
+
+    def test_changes_since_revision(self, fetch):
+        changes = {
+            "revision": "e1:7", "full": False,
+            "devices": {"r1": {"status": "error", "interfaces": {}}},
+        }
+        fetch.return_value = changes
+        query = QueryDict("device=r1,r2&since=e1%3A5")
+        self.assertEqual(cached_fetch("alerts", ENDPOINT, query), changes)
+        fetch.assert_called_once_with("alerts", ENDPOINT, "device=r1%2Cr2&since=e1%3A5")
+        # Cached for the same revision and devices only
+        self.assertEqual(
+            cached_fetch("alerts", ENDPOINT, QueryDict("device=r2,r1&since=e1%3A5")), changes
+        )
+        self.assertEqual(fetch.call_count, 1)
+        cached_fetch("alerts", ENDPOINT, QueryDict("device=r1&since=e1%3A5"))
+        cached_fetch("alerts", ENDPOINT, QueryDict("device=r1,r2&since=e1%3A7"))
+        self.assertEqual(fetch.call_count, 3)
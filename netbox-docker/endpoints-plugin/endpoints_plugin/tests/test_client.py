@@ -0,0 +1,51 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from endpoints_plugin import client
+from endpoints_plugin.client import EndpointUnavailable, fetch
+
+
+ENDPOINT = {
+    "url": "http://alerts", "timeout": 10, "connect_timeout": 3, "max_concurrency": 1,
+    "breaker_threshold": 1, "breaker_reset_timeout": 30,
+}
+
+
+@mock.patch.object(client, "get_session")
+class FetchTest(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(client, _breakers={}, _semaphores={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_saturated_endpoint_fails_fast(self, get_session):
+        semaphore = client.get_semaphore("alerts", ENDPOINT)
+        semaphore.acquire()
+        with mock.patch.object(semaphore, "acquire", wraps=semaphore.acquire) as acquire:
+            with self.assertRaises(EndpointUnavailable):
+                fetch("alerts", ENDPOINT, "")
+        acquire.assert_called_once_with(blocking=False)
+        get_session.assert_not_called()
+
+    def test_open_circuit_takes_no_slot(self, get_session):
+        get_session.return_value.get.side_effect = ConnectionError
+        with self.assertRaises(ConnectionError):
+            fetch("alerts", ENDPOINT, "")
+        semaphore = client.get_semaphore("alerts", ENDPOINT)
+        with mock.patch.object(semaphore, "acquire") as acquire:
+            with self.assertRaises(EndpointUnavailable):
+                fetch("alerts", ENDPOINT, "")
+        acquire.assert_not_called()
+        self.assertEqual(get_session.return_value.get.call_count, 1)
+
+    def test_trial_call_is_kept_without_slot(self, get_session):
+        get_session.return_value.get.side_effect = ConnectionError
+        with self.assertRaises(ConnectionError):
+            fetch("alerts", ENDPOINT, "")
+        breaker = client.get_breaker("alerts", ENDPOINT)
+        breaker._opened_at -= ENDPOINT["breaker_reset_timeout"]
+        client.get_semaphore("alerts", ENDPOINT).acquire()
+        with self.assertRaises(EndpointUnavailable):
+            fetch("alerts", ENDPOINT, "")
+        # The trial is left to the next call getting a slot
+        self.assertTrue(breaker.allow())
@@ -0,0 +1,59 @@
+from unittest import mock
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from endpoints_plugin import stream
+from endpoints_plugin.stream import StatusChannel, StatusHub, get_status_delta
+
+
+ENDPOINTS = {"alerts": {"url": "http://alerts"}}
+
+
+class StatusDeltaTest(SimpleTestCase):
+
+    def test_changed_entries_only(self):
+        old = {"bw": {"r1": {"eth0": "1M", "eth1": "2M"}}}
+        new = {"bw": {"r1": {"eth0": "1M", "eth1": "3M"}}}
+        self.assertEqual(get_status_delta(old, new), {"bw": {"r1": {"eth1": "3M"}}})
+
+    def test_removed_devices_and_entries(self):
+        old = {"bw": {"r1": {"eth0": "1M", "eth1": "2M"}, "r2": {"eth0": "1M"}}}
+        new = {"bw": {"r1": {"eth0": "1M"}}}
+        self.assertEqual(get_status_delta(old, new), {"bw": {"r1": {"eth1": None}, "r2": None}})
+
+    def test_unchanged(self):
+        data = {"alerts": {"r1": [{"severity": "critical"}]}}
+        self.assertEqual(get_status_delta(data, data), {})
+
+
+@mock.patch.object(StatusChannel, "start")
+class StatusHubTest(SimpleTestCase):
+
+    def setUp(self):
+        self.hub = StatusHub()
+        self.query = QueryDict("device=r1,r2")
+
+    @mock.patch.object(stream, "STREAM_MAX_CONNECTIONS", 1)
+    def test_streams_over_limit_are_closed(self, start):
+        first = self.hub.stream(ENDPOINTS, self.query)
+        self.assertTrue(next(first).startswith("retry:"))
+
+        second = self.hub.stream(ENDPOINTS, self.query)
+        self.assertIn('"reason": "busy"', next(second))
+        with self.assertRaises(StopIteration):
+            next(second)
+
+        # The slot is released once the first stream is closed
+        first.close()
+        third = self.hub.stream(ENDPOINTS, self.query)
+        self.assertTrue(next(third).startswith("retry:"))
+        third.close()
+        self.assertEqual(self.hub._connections, 0)
+        self.assertEqual(self.hub._channels, {})
+
+    @mock.patch.object(stream, "STREAM_IDLE_TIMEOUT", 0)
+    def test_idle_streams_are_closed(self, start):
+        messages = list(self.hub.stream(ENDPOINTS, self.query))
+        self.assertTrue(messages[0].startswith("retry:"))
+        self.assertIn('"reason": "idle"', messages[-1])
+        self.assertEqual(self.hub._connections, 0)
+        self.assertEqual(self.hub._channels, {})
@@ -1,56 +1,319 @@
 import json
 import logging
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse, parse_qs
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from service_core.rates import format_rate
+from service_core.server import ServiceRequestHandler, get_device_filter
+from service_core.server import run_server as run_service
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Samples are aggregated into buckets of this many seconds,
+# the shortest period min/avg/max can be requested for
+BUCKET_SECONDS = int(os.environ.get("INTERFACE_DATA_BUCKET", 300))
+# Longest period kept per interface (seconds)
+RETENTION_SECONDS = int(os.environ.get("INTERFACE_DATA_RETENTION", 86400))
+SLOTS = max(RETENTION_SECONDS // BUCKET_SECONDS, 1)
+# Values of an interface row, in and out halves
+ROW_SIZE = 2 * SLOTS
+EMPTY_MINS = array("d", [math.inf]) * ROW_SIZE
+EMPTY_MAXS = array("d", [-math.inf]) * ROW_SIZE
+EMPTY_SUMS = array("d", [0.0]) * ROW_SIZE
+EMPTY_COUNTS = array("I", [0]) * SLOTS
 
-class WebRequestHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        try:
-            result = {
-                "core_sw_2": {
-                    "g0/2": {
-                        "in": { "min": "3 Gbit/s", "max": "6 Gbit/s", "avg": "3.5 Gbit/s",},
-                        "out": { "min": "4 Gbit/s", "max": "7 Gbit/s", "avg": "6 Gbit/s",}
-                    }
-                },
-                "dist_sw_1": {
-                    "g0/2": {
-                        "in": { "min": "4 Gbit/s", "max": "7 Gbit/s", "avg": "6 Gbit/s",},
-                        "out": { "min": "3 Gbit/s", "max": "6 Gbit/s", "avg": "3.5 Gbit/s",},
+DEFAULT_PERIOD = "1d"
+PERIOD_RE = re.compile(r"^(\d+)([mhd])$")
+PERIOD_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+DIRECTIONS = ("in", "out")
+
+# Sample rates (bit/s) seeded for the demo topology
+SAMPLE_DATA = {
+    "core_sw_2": {
+        "g0/2": {
+            "in": [3e9, 3e9, 3e9, 3e9, 3e9, 6e9],
+            "out": [4e9, 7e9, 7e9, 6e9, 6e9, 6e9],
+        }
+    },
+    "dist_sw_1": {
+        "g0/2": {
+            "in": [4e9, 7e9, 7e9, 6e9, 6e9, 6e9],
+            "out": [3e9, 3e9, 3e9, 3e9, 3e9, 6e9],
+        }
+    }
+}
+
+
+def parse_period(period):
+    """Period like '30m', '6h' or '1d' in whole buckets."""
+    match = PERIOD_RE.match(period or DEFAULT_PERIOD)
+    if not match:
+        raise ValueError(f"Invalid period '{period}'")
+    seconds = int(match.group(1)) * PERIOD_UNITS[match.group(2)]
+    if not 0 < seconds <= SLOTS * BUCKET_SECONDS:
+        raise ValueError(f"Period '{period}' is out of the kept {SLOTS * BUCKET_SECONDS} seconds")
+    return max(seconds // BUCKET_SECONDS, 1)
+
+
+class InterfaceDataStore:
+    """
+    Ring buffers of per-bucket min/max/sum/count of interface in and out rates,
+    indexed as device -> interface -> row. Rows are kept in flat float64 arrays,
+    in and out halves of SLOTS values each, so the rows of a query are reduced
+    together with NumPy in a single pass. Without NumPy every row is reduced with
+    C-level min()/max()/sum() over its contiguous slices.
+    Aggregates of a row and period are computed once per bucket and reused
+    until the next sample of the row arrives.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {device: {interface: row}}
+        self._rows = {}
+        self._row_count = 0
+        self._mins = array("d")
+        self._maxs = array("d")
+        self._sums = array("d")
+        self._counts = array("I")
+        self._last_buckets = array("q")
+        # {row: {buckets: (now_bucket, aggregates)}}
+        self._rollups = {}
+
+    def get_row(self, device, interface):
+        """Row of the interface, added if it has none yet."""
+        device_rows = self._rows.setdefault(device, {})
+        row = device_rows.get(interface)
+        if row is None:
+            row = device_rows[interface] = self._row_count
+            self._row_count += 1
+            self._mins.extend(EMPTY_MINS)
+            self._maxs.extend(EMPTY_MAXS)
+            self._sums.extend(EMPTY_SUMS)
+            self._counts.extend(EMPTY_COUNTS)
+            self._last_buckets.append(0)
+        return row
+
+    def clear_slot(self, row, slot):
+        self._counts[row * SLOTS + slot] = 0
+        for offset in (0, SLOTS):
+            index = row * ROW_SIZE + offset + slot
+            self._mins[index] = math.inf
+            self._maxs[index] = -math.inf
+            self._sums[index] = 0.0
+
+    def add(self, row, bucket, in_bps, out_bps, is_new=False):
+        """Add a sample to the row, returns False if it's older than the kept period."""
+        last_bucket = self._last_buckets[row]
+        if is_new:
+            self._last_buckets[row] = bucket
+        elif bucket > last_bucket:
+            # Buckets skipped since the last sample have no data
+            for skipped in range(max(last_bucket + 1, bucket - SLOTS + 1), bucket + 1):
+                self.clear_slot(row, skipped % SLOTS)
+            self._last_buckets[row] = bucket
+        elif bucket <= last_bucket - SLOTS:
+            return False
+
+        slot = bucket % SLOTS
+        self._counts[row * SLOTS + slot] += 1
+        for offset, value in ((0, in_bps), (SLOTS, out_bps)):
+            index = row * ROW_SIZE + offset + slot
+            if value < self._mins[index]:
+                self._mins[index] = value
+            if value > self._maxs[index]:
+                self._maxs[index] = value
+            self._sums[index] += value
+        self._rollups.pop(row, None)
+        return True
+
+    def add_samples(self, data, timestamp=None):
+        """
+        Add {device: {interface: {"in": bit/s, "out": bit/s}}} samples taken at timestamp.
+        Returns the number of stored samples.
+        """
+        bucket = int((timestamp or time.time()) // BUCKET_SECONDS)
+        samples = []
+        for device, interfaces in data.items():
+            if not isinstance(interfaces, dict):
+                raise ValueError(f"Invalid interfaces of device '{device}'")
+            for interface, rates in interfaces.items():
+                try:
+                    samples.append((device, interface, float(rates["in"]), float(rates["out"])))
+                except (TypeError, KeyError):
+                    raise ValueError(
+                        f"Invalid sample of interface '{interface}' of device '{device}'"
+                    )
+
+        stored = 0
+        with self._lock:
+            for device, interface, in_bps, out_bps in samples:
+                row_count = self._row_count
+                row = self.get_row(device, interface)
+                stored += self.add(row, bucket, in_bps, out_bps, is_new=row == row_count)
+        return stored
+
+    def reduce_rows(self, rows, now_bucket, buckets):
+        """
+        (count, (in_min, out_min), (in_max, out_max), (in_sum, out_sum)) of every row
+        over the last buckets up to now_bucket, None for rows without samples in the period.
+        """
+        reduced = []
+        for row in rows:
+            last_bucket = self._last_buckets[row]
+            # Number of the latest filled buckets within the period
+            recent = min(buckets - (now_bucket - last_bucket), SLOTS)
+            if recent <= 0:
+                reduced.append(None)
+                continue
+            end = last_bucket % SLOTS + 1
+            start = end - recent
+            ranges = [(start, end)] if start >= 0 else [(start + SLOTS, SLOTS), (0, end)]
+            base = row * SLOTS
+            count = sum(sum(self._counts[base + a:base + b]) for a, b in ranges)
+            if not count:
+                reduced.append(None)
+                continue
+            mins, maxs, sums = [], [], []
+            for offset in (0, SLOTS):
+                base = row * ROW_SIZE + offset
+                slices = [(base + a, base + b) for a, b in ranges]
+                mins.append(min(min(self._mins[a:b]) for a, b in slices))
+                maxs.append(max(max(self._maxs[a:b]) for a, b in slices))
+                sums.append(sum(sum(self._sums[a:b]) for a, b in slices))
+            reduced.append((count, mins, maxs, sums))
+        return reduced
+
+    def reduce_rows_batched(self, rows, now_bucket, buckets):
+        """Same as reduce_rows(), with all rows reduced at once by NumPy."""
+        rows = numpy.array(rows, dtype=numpy.int64)
+        last_buckets = numpy.frombuffer(self._last_buckets, dtype=self._last_buckets.typecode)[rows]
+        recent = numpy.minimum(buckets - (now_bucket - last_buckets), SLOTS)
+        # Slots of the latest filled buckets within the period
+        ages = (last_buckets[:, None] - numpy.arange(SLOTS)) % SLOTS
+        included = ages < recent[:, None]
+        counts = numpy.frombuffer(self._counts, dtype=self._counts.typecode).reshape(-1, SLOTS)
+        counts = (counts[rows] * included).sum(axis=1)
+        included = included[:, None, :]
+        mins = numpy.frombuffer(self._mins).reshape(-1, 2, SLOTS)[rows]
+        maxs = numpy.frombuffer(self._maxs).reshape(-1, 2, SLOTS)[rows]
+        sums = numpy.frombuffer(self._sums).reshape(-1, 2, SLOTS)[rows]
+        mins = numpy.where(included, mins, math.inf).min(axis=2).tolist()
+        maxs = numpy.where(included, maxs, -math.inf).max(axis=2).tolist()
+        sums = numpy.where(included, sums, 0.0).sum(axis=2).tolist()
+        return [
+            (count, mins[i], maxs[i], sums[i]) if count else None
+            for i, count in enumerate(counts.tolist())
+        ]
+
+    def aggregate(self, rows, now_bucket, buckets):
+        """
+        {row: {"in": {"min", "max", "avg"}, "out": {...}}} of the rows over the last buckets
+        up to now_bucket, None for rows without samples in the period.
+        """
+        result = {}
+        pending = []
+        for row in rows:
+            rollup = self._rollups.get(row, {}).get(buckets)
+            if rollup is not None and rollup[0] == now_bucket:
+                result[row] = rollup[1]
+            else:
+                pending.append(row)
+        if not pending:
+            return result
+
+        reduce_rows = self.reduce_rows if numpy is None else self.reduce_rows_batched
+        for row, reduced in zip(pending, reduce_rows(pending, now_bucket, buckets)):
+            aggregates = None
+            if reduced is not None:
+                count, mins, maxs, sums = reduced
+                aggregates = {
+                    direction: {
+                        "min": format_rate(mins[i]),
+                        "max": format_rate(maxs[i]),
+                        "avg": format_rate(sums[i] / count),
                     }
+                    for i, direction in enumerate(DIRECTIONS)
                 }
-            }
+            self._rollups.setdefault(row, {})[buckets] = (now_bucket, aggregates)
+            result[row] = aggregates
+        return result
+
+    def query(self, devices, interfaces, buckets, now=None):
+        """Min/avg/max of the requested devices and interfaces (all if None) over the period."""
+        now_bucket = int((now or time.time()) // BUCKET_SECONDS)
+        selected = []
+        with self._lock:
+            for device in (devices if devices is not None else list(self._rows)):
+                device_rows = self._rows.get(device)
+                if not device_rows:
+                    continue
+                if interfaces is None:
+                    names = list(device_rows)
+                else:
+                    names = [i for i in interfaces if i in device_rows]
+                selected.extend((device, name, device_rows[name]) for name in names)
+            aggregates = self.aggregate([row for _, _, row in selected], now_bucket, buckets)
+        result = {}
+        for device, interface, row in selected:
+            if aggregates[row]:
+                result.setdefault(device, {})[interface] = aggregates[row]
+        return result
+
 
-            response_json = json.dumps(result)
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Content-Length", str(len(response_json)))
-            self.end_headers()
-            self.wfile.write(response_json.encode("utf-8"))
+store = InterfaceDataStore()
 
-            logging.info(f"Responded to request: {self.path}")
 
-        except Exception as e:
-            logging.error(f"Error handling request: {e}")
-            self.send_response(500)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Internal Server Error"}).encode("utf-8"))
+def seed_sample_data():
+    now = time.time()
+    for device, interfaces in SAMPLE_DATA.items():
+        for interface, rates in interfaces.items():
+            for i, (in_bps, out_bps) in enumerate(zip(rates["in"], rates["out"])):
+                store.add_samples(
+                    {device: {interface: {"in": in_bps, "out": out_bps}}}, now - i * 60
+                )
+
+
+class WebRequestHandler(ServiceRequestHandler):
+    def handle_get(self, path, query_components):
+        try:
+            buckets = parse_period(query_components.get("period", [DEFAULT_PERIOD])[0])
+        except ValueError as e:
+            self.send_json({"error": str(e)}, status=400)
+            return
+        interfaces = query_components.get("interface", [])
+        interfaces = [i for i in interfaces[0].split(",") if i] if interfaces else None
+        self.send_json(store.query(get_device_filter(query_components), interfaces, buckets))
 
-    def log_message(self, format, *args):
-        """Disable default access logs (useful for clean Docker logs)."""
-        return
+    def handle_post(self, path, query_components, body):
+        """
+        Push endpoint: POST / with {device: {interface: {"in": bit/s, "out": bit/s}}}
+        samples, taken now or at the '?timestamp=' unix time.
+        """
+        if path != "/":
+            self.send_json({"error": "Not Found"}, status=404)
+            return
+        data = json.loads(body)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object of devices")
+        timestamp = query_components.get("timestamp", [None])[0]
+        stored = store.add_samples(data, float(timestamp) if timestamp else None)
+        self.send_json({"stored": stored})
 
 
 def run_server(host="0.0.0.0", port=6666):
-    server = HTTPServer((host, port), WebRequestHandler)
-    logging.info(f"Starting server on {host}:{port}")
-    server.serve_forever()
+    seed_sample_data()
+    run_service(WebRequestHandler, host, port)
 
 
 if __name__ == "__main__":
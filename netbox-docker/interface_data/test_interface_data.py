@@ -0,0 +1,107 @@
+import importlib.util
+import os
+import sys
+import unittest
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+# service_core is mounted next to the service directory in the container
+sys.path.insert(0, os.path.dirname(SERVICE_DIR))
+spec = importlib.util.spec_from_file_location(
+    "interface_data_main", os.path.join(SERVICE_DIR, "main.py")
+)
+main = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(main)
+
+BUCKET = main.BUCKET_SECONDS
+# Start of a bucket, far from the epoch so ring slots wrap around
+NOW = 10000 * main.SLOTS * BUCKET
+
+
+class InterfaceDataStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = main.InterfaceDataStore()
+
+    def add(self, in_bps, out_bps, timestamp, device="r1", interface="g0/1"):
+        return self.store.add_samples(
+            {device: {interface: {"in": in_bps, "out": out_bps}}}, timestamp
+        )
+
+    def query(self, buckets, devices=None, interfaces=None):
+        return self.store.query(devices, interfaces, buckets, now=NOW)
+
+    def test_min_avg_max(self):
+        self.add(1e6, 4e6, NOW)
+        self.add(3e6, 2e6, NOW - BUCKET)
+        self.assertEqual(self.query(2), {"r1": {"g0/1": {
+            "in": {"min": "1 Mbit/s", "max": "3 Mbit/s", "avg": "2 Mbit/s"},
+            "out": {"min": "2 Mbit/s", "max": "4 Mbit/s", "avg": "3 Mbit/s"},
+        }}})
+        # Older bucket is out of a single bucket period
+        self.assertEqual(self.query(1)["r1"]["g0/1"]["in"]["max"], "1 Mbit/s")
+
+    def test_large_rates_keep_precision(self):
+        rate = 123456789012.0
+        self.add(rate, rate, NOW)
+        aggregates = self.query(1)["r1"]["g0/1"]["in"]
+        self.assertEqual(aggregates["min"], aggregates["avg"])
+        self.assertEqual(aggregates["max"], aggregates["avg"])
+
+    def test_ring_wraps_around(self):
+        for i in range(main.SLOTS + 5):
+            self.add(i, i, NOW - i * BUCKET)
+        # Samples older than the kept period are dropped
+        self.assertEqual(self.add(1, 1, NOW - main.SLOTS * BUCKET), 0)
+        aggregates = self.query(main.SLOTS)["r1"]["g0/1"]["in"]
+        self.assertEqual(aggregates["max"], main.format_rate(main.SLOTS - 1))
+
+    def test_skipped_buckets_are_cleared(self):
+        self.add(5e6, 5e6, NOW - main.SLOTS * BUCKET)
+        self.add(1e6, 1e6, NOW)
+        self.assertEqual(self.query(main.SLOTS)["r1"]["g0/1"]["in"]["max"], "1 Mbit/s")
+
+    def test_rollups_are_refreshed_by_samples(self):
+        self.add(1e6, 1e6, NOW)
+        self.assertEqual(self.query(1)["r1"]["g0/1"]["in"]["max"], "1 Mbit/s")
+        self.add(2e6, 2e6, NOW)
+        self.assertEqual(self.query(1)["r1"]["g0/1"]["in"]["max"], "2 Mbit/s")
+
+    def test_filters(self):
+        self.add(1e6, 1e6, NOW, "r1", "g0/1")
+        self.add(1e6, 1e6, NOW, "r1", "g0/2")
+        self.add(1e6, 1e6, NOW, "r2", "g0/1")
+        self.assertEqual(set(self.query(1, ["r1"])["r1"]), {"g0/1", "g0/2"})
+        self.assertEqual(set(self.query(1, ["r1", "r2"], ["g0/2"])), {"r1"})
+        # No samples within the period
+        self.assertEqual(self.store.query(None, None, 1, now=NOW + 2 * BUCKET), {})
+
+    def test_invalid_samples(self):
+        with self.assertRaises(ValueError):
+            self.store.add_samples({"r1": {"g0/1": {"in": 1}}})
+        with self.assertRaises(ValueError):
+            self.store.add_samples({"r1": []})
+
+    def test_parse_period(self):
+        self.assertEqual(main.parse_period("1d"), 86400 // BUCKET)
+        with self.assertRaises(ValueError):
+            main.parse_period("1w")
+
+
+@unittest.skipIf(main.numpy is None, "NumPy is not installed")
+class BatchedReductionTest(InterfaceDataStoreTest):
+    """Batched reductions match the per-row ones."""
+
+    def query(self, buckets, devices=None, interfaces=None):
+        result = super().query(buckets, devices, interfaces)
+        self.store._rollups.clear()
+        numpy, main.numpy = main.numpy, None
+        try:
+            self.assertEqual(super().query(buckets, devices, interfaces), result)
+        finally:
+            main.numpy = numpy
+        self.store._rollups.clear()
+        return result
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,70 +1,173 @@
 import json
 import logging
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse, parse_qs
+import os
+import threading
+import time
+from service_core.server import (
+    EncodedDocument, ServiceRequestHandler, get_device_filter, watch_file,
+)
+from service_core.server import run_server as run_service
+from service_core.rates import counter_delta, format_rate
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Data file loaded on start and on every change:
+#   *.json - rates as returned by the service, {device: {interface: {"in": rate, "out": rate}}}
+#   other  - SNMP counter dump, "device interface ifHCInOctets ifHCOutOctets [unix_timestamp]" lines
+# Without the file the service serves sample data and data pushed with POST requests.
+UTILIZATION_FILE = os.environ.get("UTILIZATION_FILE", "")
+UTILIZATION_FILE_INTERVAL = float(os.environ.get("UTILIZATION_FILE_INTERVAL", 5))
 
-class WebRequestHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        try:
-            query_components = parse_qs(urlparse(self.path).query)
-            device_filter = query_components.get("device", [])
-
-            # Health check endpoint
-            if self.path == "/health":
-                self.send_response(200)
-                self.end_headers()
-                self.wfile.write(b"OK")
-                return
-
-            result = {
-                "core_sw_1": {
-                    "g0/3": {
-                        "in": "3.5 Mbit/s",
-                        "out": "19.5 Mbit/s",
-                    },
-                },
-                "edge_ro_1": {
-                    "g0/1": {
-                        "in": "1.2 Gbit/s",
-                        "out": "2.2 Gbit/s",
-                    }
-                },
-            }
-
-            if device_filter:
-                device_filter = device_filter[0].split(",")
-                result = {k: v for k, v in result.items() if k in device_filter}
-
-            response_json = json.dumps(result)
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Content-Length", str(len(response_json)))
-            self.end_headers()
-            self.wfile.write(response_json.encode("utf-8"))
-
-            logging.info(f"Responded to request: {self.path}")
-
-        except Exception as e:
-            logging.error(f"Error handling request: {e}")
-            self.send_response(500)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Internal Server Error"}).encode("utf-8"))
-
-    def log_message(self, format, *args):
-        """Disable default access logs (useful for clean Docker logs)."""
-        return
+SAMPLE_DATA = {
+    "core_sw_1": {
+        "g0/3": {
+            "in": "3.5 Mbit/s",
+            "out": "19.5 Mbit/s",
+        },
+    },
+    "edge_ro_1": {
+        "g0/1": {
+            "in": "1.2 Gbit/s",
+            "out": "2.2 Gbit/s",
+        }
+    },
+}
+
+
+def parse_counters(text, default_timestamp=None):
+    """
+    Parse an SNMP counter dump into (device, interface, in_octets, out_octets, timestamp) samples.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    default_timestamp = default_timestamp or time.time()
+    samples = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split()
+        if len(fields) not in (4, 5):
+            raise ValueError(f"Invalid counter sample on line {line_number}: '{line}'")
+        timestamp = float(fields[4]) if len(fields) == 5 else default_timestamp
+        samples.append((fields[0], fields[1], int(fields[2]), int(fields[3]), timestamp))
+    return samples
+
+
+class UtilizationStore:
+    """
+    Latest interface rates indexed as device -> interface -> {"in": rate, "out": rate}.
+    Every device entry is encoded once per change, so lookups
+    cost O(requested devices) regardless of the fleet size.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rates = {}
+        # (device, interface) -> (timestamp, in_octets, out_octets) of the previous counter sample
+        self._counters = {}
+        self.document = EncodedDocument()
+
+    def update_rates(self, data, replace=False):
+        """
+        Merge {device: {interface: {"in": rate, "out": rate}}} into the store.
+        With replace, data is a full snapshot: interfaces of every device are replaced
+        and devices missing from it are removed.
+        Returns the number of changed and removed devices.
+        """
+        for device, interfaces in data.items():
+            if not isinstance(interfaces, dict):
+                raise ValueError(f"Invalid interfaces of device '{device}'")
+        changed = {}
+        with self._lock:
+            for device, interfaces in data.items():
+                current = self._rates.get(device, {})
+                device_rates = dict(interfaces) if replace else {**current, **interfaces}
+                if device_rates != current:
+                    self._rates[device] = device_rates
+                    changed[device] = device_rates
+            removed = [device for device in self._rates if device not in data] if replace else []
+            for device in removed:
+                del self._rates[device]
+            self.document.set_many(changed)
+            if removed:
+                self.document.remove_many(removed)
+        return len(changed) + len(removed)
+
+    def update_counters(self, samples, replace=False):
+        """
+        Convert counter samples to rates using the previous sample of each interface.
+        The first sample of an interface only sets its baseline.
+        With replace, samples are a full snapshot: interfaces missing from it are removed,
+        the sampled ones keep their last rate until they get a new one.
+        """
+        rates = {}
+        with self._lock:
+            for device, interface, in_octets, out_octets, timestamp in samples:
+                previous = self._counters.get((device, interface))
+                self._counters[(device, interface)] = (timestamp, in_octets, out_octets)
+                if previous is None or timestamp <= previous[0]:
+                    if replace:
+                        rates.setdefault(device, {})
+                        current = self._rates.get(device, {}).get(interface)
+                        if current is not None:
+                            rates[device][interface] = current
+                    continue
+                interval = timestamp - previous[0]
+                rates.setdefault(device, {})[interface] = {
+                    "in": format_rate(counter_delta(in_octets, previous[1]) * 8 / interval),
+                    "out": format_rate(counter_delta(out_octets, previous[2]) * 8 / interval),
+                }
+            if replace:
+                sampled = {(device, interface) for device, interface, *_ in samples}
+                self._counters = {key: v for key, v in self._counters.items() if key in sampled}
+        return self.update_rates(rates, replace=replace)
+
+    def load_file(self, path):
+        """Load the data file, a full snapshot replacing the previous one."""
+        with open(path) as f:
+            content = f.read()
+        if path.endswith(".json"):
+            changed = self.update_rates(json.loads(content), replace=True)
+        else:
+            changed = self.update_counters(
+                parse_counters(content, os.path.getmtime(path)), replace=True
+            )
+        logging.info(f"Loaded {path}, {changed} devices changed")
+
+
+store = UtilizationStore()
+
+
+class WebRequestHandler(ServiceRequestHandler):
+    def handle_get(self, path, query_components):
+        self.send_document(store.document, get_device_filter(query_components))
+
+    def handle_post(self, path, query_components, body):
+        """
+        Push endpoint: POST / with rates as JSON,
+        POST /counters with an SNMP counter dump.
+        """
+        if path == "/counters":
+            changed = store.update_counters(parse_counters(body.decode("utf-8")))
+        elif path == "/":
+            data = json.loads(body)
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object of devices")
+            changed = store.update_rates(data)
+        else:
+            self.send_json({"error": "Not Found"}, status=404)
+            return
+        self.send_json({"changed": changed})
 
 
 def run_server(host="0.0.0.0", port=7777):
-    server = HTTPServer((host, port), WebRequestHandler)
-    logging.info(f"Starting server on {host}:{port}")
-    server.serve_forever()
+    if UTILIZATION_FILE:
+        watch_file(UTILIZATION_FILE, store.load_file, UTILIZATION_FILE_INTERVAL)
+    else:
+        store.update_rates(SAMPLE_DATA)
+    run_service(WebRequestHandler, host, port)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+import importlib.util
+import json
+import os
+import sys
+import unittest
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+# service_core is mounted next to the service directory in the container
+sys.path.insert(0, os.path.dirname(SERVICE_DIR))
+spec = importlib.util.spec_from_file_location(
+    "interface_utilization_main", os.path.join(SERVICE_DIR, "main.py")
+)
+main = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(main)
+
+
+def rate(value):
+    return {"in": value, "out": value}
+
+
+class UtilizationStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = main.UtilizationStore()
+
+    def get_document(self, devices=None):
+        return json.loads(self.store.document.render(devices))
+
+    def test_update_merges_interfaces(self):
+        self.store.update_rates({"r1": {"g0/1": rate("1 Mbit/s")}})
+        changed = self.store.update_rates({"r1": {"g0/2": rate("2 Mbit/s")}})
+        self.assertEqual(changed, 1)
+        self.assertEqual(
+            self.get_document(), {"r1": {"g0/1": rate("1 Mbit/s"), "g0/2": rate("2 Mbit/s")}}
+        )
+
+    def test_unchanged_update(self):
+        self.store.update_rates({"r1": {"g0/1": rate("1 Mbit/s")}})
+        self.assertEqual(self.store.update_rates({"r1": {"g0/1": rate("1 Mbit/s")}}), 0)
+
+    def test_replace_removes_interfaces_and_devices(self):
+        self.store.update_rates({
+            "r1": {"g0/1": rate("1 Mbit/s"), "g0/2": rate("2 Mbit/s")},
+            "r2": {"g0/1": rate("3 Mbit/s")},
+        })
+        changed = self.store.update_rates({"r1": {"g0/1": rate("1 Mbit/s")}}, replace=True)
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.get_document(), {"r1": {"g0/1": rate("1 Mbit/s")}})
+        self.assertEqual(self.get_document(["r2"]), {})
+
+    def test_counters(self):
+        self.assertEqual(self.store.update_counters([("r1", "g0/1", 0, 0, 100)]), 0)
+        self.store.update_counters([("r1", "g0/1", 125000, 250000, 101)])
+        self.assertEqual(
+            self.get_document(), {"r1": {"g0/1": {"in": "1 Mbit/s", "out": "2 Mbit/s"}}}
+        )
+
+    def test_counters_snapshot_removes_missing(self):
+        self.store.update_counters(
+            [("r1", "g0/1", 0, 0, 100), ("r2", "g0/1", 0, 0, 100)], replace=True
+        )
+        self.store.update_counters(
+            [("r1", "g0/1", 125000, 125000, 101), ("r2", "g0/1", 125000, 125000, 101)], replace=True
+        )
+        self.assertEqual(set(self.get_document()), {"r1", "r2"})
+        # First sample of a new interface keeps the last rate of the sampled ones
+        self.store.update_counters(
+            [("r1", "g0/1", 125000, 125000, 101), ("r1", "g0/2", 0, 0, 101)], replace=True
+        )
+        self.assertEqual(self.get_document(), {"r1": {"g0/1": rate("1 Mbit/s")}})
+        self.assertNotIn(("r2", "g0/1"), self.store._counters)
+
+    def test_parse_counters(self):
+        samples = main.parse_counters(
+            "# comment\n\nr1 g0/1 10 20 100\nr1 g0/2 30 40\n", default_timestamp=50
+        )
+        self.assertEqual(samples, [("r1", "g0/1", 10, 20, 100.0), ("r1", "g0/2", 30, 40, 50)])
+        with self.assertRaises(ValueError):
+            main.parse_counters("r1 g0/1 10")
+
+
+if __name__ == "__main__":
+    unittest.main()
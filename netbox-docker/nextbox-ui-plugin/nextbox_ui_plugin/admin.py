@@ -4,4 +4,10 @@ from .models import SavedTopology
 
 @admin.register(SavedTopology)
 class SavedTopologyAdmin(admin.ModelAdmin):
-    list_display = ("name", "created_by", "timestamp", "topology",)
+    list_display = ("name", "created_by", "timestamp", "node_count", "edge_count",)
+    list_select_related = ("created_by",)
+    readonly_fields = ("topology_blob", "layout_blob", "node_count", "edge_count",)
+
+    def has_add_permission(self, request):
+        # Topologies are saved from the topology view, along with their documents
+        return False
@@ -1,26 +1,86 @@
+from django.utils import timezone
 from rest_framework import serializers
-from nextbox_ui_plugin.models import SavedTopology
-import datetime
+from nextbox_ui_plugin.models import SavedTopology, TopologyBlob
 import json
 
 
+class JSONDocumentField(serializers.JSONField):
+    """
+    JSON document given either as a JSON value or as a JSON-encoded string,
+    the latter as sent by topology save forms.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                raise serializers.ValidationError("Invalid JSON document.")
+        return super().to_internal_value(data)
+
+
 class SavedTopologySerializer(serializers.ModelSerializer):
 
+    # Fields loading the stored documents, left out of lists unless selected
+    DOCUMENT_FIELDS = ('topology', 'layout_context')
+
     created_by = serializers.CharField(read_only=True)
     timestamp = serializers.DateTimeField(read_only=True)
-
-    def to_internal_value(self, data):
-        validated = {
-            'name': str(data.get('name').strip() or f"{self.context['request'].user} - {datetime.datetime.now()}"),
-            'topology': json.loads(data.get('topology')),
-            'layout_context': json.loads(data.get('layout_context')),
-            'created_by': self.context['request'].user,
-            'timestamp': str(datetime.datetime.now())
-        }
-        return validated
+    topology = JSONDocumentField()
+    layout_context = JSONDocumentField(required=False, allow_null=True)
 
     class Meta:
         model = SavedTopology
         fields = [
-            "id", "name", "topology", "layout_context", "created_by", "timestamp",
+            "id", "name", "topology", "layout_context", "node_count", "edge_count",
+            "created_by", "timestamp",
         ]
+        read_only_fields = ["node_count", "edge_count"]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        """Only the given fields are serialized if fields is set."""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def validate_topology(self, value):
+        if not (
+            isinstance(value, dict)
+            and isinstance(value.get('nodes'), list)
+            and isinstance(value.get('edges'), list)
+        ):
+            raise serializers.ValidationError(
+                "Topology must be an object with 'nodes' and 'edges' lists."
+            )
+        return value
+
+    def validate_name(self, value):
+        return value.strip()
+
+    def create(self, validated_data):
+        topology = validated_data.pop('topology')
+        layout_context = validated_data.pop('layout_context', None)
+        user = self.context['request'].user
+        timestamp = timezone.now()
+        saved_topology = SavedTopology(
+            created_by=user,
+            timestamp=timestamp,
+            **validated_data,
+        )
+        if not saved_topology.name:
+            saved_topology.name = f"{user} - {timestamp:%Y-%m-%d %H:%M:%S}"
+        saved_topology.set_topology(topology)
+        saved_topology.set_layout_context(layout_context)
+        saved_topology.save()
+        return saved_topology
+
+    def update(self, instance, validated_data):
+        replaced_blob_ids = {instance.topology_blob_id, instance.layout_blob_id}
+        if 'topology' in validated_data:
+            instance.set_topology(validated_data.pop('topology'))
+        if 'layout_context' in validated_data:
+            instance.set_layout_context(validated_data.pop('layout_context'))
+        instance = super().update(instance, validated_data)
+        TopologyBlob.objects.delete_unused(replaced_blob_ids - {None})
+        return instance
@@ -1,9 +1,15 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 from . import views
 
 
 router = DefaultRouter()
 router.APIRootView = views.NextBoxUIPluginRootView
+router.register('saved-topologies', views.SavedTopologyViewSet, basename='savedtopology')
 
 app_name = "nextbox_ui_plugin-api"
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('topology/', views.TopologyDataView.as_view(), name='topology'),
+    path('topology/changes/', views.TopologyChangesView.as_view(), name='topology_changes'),
+    path('topology/layout/', views.TopologyLayoutView.as_view(), name='topology_layout'),
+]
@@ -1,6 +1,23 @@
+import json
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.routers import APIRootView
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
+from nextbox_ui_plugin.cache import get_topology_snapshot
+from nextbox_ui_plugin.jobs import enqueue_layout_precompute
+from nextbox_ui_plugin.layout import (
+    LAYOUTS, InvalidLayout, clean_positions, get_layout_precompute_min_nodes, get_stored_layout,
+    store_layout,
+)
 from nextbox_ui_plugin.models import SavedTopology
+from nextbox_ui_plugin.topology import get_topology_delta
+from nextbox_ui_plugin.views import TopologyView, get_topology_data
 from . import serializers
 
 
@@ -11,3 +28,216 @@ class NextBoxUIPluginRootView(APIRootView):
     def get_view_name(self):
         return 'NextBoxUI'
 
+
+def iter_topology_json(topology_dict):
+    """
+    Serialize topology incrementally: nodes first, then edges.
+    Output is identical to json.dumps(topology_dict).
+    """
+    yield '{"nodes": ['
+    for i, node in enumerate(topology_dict['nodes']):
+        yield (', ' if i else '') + json.dumps(node)
+    yield '], "edges": ['
+    for i, edge in enumerate(topology_dict['edges']):
+        yield (', ' if i else '') + json.dumps(edge)
+    yield ']}'
+
+
+class RenderedResponseMixin:
+    """
+    DRF responses are rendered after the view returns, too late for
+    view decorators reading the content (gzip_page). Render them in dispatch.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if not getattr(response, 'is_rendered', True):
+            response.render()
+        return response
+
+
+@method_decorator(gzip_page, name='dispatch')
+class TopologyDataView(RenderedResponseMixin, APIView):
+    """
+    Topology for Devices matching TopologyFilterSet query parameters.
+    Streamed as JSON, gzip-compressed when accepted by the client
+    and validated with ETag.
+    """
+    permission_classes = [IsAuthenticatedOrLoginNotRequired]
+
+    def get_view_name(self):
+        return 'Topology'
+
+    def get(self, request):
+        if not request.user.has_perms(TopologyView.permission_required):
+            return Response({"error": "Permission denied"}, status=403)
+
+        topology_dict, device_roles, device_tags, topology_version, is_stale = get_topology_data(
+            request.query_params.copy()
+        )
+
+        etag = f'"{topology_version}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(
+                iter_topology_json(topology_dict),
+                content_type='application/json',
+            )
+        response['ETag'] = etag
+        response['X-Topology-Version'] = topology_version
+        # Precomputed topology is being rebuilt after a change
+        response['X-Topology-Stale'] = 'true' if is_stale else 'false'
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Cookie', 'Authorization'))
+        return response
+
+
+@method_decorator(gzip_page, name='dispatch')
+class TopologyChangesView(RenderedResponseMixin, APIView):
+    """
+    Nodes and edges added, modified or removed since the topology version
+    given in the 'since' parameter, for the same filter parameters
+    as the topology endpoint. 'full' is set when the requested version
+    is no longer known and the whole topology has to be reloaded.
+    """
+    permission_classes = [IsAuthenticatedOrLoginNotRequired]
+
+    def get_view_name(self):
+        return 'Topology Changes'
+
+    def get(self, request):
+        if not request.user.has_perms(TopologyView.permission_required):
+            return Response({"error": "Permission denied"}, status=403)
+
+        query = request.query_params.copy()
+        since = query.pop('since', [''])[0].strip()
+        if not since:
+            return Response({"error": "Missing 'since' parameter"}, status=400)
+
+        topology_dict, device_roles, device_tags, topology_version, is_stale = get_topology_data(
+            query
+        )
+
+        result = {
+            'version': topology_version,
+            'since': since,
+            'stale': is_stale,
+            'full': False,
+            'nodes': {'added': [], 'modified': [], 'removed': []},
+            'edges': {'added': [], 'modified': [], 'removed': []},
+        }
+        if since != topology_version:
+            old_topology = get_topology_snapshot(since)
+            if old_topology is None:
+                result['full'] = True
+            else:
+                result.update(get_topology_delta(old_topology, topology_dict))
+        return Response(result)
+
+
+@method_decorator(gzip_page, name='dispatch')
+class TopologyLayoutView(RenderedResponseMixin, APIView):
+    """
+    Stored node positions of the topology of the same filter parameters
+    as the topology endpoint, laid out with the 'layout' algorithm.
+    GET returns {"positions": {"node_id": [x, y]}}, null positions if none are stored.
+    PUT replaces them. POST queues their computation by the RQ worker if none are stored,
+    the positions are returned by GET once computed.
+    """
+    permission_classes = [IsAuthenticatedOrLoginNotRequired]
+
+    def get_view_name(self):
+        return 'Topology Layout'
+
+    def get_layout_query(self, request):
+        """Return (filter query, layout) of the request, or an error Response."""
+        query = request.query_params.copy()
+        layout = query.pop('layout', [''])[0]
+        if layout not in LAYOUTS:
+            return None, Response(
+                {"error": f"'layout' must be one of: {', '.join(LAYOUTS)}"}, status=400
+            )
+        return query, layout
+
+    def get(self, request):
+        if not request.user.has_perms(TopologyView.permission_required):
+            return Response({"error": "Permission denied"}, status=403)
+        query, layout = self.get_layout_query(request)
+        if query is None:
+            return layout
+        response = Response({'layout': layout, 'positions': get_stored_layout(query, layout)})
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def put(self, request):
+        # Layouts are shared by all viewers of the topology, anonymous ones can't change them
+        user = request.user
+        if not (user.is_authenticated and user.has_perms(TopologyView.permission_required)):
+            return Response({"error": "Permission denied"}, status=403)
+        query, layout = self.get_layout_query(request)
+        if query is None:
+            return layout
+        try:
+            positions = clean_positions(
+                request.data.get('positions') if isinstance(request.data, dict) else None
+            )
+        except InvalidLayout as e:
+            return Response({"error": str(e)}, status=400)
+        store_layout(query, layout, positions)
+        return Response({'layout': layout, 'nodes': len(positions)})
+
+    def post(self, request):
+        if not request.user.has_perms(TopologyView.permission_required):
+            return Response({"error": "Permission denied"}, status=403)
+        query, layout = self.get_layout_query(request)
+        if query is None:
+            return layout
+        if not get_layout_precompute_min_nodes():
+            return Response({"error": "Layouts are not computed on the server side"}, status=501)
+        positions = get_stored_layout(query, layout)
+        if positions is not None:
+            return Response({'layout': layout, 'positions': positions, 'pending': False})
+        enqueue_layout_precompute(query, layout)
+        return Response({'layout': layout, 'positions': None, 'pending': True}, status=202)
+
+
+@method_decorator(gzip_page, name='dispatch')
+class SavedTopologyViewSet(RenderedResponseMixin, ModelViewSet):
+    """
+    Topologies saved by the requesting user, paginated with limit and offset.
+    Topology and layout documents are left out of lists, and loaded,
+    only if selected with the 'fields' parameter, e.g. ?fields=id,name,topology.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.SavedTopologySerializer
+
+    def get_view_name(self):
+        return 'Saved Topologies'
+
+    def get_selected_fields(self):
+        """Names of the fields to return, None for all of them."""
+        if self.request.method != 'GET':
+            return None
+        fields = self.request.query_params.get('fields')
+        if fields:
+            return [field.strip() for field in fields.split(',') if field.strip()]
+        if self.action == 'list':
+            return [
+                field for field in serializers.SavedTopologySerializer.Meta.fields
+                if field not in serializers.SavedTopologySerializer.DOCUMENT_FIELDS
+            ]
+        return None
+
+    def get_queryset(self):
+        queryset = SavedTopology.objects.filter(
+            created_by=self.request.user
+        ).select_related('created_by')
+        fields = self.get_selected_fields()
+        if fields is None or 'topology' in fields:
+            queryset = queryset.select_related('topology_blob')
+        if fields is None or 'layout_context' in fields:
+            queryset = queryset.select_related('layout_blob')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_selected_fields())
+        return super().get_serializer(*args, **kwargs)
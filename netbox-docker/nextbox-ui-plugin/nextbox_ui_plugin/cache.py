@@ -0,0 +1,193 @@
+import hashlib
+import json
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+
+PLUGIN_SETTINGS = settings.PLUGINS_CONFIG.get("nextbox_ui_plugin", dict())
+
+# Topology results are stored in the NetBox cache (redis-cache)
+# and invalidated on any Device/Cable/Interface/Tag change.
+# TTL additionally bounds staleness for changes of other
+# related objects (Device Roles, Device Types, IPs, etc.).
+TOPOLOGY_CACHE_ENABLE = PLUGIN_SETTINGS.get("topology_cache_enable", True)
+if TOPOLOGY_CACHE_ENABLE not in (True, False):
+    TOPOLOGY_CACHE_ENABLE = True
+TOPOLOGY_CACHE_TIMEOUT = PLUGIN_SETTINGS.get("topology_cache_timeout", 300)
+
+# A single worker rebuilds a missing topology while the others
+# wait for its result up to the lock timeout.
+TOPOLOGY_CACHE_LOCK_TIMEOUT = PLUGIN_SETTINGS.get("topology_cache_lock_timeout", 120)
+TOPOLOGY_CACHE_LOCK_POLL_INTERVAL = 0.2
+
+# Built topologies are also kept by their version
+# to serve changes since a version known to a client.
+TOPOLOGY_SNAPSHOT_TIMEOUT = PLUGIN_SETTINGS.get("topology_snapshot_timeout", 3600)
+
+# Precomputed topologies (see jobs.py) are served until they're older than max age,
+# marked stale after a change of their Site or the max age.
+TOPOLOGY_PRECOMPUTE_MAX_AGE = PLUGIN_SETTINGS.get("topology_precompute_max_age", 3600)
+TOPOLOGY_PRECOMPUTE_TIMEOUT = PLUGIN_SETTINGS.get("topology_precompute_timeout", 86400)
+
+CACHE_KEY_PREFIX = 'nextbox_ui_plugin.topology'
+CACHE_GENERATION_KEY = f'{CACHE_KEY_PREFIX}.generation'
+CACHE_SNAPSHOT_KEY_PREFIX = f'{CACHE_KEY_PREFIX}.snapshot'
+CACHE_PRECOMPUTED_KEY_PREFIX = f'{CACHE_KEY_PREFIX}.precomputed'
+
+# Plugin-specific parameters are passed to the key
+# as resolved values rather than raw query parameters.
+NON_FILTER_PARAMS = ('display_unconnected', 'display_passive')
+
+
+def get_cache_generation():
+    """
+    Current topology cache generation.
+    All cached topologies are keyed by it, so changing
+    the generation invalidates every entry at once.
+    """
+    return cache.get_or_set(CACHE_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_topology_cache():
+    cache.set(CACHE_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def store_topology_snapshot(topology_version, topology_dict):
+    cache.set(
+        f'{CACHE_SNAPSHOT_KEY_PREFIX}.{topology_version}', topology_dict,
+        timeout=TOPOLOGY_SNAPSHOT_TIMEOUT,
+    )
+
+
+def get_topology_snapshot(topology_version):
+    return cache.get(f'{CACHE_SNAPSHOT_KEY_PREFIX}.{topology_version}')
+
+
+def get_change_token(kind, object_id):
+    """
+    Token replaced on every change of the precomputed topology.
+    SavedFilters may match any Device, their topologies change with the cache generation.
+    """
+    if kind == 'filter':
+        return get_cache_generation()
+    return cache.get_or_set(
+        f'{CACHE_PRECOMPUTED_KEY_PREFIX}.{kind}.{object_id}.token', uuid.uuid4().hex,
+        timeout=TOPOLOGY_PRECOMPUTE_TIMEOUT,
+    )
+
+
+def touch_site_topologies(site_ids):
+    """Mark precomputed topologies of the Sites as stale."""
+    token = uuid.uuid4().hex
+    cache.set_many(
+        {f'{CACHE_PRECOMPUTED_KEY_PREFIX}.site.{site_id}.token': token for site_id in site_ids},
+        timeout=TOPOLOGY_PRECOMPUTE_TIMEOUT,
+    )
+
+
+def store_precomputed_topology(kind, object_id, params, token, result):
+    """
+    Store a precomputed topology result built with the given display params.
+    token is the change token read before the topology was built.
+    """
+    cache.set(f'{CACHE_PRECOMPUTED_KEY_PREFIX}.{kind}.{object_id}', {
+        'params': params,
+        'token': token,
+        'built_at': time.time(),
+        'result': result,
+    }, timeout=TOPOLOGY_PRECOMPUTE_TIMEOUT)
+
+
+def is_precomputed_topology_stale(
+    kind, object_id, precomputed, max_age=TOPOLOGY_PRECOMPUTE_MAX_AGE,
+):
+    return (
+        precomputed['token'] != get_change_token(kind, object_id)
+        or time.time() - precomputed['built_at'] > max_age
+    )
+
+
+def get_precomputed_topology(kind, object_id, params):
+    """
+    Return (result, is_stale) of the precomputed topology,
+    None if there is none built with the display params.
+    """
+    precomputed = cache.get(f'{CACHE_PRECOMPUTED_KEY_PREFIX}.{kind}.{object_id}')
+    if precomputed is None or precomputed['params'] != params:
+        return None
+    return precomputed['result'], is_precomputed_topology_stale(kind, object_id, precomputed)
+
+
+def precomputed_topology_needs_rebuild(kind, object_id, max_age=TOPOLOGY_PRECOMPUTE_MAX_AGE):
+    """Precomputed topology is missing, has changed or will be older than max_age."""
+    precomputed = cache.get(f'{CACHE_PRECOMPUTED_KEY_PREFIX}.{kind}.{object_id}')
+    return precomputed is None or is_precomputed_topology_stale(
+        kind, object_id, precomputed, max_age
+    )
+
+
+def normalize_query(query):
+    """
+    Normalize a QueryDict of topology filters so that
+    equivalent requests produce the same cache key:
+    parameters and their values are sorted, blank values
+    and plugin-specific parameters are dropped.
+    """
+    normalized = []
+    for key in sorted(query.keys()):
+        if key in NON_FILTER_PARAMS:
+            continue
+        values = sorted(str(v) for v in query.getlist(key) if str(v).strip())
+        if values:
+            normalized.append((key, values))
+    return normalized
+
+
+def get_topology_cache_key(query, params):
+    key_data = json.dumps({
+        'query': normalize_query(query),
+        'filter_id': query.get('filter_id') or None,
+        'display_unconnected': params.get('display_unconnected'),
+        'display_passive': params.get('display_passive'),
+    }, sort_keys=True)
+    key_hash = hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+    return f'{CACHE_KEY_PREFIX}.{get_cache_generation()}.{key_hash}'
+
+
+def get_cached_topology(query, params, build_topology):
+    """
+    Return topology for the given filter query and display params
+    from the cache, building it with build_topology() on a miss.
+    Concurrent misses of the same key are coalesced with a rebuild lock.
+    """
+    if not TOPOLOGY_CACHE_ENABLE:
+        return build_topology()
+
+    cache_key = get_topology_cache_key(query, params)
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    lock_key = f'{cache_key}.lock'
+    deadline = time.monotonic() + TOPOLOGY_CACHE_LOCK_TIMEOUT
+    locked = cache.add(lock_key, True, timeout=TOPOLOGY_CACHE_LOCK_TIMEOUT)
+    while not locked:
+        # Another worker is building the same topology
+        time.sleep(TOPOLOGY_CACHE_LOCK_POLL_INTERVAL)
+        result = cache.get(cache_key)
+        if result is not None:
+            return result
+        if time.monotonic() > deadline:
+            # Give up waiting and build it on our own
+            break
+        locked = cache.add(lock_key, True, timeout=TOPOLOGY_CACHE_LOCK_TIMEOUT)
+
+    try:
+        result = build_topology()
+        cache.set(cache_key, result, timeout=TOPOLOGY_CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return result
@@ -1,4 +1,7 @@
 import django_filters
+from django.core.exceptions import ValidationError
+from django.core.validators import ProhibitNullCharactersValidator
+from django.db.models import Exists, OuterRef
 from django.utils.translation import gettext as _
 
 from extras.filtersets import LocalConfigContextFilterSet
@@ -14,6 +17,62 @@ from dcim.constants import *
 from dcim.models import *
 
 
+class PKMultipleChoiceField(django_filters.fields.ModelMultipleChoiceField):
+    """
+    ModelMultipleChoiceField cleaning to primary keys instead of model instances.
+    All values are validated with a single query of the looked-up
+    column and primary key, without loading whole objects.
+    """
+
+    def _check_values(self, value):
+        key = self.to_field_name or 'pk'
+        opts = self.queryset.model._meta
+        field = opts.pk if key == 'pk' else opts.get_field(key)
+        values = set()
+        for v in value:
+            ProhibitNullCharactersValidator()(v)
+            try:
+                values.add(field.to_python(v))
+            except (TypeError, ValueError, ValidationError):
+                raise ValidationError(
+                    self.error_messages['invalid_pk_value'],
+                    code='invalid_pk_value',
+                    params={'pk': v},
+                )
+        found = dict(self.queryset.filter(**{f'{key}__in': values}).values_list(key, 'pk'))
+        for v in values:
+            if v not in found:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': v},
+                )
+        return list(set(found.values()))
+
+
+class PKMultipleChoiceFilter(django_filters.ModelMultipleChoiceFilter):
+    """
+    ModelMultipleChoiceFilter matching the selected objects with a single
+    'IN' lookup of their primary keys on the foreign key column, e.g.
+    'site__slug' values filter by 'site__in', with no join of the related table.
+    Lookups span forward relations only, so matches need no DISTINCT.
+    """
+    field_class = PKMultipleChoiceField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('distinct', False)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        field_name = self.field_name
+        to_field_name = self.extra.get('to_field_name')
+        if to_field_name and field_name.endswith(f'__{to_field_name}'):
+            field_name = field_name[:-len(to_field_name) - 2]
+        return self.get_method(qs)(**{f'{field_name}__in': value})
+
+
 class TopologyFilterSet(
     NetBoxModelFilterSet,
     TenancyFilterSet,
@@ -21,54 +80,54 @@ class TopologyFilterSet(
     LocalConfigContextFilterSet,
     PrimaryIPFilterSet,
 ):
-    device_id = django_filters.ModelMultipleChoiceFilter(
+    device_id = PKMultipleChoiceFilter(
         queryset=Device.objects.all(),
         to_field_name='id',
         field_name='id',
         label='Device (ID)',
     )
-    manufacturer_id = django_filters.ModelMultipleChoiceFilter(
+    manufacturer_id = PKMultipleChoiceFilter(
         field_name='device_type__manufacturer',
         queryset=Manufacturer.objects.all(),
         label=_('Manufacturer (ID)'),
     )
-    manufacturer = django_filters.ModelMultipleChoiceFilter(
+    manufacturer = PKMultipleChoiceFilter(
         field_name='device_type__manufacturer__slug',
         queryset=Manufacturer.objects.all(),
         to_field_name='slug',
         label=_('Manufacturer (slug)'),
     )
-    device_type = django_filters.ModelMultipleChoiceFilter(
+    device_type = PKMultipleChoiceFilter(
         field_name='device_type__slug',
         queryset=DeviceType.objects.all(),
         to_field_name='slug',
         label=_('Device type (slug)'),
     )
-    device_type_id = django_filters.ModelMultipleChoiceFilter(
+    device_type_id = PKMultipleChoiceFilter(
         queryset=DeviceType.objects.all(),
         label=_('Device type (ID)'),
     )
-    role_id = django_filters.ModelMultipleChoiceFilter(
+    role_id = PKMultipleChoiceFilter(
         field_name='role_id',
         queryset=DeviceRole.objects.all(),
         label=_('Role (ID)'),
     )
-    role = django_filters.ModelMultipleChoiceFilter(
+    role = PKMultipleChoiceFilter(
         field_name='role__slug',
         queryset=DeviceRole.objects.all(),
         to_field_name='slug',
         label=_('Role (slug)'),
     )
-    parent_device_id = django_filters.ModelMultipleChoiceFilter(
+    parent_device_id = PKMultipleChoiceFilter(
         field_name='parent_bay__device',
         queryset=Device.objects.all(),
         label=_('Parent Device (ID)'),
     )
-    platform_id = django_filters.ModelMultipleChoiceFilter(
+    platform_id = PKMultipleChoiceFilter(
         queryset=Platform.objects.all(),
         label=_('Platform (ID)'),
     )
-    platform = django_filters.ModelMultipleChoiceFilter(
+    platform = PKMultipleChoiceFilter(
         field_name='platform__slug',
         queryset=Platform.objects.all(),
         to_field_name='slug',
@@ -100,11 +159,11 @@ class TopologyFilterSet(
         to_field_name='slug',
         label=_('Site group (slug)'),
     )
-    site_id = django_filters.ModelMultipleChoiceFilter(
+    site_id = PKMultipleChoiceFilter(
         queryset=Site.objects.all(),
         label=_('Site (ID)'),
     )
-    site = django_filters.ModelMultipleChoiceFilter(
+    site = PKMultipleChoiceFilter(
         field_name='site__slug',
         queryset=Site.objects.all(),
         to_field_name='slug',
@@ -116,32 +175,32 @@ class TopologyFilterSet(
         lookup_expr='in',
         label=_('Location (ID)'),
     )
-    rack_id = django_filters.ModelMultipleChoiceFilter(
+    rack_id = PKMultipleChoiceFilter(
         field_name='rack',
         queryset=Rack.objects.all(),
         label=_('Rack (ID)'),
     )
-    parent_bay_id = django_filters.ModelMultipleChoiceFilter(
+    parent_bay_id = PKMultipleChoiceFilter(
         field_name='parent_bay',
         queryset=DeviceBay.objects.all(),
         label=_('Parent bay (ID)'),
     )
-    cluster_id = django_filters.ModelMultipleChoiceFilter(
+    cluster_id = PKMultipleChoiceFilter(
         queryset=Cluster.objects.all(),
         label=_('VM cluster (ID)'),
     )
-    cluster_group = django_filters.ModelMultipleChoiceFilter(
+    cluster_group = PKMultipleChoiceFilter(
         field_name='cluster__group__slug',
         queryset=ClusterGroup.objects.all(),
         to_field_name='slug',
         label=_('Cluster group (slug)'),
     )
-    cluster_group_id = django_filters.ModelMultipleChoiceFilter(
+    cluster_group_id = PKMultipleChoiceFilter(
         field_name='cluster__group',
         queryset=ClusterGroup.objects.all(),
         label=_('Cluster group (ID)'),
     )
-    model = django_filters.ModelMultipleChoiceFilter(
+    model = PKMultipleChoiceFilter(
         field_name='device_type__slug',
         queryset=DeviceType.objects.all(),
         to_field_name='slug',
@@ -152,7 +211,8 @@ class TopologyFilterSet(
     )
     status = django_filters.MultipleChoiceFilter(
         choices=DeviceStatusChoices,
-        null_value=None
+        null_value=None,
+        distinct=False,
     )
     has_primary_ip = django_filters.BooleanFilter(
         method='_has_primary_ip',
@@ -162,7 +222,7 @@ class TopologyFilterSet(
         method='_has_oob_ip',
         label=_('Has an out-of-band IP'),
     )
-    virtual_chassis_id = django_filters.ModelMultipleChoiceFilter(
+    virtual_chassis_id = PKMultipleChoiceFilter(
         field_name='virtual_chassis',
         queryset=VirtualChassis.objects.all(),
         label=_('Virtual chassis (ID)'),
@@ -203,7 +263,7 @@ class TopologyFilterSet(
         method='_device_bays',
         label=_('Has device bays'),
     )
-    oob_ip_id = django_filters.ModelMultipleChoiceFilter(
+    oob_ip_id = PKMultipleChoiceFilter(
         field_name='oob_ip',
         queryset=IPAddress.objects.all(),
         label=_('OOB IP (ID)'),
@@ -212,32 +272,32 @@ class TopologyFilterSet(
         method='_has_virtual_device_context',
         label=_('Has virtual device context'),
     )
-    exclude_device_id = django_filters.ModelMultipleChoiceFilter(
+    exclude_device_id = PKMultipleChoiceFilter(
         field_name='id',
         to_field_name='id',
         queryset=Device.objects.all(),
         label=_('Exclude Device'),
         method='filter_exclude_device_id'
     )
-    exclude_site = django_filters.ModelMultipleChoiceFilter(
+    exclude_site = PKMultipleChoiceFilter(
         field_name='site',
         queryset=Site.objects.all(),
         label=_('Exclude Site'),
         method='filter_exclude_site'
     )
-    exclude_site_group = django_filters.ModelMultipleChoiceFilter(
+    exclude_site_group = PKMultipleChoiceFilter(
         field_name='site__group',
         queryset=SiteGroup.objects.all(),
         label=_('Exclude Site Group'),
         method='filter_exclude_site_group'
     )
-    exclude_location = django_filters.ModelMultipleChoiceFilter(
+    exclude_location = PKMultipleChoiceFilter(
         field_name='location',
         queryset=Location.objects.all(),
         label=_('Exclude Location'),
         method='filter_exclude_location'
     )
-    exclude_role = django_filters.ModelMultipleChoiceFilter(
+    exclude_role = PKMultipleChoiceFilter(
         field_name='role',
         queryset=DeviceRole.objects.all(),
         label=_('Exclude Role'),
@@ -254,16 +314,19 @@ class TopologyFilterSet(
     def search(self, queryset, name, value):
         if not value.strip():
             return queryset
+        # Inventory items are matched in a subquery, so the join doesn't duplicate Devices
         return queryset.filter(
             Q(name__icontains=value) |
             Q(serial__icontains=value.strip()) |
-            Q(inventoryitems__serial__icontains=value.strip()) |
+            Exists(InventoryItem.objects.filter(
+                device=OuterRef('pk'), serial__icontains=value.strip(),
+            )) |
             Q(asset_tag__icontains=value.strip()) |
             Q(description__icontains=value.strip()) |
             Q(comments__icontains=value) |
             Q(primary_ip4__address__startswith=value) |
             Q(primary_ip6__address__startswith=value)
-        ).distinct()
+        )
 
     def _has_primary_ip(self, queryset, name, value):
         params = Q(primary_ip4__isnull=False) | Q(primary_ip6__isnull=False)
@@ -280,66 +343,73 @@ class TopologyFilterSet(
     def _virtual_chassis_member(self, queryset, name, value):
         return queryset.exclude(virtual_chassis__isnull=value)
 
+    @staticmethod
+    def _component_exists(model):
+        """Correlated EXISTS subquery of the Device's components, backed by their device index."""
+        return Exists(model.objects.filter(device=OuterRef('pk')))
+
+    def _filter_components(self, queryset, model, value):
+        exists = self._component_exists(model)
+        return queryset.filter(exists if value else ~exists)
+
     def _console_ports(self, queryset, name, value):
-        return queryset.exclude(consoleports__isnull=value)
+        return self._filter_components(queryset, ConsolePort, value)
 
     def _console_server_ports(self, queryset, name, value):
-        return queryset.exclude(consoleserverports__isnull=value)
+        return self._filter_components(queryset, ConsoleServerPort, value)
 
     def _power_ports(self, queryset, name, value):
-        return queryset.exclude(powerports__isnull=value)
+        return self._filter_components(queryset, PowerPort, value)
 
     def _power_outlets(self, queryset, name, value):
-        return queryset.exclude(poweroutlets__isnull=value)
+        return self._filter_components(queryset, PowerOutlet, value)
 
     def _interfaces(self, queryset, name, value):
-        return queryset.exclude(interfaces__isnull=value)
+        return self._filter_components(queryset, Interface, value)
 
     def _pass_through_ports(self, queryset, name, value):
-        return queryset.exclude(
-            frontports__isnull=value,
-            rearports__isnull=value
-        )
+        front_ports = self._component_exists(FrontPort)
+        rear_ports = self._component_exists(RearPort)
+        if value:
+            return queryset.filter(front_ports | rear_ports)
+        return queryset.exclude(front_ports & rear_ports)
 
     def _module_bays(self, queryset, name, value):
-        return queryset.exclude(modulebays__isnull=value)
+        return self._filter_components(queryset, ModuleBay, value)
 
     def _device_bays(self, queryset, name, value):
-        return queryset.exclude(devicebays__isnull=value)
+        return self._filter_components(queryset, DeviceBay, value)
 
     def _has_virtual_device_context(self, queryset, name, value):
-        params = Q(vdcs__isnull=False)
-        if value:
-            return queryset.filter(params).distinct()
-        return queryset.exclude(params)
-    
+        return self._filter_components(queryset, VirtualDeviceContext, value)
+
     def filter_exclude_site(self, queryset, name, value):
         """
         Exclude devices belonging to the selected sites.
         """
-        return queryset.exclude(site__in=value)
-    
+        return queryset.exclude(site_id__in=value)
+
     def filter_exclude_device_id(self, queryset, name, value):
         """
         Exclude devices with selected IDs.
         """
-        device_ids = [device.id for device in value]
-        return queryset.exclude(id__in=device_ids)
+        return queryset.exclude(id__in=value)
 
     def filter_exclude_site_group(self, queryset, name, value):
         """
         Exclude devices belonging to the selected site groups.
+        Sites of the groups are selected in a subquery on the site index.
         """
-        return queryset.exclude(site__group__in=value)
-    
+        return queryset.exclude(site_id__in=Site.objects.filter(group_id__in=value).values('pk'))
+
     def filter_exclude_location(self, queryset, name, value):
         """
         Exclude devices belonging to the selected locations.
         """
-        return queryset.exclude(location__in=value)
-    
+        return queryset.exclude(location_id__in=value)
+
     def filter_exclude_role(self, queryset, name, value):
         """
         Exclude devices that have any of the selected roles.
         """
-        return queryset.exclude(role__in=value)
+        return queryset.exclude(role_id__in=value)
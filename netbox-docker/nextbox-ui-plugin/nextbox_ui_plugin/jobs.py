@@ -0,0 +1,221 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+import django_rq
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from dcim.models import Site
+from extras.models import SavedFilter
+from .cache import (
+    CACHE_KEY_PREFIX, TOPOLOGY_PRECOMPUTE_MAX_AGE, normalize_query,
+    precomputed_topology_needs_rebuild,
+)
+from .layout import (
+    TOPOLOGY_LAYOUT_MAX_NODES, get_query_digest, get_stored_layout, layout_precompute_needed,
+    precompute_layout,
+)
+
+
+logger = logging.getLogger('nextbox_ui_plugin.jobs')
+
+PLUGIN_SETTINGS = settings.PLUGINS_CONFIG.get("nextbox_ui_plugin", dict())
+
+# Site topologies (and optionally SavedFilter ones) are precomputed by the RQ worker
+# and served to users as they are, while changed ones are rebuilt in the background.
+TOPOLOGY_PRECOMPUTE_ENABLE = PLUGIN_SETTINGS.get("topology_precompute_enable", True)
+if TOPOLOGY_PRECOMPUTE_ENABLE not in (True, False):
+    TOPOLOGY_PRECOMPUTE_ENABLE = True
+TOPOLOGY_PRECOMPUTE_SAVED_FILTERS = PLUGIN_SETTINGS.get("topology_precompute_saved_filters", False)
+# Every interval, topologies that changed or got older than max age are rebuilt.
+# Changes the plugin can't attribute to a Site (roles, device types, IPs, etc.)
+# are picked up with the max age.
+TOPOLOGY_PRECOMPUTE_INTERVAL = PLUGIN_SETTINGS.get("topology_precompute_interval", 300)
+TOPOLOGY_PRECOMPUTE_QUEUE = PLUGIN_SETTINGS.get("topology_precompute_queue", "default")
+TOPOLOGY_PRECOMPUTE_JOB_TIMEOUT = PLUGIN_SETTINGS.get("topology_precompute_job_timeout", 600)
+
+JOB_KEY_PREFIX = f'{CACHE_KEY_PREFIX}.job'
+# Token of the running chain of periodic precompute jobs
+SCHEDULE_KEY = f'{JOB_KEY_PREFIX}.schedule'
+
+# Time (monotonic) this process last made sure the periodic jobs are scheduled
+_schedule_checked_at = float('-inf')
+
+# Query parameter -> kind of precomputed topologies
+PRECOMPUTE_QUERY_PARAMS = {
+    'site_id': 'site',
+    'filter_id': 'filter',
+}
+
+
+def get_queue():
+    return django_rq.get_queue(TOPOLOGY_PRECOMPUTE_QUEUE)
+
+
+def get_precompute_query(kind, object_id):
+    """Topology filter query of a precomputed topology."""
+    query = QueryDict(mutable=True)
+    param = next(
+        param for param, param_kind in PRECOMPUTE_QUERY_PARAMS.items() if param_kind == kind
+    )
+    query[param] = str(object_id)
+    return query
+
+
+def get_precompute_target(query):
+    """
+    (kind, object_id) of the topology requested by the filter query
+    if it's precomputed, i.e. the query has a single Site or SavedFilter. None otherwise.
+    """
+    if not TOPOLOGY_PRECOMPUTE_ENABLE:
+        return None
+    normalized = normalize_query(query)
+    if len(normalized) != 1 or len(normalized[0][1]) != 1:
+        return None
+    param, (value,) = normalized[0]
+    kind = PRECOMPUTE_QUERY_PARAMS.get(param)
+    if kind is None or not value.isdigit():
+        return None
+    if kind == 'filter' and not TOPOLOGY_PRECOMPUTE_SAVED_FILTERS:
+        return None
+    return kind, int(value)
+
+
+def enqueue_topology_precompute(kind, object_id):
+    """Queue a rebuild of the topology unless one is queued already."""
+    queued_key = f'{JOB_KEY_PREFIX}.{kind}.{object_id}'
+    if not cache.add(queued_key, True, timeout=TOPOLOGY_PRECOMPUTE_JOB_TIMEOUT):
+        return
+    try:
+        get_queue().enqueue(
+            precompute_topology, kind, object_id,
+            job_timeout=TOPOLOGY_PRECOMPUTE_JOB_TIMEOUT,
+        )
+    except Exception:
+        cache.delete(queued_key)
+        raise
+
+
+def get_layout_job_key(query, layout):
+    return f'{JOB_KEY_PREFIX}.layout.{layout}.{get_query_digest(query)}'
+
+
+def enqueue_layout_precompute(query, layout):
+    """Queue layout computation of the topology of the filter query unless one is queued already."""
+    queued_key = get_layout_job_key(query, layout)
+    if not cache.add(queued_key, True, timeout=TOPOLOGY_PRECOMPUTE_JOB_TIMEOUT):
+        return
+    try:
+        get_queue().enqueue(
+            precompute_topology_layout, query.urlencode(), layout,
+            job_timeout=TOPOLOGY_PRECOMPUTE_JOB_TIMEOUT,
+        )
+    except Exception:
+        cache.delete(queued_key)
+        raise
+
+
+def schedule_topology_precompute():
+    """
+    Start periodic precomputation of all topologies unless it's running.
+    Checked once per interval by every process, not on every request.
+    """
+    global _schedule_checked_at
+    if not (TOPOLOGY_PRECOMPUTE_ENABLE and TOPOLOGY_PRECOMPUTE_INTERVAL):
+        return
+    now = time.monotonic()
+    if now - _schedule_checked_at < TOPOLOGY_PRECOMPUTE_INTERVAL:
+        return
+    _schedule_checked_at = now
+    token = uuid.uuid4().hex
+    if cache.add(SCHEDULE_KEY, token, timeout=TOPOLOGY_PRECOMPUTE_INTERVAL * 2):
+        get_queue().enqueue(precompute_all_topologies, token)
+
+
+def hold_schedule(token):
+    """
+    Keep the schedule key for the chain of periodic jobs with the token, taking it over
+    once it has expired. Returns False if another chain holds it, that chain goes on alone.
+    """
+    timeout = TOPOLOGY_PRECOMPUTE_INTERVAL * 2
+    if cache.add(SCHEDULE_KEY, token, timeout=timeout):
+        return True
+    if cache.get(SCHEDULE_KEY) != token:
+        return False
+    cache.touch(SCHEDULE_KEY, timeout=timeout)
+    return True
+
+
+def precompute_topology(kind, object_id):
+    """RQ job building and storing the topology of a Site or SavedFilter."""
+    # Changes from now on queue another rebuild
+    cache.delete(f'{JOB_KEY_PREFIX}.{kind}.{object_id}')
+    from .views import precompute_topology_data
+    if kind == 'site' and not Site.objects.filter(pk=object_id).exists():
+        return
+    if kind == 'filter' and not SavedFilter.objects.filter(pk=object_id).exists():
+        return
+    query = get_precompute_query(kind, object_id)
+    result = precompute_topology_data(query, (kind, object_id))
+    topology_dict = result[0]
+    logger.info(
+        f"Precomputed topology of {kind} {object_id}: "
+        f"{len(topology_dict['nodes'])} nodes, {len(topology_dict['edges'])} edges"
+    )
+    # Large topologies are opened with coordinates laid out here
+    from .views import INITIAL_LAYOUT
+    if layout_precompute_needed(query, INITIAL_LAYOUT, len(topology_dict['nodes'])):
+        enqueue_layout_precompute(query, INITIAL_LAYOUT)
+
+
+def precompute_topology_layout(query_string, layout):
+    """
+    RQ job laying out the topology of the filter query,
+    unless node positions are stored for it.
+    """
+    query = QueryDict(query_string)
+    cache.delete(get_layout_job_key(query, layout))
+    if get_stored_layout(query, layout) is not None:
+        return
+    from .views import get_topology_data
+    topology_dict = get_topology_data(query)[0]
+    if len(topology_dict['nodes']) > TOPOLOGY_LAYOUT_MAX_NODES:
+        return
+    started = time.perf_counter()
+    if precompute_layout(query, layout, topology_dict):
+        logger.info(
+            f"Computed {layout} layout of {len(topology_dict['nodes'])} nodes "
+            f"for {normalize_query(query)} in {time.perf_counter() - started:.1f}s"
+        )
+
+
+def precompute_all_topologies(token=None):
+    """
+    Periodic RQ job queueing rebuilds of the topologies in need of one,
+    then scheduling itself for the next interval.
+    Jobs of a chain pass its token on, and a chain stops as soon as the schedule key
+    holds another token, so chains started after the key expired don't multiply.
+    """
+    token = token or uuid.uuid4().hex
+    if not hold_schedule(token):
+        logger.info("Topologies are precomputed by another job chain, stopping this one")
+        return
+    targets = [('site', site_id) for site_id in Site.objects.values_list('pk', flat=True)]
+    if TOPOLOGY_PRECOMPUTE_SAVED_FILTERS:
+        targets += [
+            ('filter', filter_id) for filter_id in SavedFilter.objects.filter(
+                object_types__app_label='dcim', object_types__model='device',
+            ).values_list('pk', flat=True)
+        ]
+    # Rebuilt before they get older than max age by the next run
+    max_age = max(TOPOLOGY_PRECOMPUTE_MAX_AGE - TOPOLOGY_PRECOMPUTE_INTERVAL, 0)
+    queued = 0
+    for kind, object_id in targets:
+        if precomputed_topology_needs_rebuild(kind, object_id, max_age):
+            enqueue_topology_precompute(kind, object_id)
+            queued += 1
+    logger.info(f"Queued {queued} of {len(targets)} topologies to precompute")
+    get_queue().enqueue_in(
+        timedelta(seconds=TOPOLOGY_PRECOMPUTE_INTERVAL), precompute_all_topologies, token,
+    )
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import math
+from django.conf import settings
+from .cache import normalize_query
+from .layout_engine import FORCE_DIRECTED_ITERATIONS, compute_layout, layout_engine_available
+from .models import TopologyLayout
+
+
+PLUGIN_SETTINGS = settings.PLUGINS_CONFIG.get("nextbox_ui_plugin", dict())
+
+# Layout algorithms of topoSphere
+LAYOUTS = ('layered', 'forceDirected')
+# Stored layouts are limited to that many node positions
+TOPOLOGY_LAYOUT_MAX_NODES = PLUGIN_SETTINGS.get("topology_layout_max_nodes", 20000)
+# Topologies of at least that many nodes are laid out by the RQ worker instead of browsers,
+# unless layouts are stored for them already. 0 leaves all of them to browsers.
+TOPOLOGY_LAYOUT_PRECOMPUTE_MIN_NODES = PLUGIN_SETTINGS.get(
+    "topology_layout_precompute_min_nodes", 1000
+)
+TOPOLOGY_LAYOUT_PRECOMPUTE_ITERATIONS = PLUGIN_SETTINGS.get(
+    "topology_layout_precompute_iterations", FORCE_DIRECTED_ITERATIONS,
+)
+
+
+class InvalidLayout(ValueError):
+    pass
+
+
+def get_query_digest(query):
+    """Digest of the normalized filter query, equivalent queries share their layouts."""
+    return hashlib.sha256(json.dumps(normalize_query(query)).encode('utf-8')).hexdigest()
+
+
+def clean_positions(positions):
+    """
+    Validate {"node_id": [x, y]} node positions.
+    Return them with coordinates rounded to 0.1, raise InvalidLayout otherwise.
+    """
+    if not isinstance(positions, dict):
+        raise InvalidLayout("Positions must be an object of node IDs")
+    if len(positions) > TOPOLOGY_LAYOUT_MAX_NODES:
+        raise InvalidLayout(f"Layouts are limited to {TOPOLOGY_LAYOUT_MAX_NODES} nodes")
+    cleaned = {}
+    for node_id, position in positions.items():
+        if not (
+            isinstance(position, (list, tuple)) and len(position) == 2
+            and all(
+                isinstance(c, (int, float)) and not isinstance(c, bool) and math.isfinite(c)
+                for c in position
+            )
+        ):
+            raise InvalidLayout(f"Invalid position of node '{node_id}'")
+        cleaned[str(node_id)] = [round(position[0], 1), round(position[1], 1)]
+    return cleaned
+
+
+def get_stored_layout(query, layout):
+    """Return stored {"node_id": [x, y]} positions of the topology, None if there are none."""
+    return TopologyLayout.objects.filter(
+        query_digest=get_query_digest(query), layout=layout,
+    ).values_list('positions', flat=True).first()
+
+
+def store_layout(query, layout, positions, replace=True):
+    """
+    Store node positions of the topology, replacing the previous ones
+    unless replace is False. Return whether the positions are stored.
+    """
+    defaults = {
+        'query': normalize_query(query),
+        'positions': positions,
+    }
+    if not replace:
+        _, created = TopologyLayout.objects.get_or_create(
+            query_digest=get_query_digest(query), layout=layout, defaults=defaults,
+        )
+        return created
+    TopologyLayout.objects.update_or_create(
+        query_digest=get_query_digest(query), layout=layout, defaults=defaults,
+    )
+    return True
+
+
+def get_layout_precompute_min_nodes():
+    """Node count of topologies laid out by the RQ worker, 0 if layouts aren't precomputed."""
+    if not layout_engine_available():
+        return 0
+    return TOPOLOGY_LAYOUT_PRECOMPUTE_MIN_NODES or 0
+
+
+def layout_precompute_needed(query, layout, node_count):
+    """Whether the RQ worker should lay out the topology of node_count nodes."""
+    min_nodes = get_layout_precompute_min_nodes()
+    return (
+        bool(min_nodes) and min_nodes <= node_count <= TOPOLOGY_LAYOUT_MAX_NODES
+        and get_stored_layout(query, layout) is None
+    )
+
+
+def precompute_layout(query, layout, topology_dict):
+    """
+    Lay out the topology and store node positions, unless positions
+    got stored meanwhile. Return whether they are stored.
+    """
+    positions = compute_layout(topology_dict, layout, TOPOLOGY_LAYOUT_PRECOMPUTE_ITERATIONS)
+    return store_layout(query, layout, positions, replace=False)
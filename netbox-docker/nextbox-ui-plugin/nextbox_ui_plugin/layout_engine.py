@@ -0,0 +1,219 @@
+"""
+Topology layouts computed on the server side, so browsers get ready-made node
+coordinates instead of laying out large topologies themselves.
+
+Coordinates follow topoSphere conventions: layered layouts are vertical and
+ascending by the node 'layer', as set by get_node_layer_sort_preference.
+NumPy is an optional dependency, layouts are left to the browser without it.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Distance between neighboring nodes of a layer, and the ideal edge length of force-directed layouts
+NODE_DISTANCE = 150
+# Distance between layers of layered layouts
+LAYER_DISTANCE = 250
+# Barycenter sweeps ordering nodes of each layer to reduce edge crossings
+LAYERED_SWEEPS = 8
+# Force-directed layouts start from the layered one and move nodes that many times
+FORCE_DIRECTED_ITERATIONS = 200
+# Pull towards the center, keeping disconnected parts together
+FORCE_DIRECTED_GRAVITY = 0.01
+# Node pairs handled at once by the repulsion step, bounds its memory use
+REPULSION_CHUNK_PAIRS = 1000000
+
+
+def layout_engine_available():
+    return numpy is not None
+
+
+def get_graph(topology_dict):
+    """Return (node IDs, node layers, edge source indexes, edge target indexes) of the topology."""
+    node_ids = [node['id'] for node in topology_dict['nodes']]
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    layers = numpy.array(
+        [node.get('layer') or 0 for node in topology_dict['nodes']], dtype=numpy.int64
+    )
+    edges = [
+        (index[edge['source']], index[edge['target']])
+        for edge in topology_dict['edges']
+        if edge['source'] in index and edge['target'] in index and edge['source'] != edge['target']
+    ]
+    edges = numpy.array(edges, dtype=numpy.int64).reshape(-1, 2)
+    return node_ids, layers, edges[:, 0], edges[:, 1]
+
+
+def get_positions(node_ids, coords):
+    """{"node_id": [x, y]} positions of the nodes, centered around (0, 0)."""
+    if not node_ids:
+        return {}
+    coords = numpy.round(coords - coords.mean(axis=0), 1)
+    return {node_id: [float(x), float(y)] for node_id, (x, y) in zip(node_ids, coords)}
+
+
+def order_layers(layer_index, layer_count, sources, targets):
+    """
+    Position of every node within its layer. Nodes start in topology order, then sweeps
+    down and up the layers move each node to the barycenter of its neighbors
+    on the previous layer. Edges spanning several layers are not considered.
+    """
+    order = numpy.zeros(len(layer_index), dtype=numpy.float64)
+    members = [numpy.flatnonzero(layer_index == layer) for layer in range(layer_count)]
+    for nodes in members:
+        order[nodes] = numpy.arange(len(nodes))
+    # Both directions of every edge, from the node being ordered to its neighbor
+    a = numpy.concatenate([sources, targets])
+    b = numpy.concatenate([targets, sources])
+    for sweep in range(LAYERED_SWEEPS):
+        down = sweep % 2 == 0
+        for layer in (range(1, layer_count) if down else range(layer_count - 2, -1, -1)):
+            neighbor_layer = layer - 1 if down else layer + 1
+            mask = (layer_index[a] == layer) & (layer_index[b] == neighbor_layer)
+            nodes = members[layer]
+            sums = numpy.bincount(a[mask], weights=order[b[mask]], minlength=len(order))[nodes]
+            counts = numpy.bincount(a[mask], minlength=len(order))[nodes]
+            # Nodes without neighbors there keep their place
+            barycenters = numpy.where(counts > 0, sums / numpy.maximum(counts, 1), order[nodes])
+            ranked = nodes[numpy.lexsort((order[nodes], barycenters))]
+            order[ranked] = numpy.arange(len(ranked))
+    return order
+
+
+def compute_layered_coords(layers, sources, targets):
+    """
+    Sugiyama-style layered coordinates: a layer per node layer value, nodes ordered
+    to reduce edge crossings. Wide layers wrap into rows to keep the topology viewable.
+    """
+    node_count = len(layers)
+    _, layer_index = numpy.unique(layers, return_inverse=True)
+    layer_index = layer_index.reshape(-1)
+    layer_count = int(layer_index.max()) + 1 if node_count else 0
+    order = order_layers(layer_index, layer_count, sources, targets)
+
+    row_size = max(20, int(2 * numpy.sqrt(node_count)))
+    layer_sizes = numpy.bincount(layer_index, minlength=layer_count)
+    layer_rows = -(-layer_sizes // row_size)
+    # Vertical offset of the first row of every layer
+    layer_offsets = (
+        (numpy.cumsum(layer_rows) - layer_rows) * NODE_DISTANCE
+        + numpy.arange(layer_count) * LAYER_DISTANCE
+    )
+
+    row = order // row_size
+    column = order % row_size
+    # Columns of the last, shorter row of a layer are centered as well
+    sizes = layer_sizes[layer_index]
+    row_lengths = numpy.minimum(sizes - row * row_size, row_size)
+    coords = numpy.empty((node_count, 2), dtype=numpy.float64)
+    coords[:, 0] = (column - (row_lengths - 1) / 2) * NODE_DISTANCE
+    coords[:, 1] = layer_offsets[layer_index] + row * NODE_DISTANCE
+    return coords
+
+
+def get_repulsion(coords, k):
+    """
+    Fruchterman-Reingold repulsive displacement k²/d of every node. Only pairs closer
+    than 2k are considered, found by sorting nodes into a grid of 2k cells and pairing
+    the nodes of neighboring cells, so the cost grows with node count, not its square.
+    """
+    node_count = len(coords)
+    cutoff = 2 * k
+    displacement = numpy.zeros_like(coords)
+    cells = numpy.floor(coords / cutoff).astype(numpy.int64)
+    cells -= cells.min(axis=0)
+    # Room for the neighbor offsets, so keys of neighbor cells never collide
+    width = int(cells[:, 1].max()) + 3
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = numpy.argsort(keys, kind='stable')
+    cell_keys, starts, counts = numpy.unique(keys[order], return_index=True, return_counts=True)
+
+    # Every pair of neighboring cells once
+    for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        neighbor_keys = cell_keys + dx * width + dy
+        found = numpy.minimum(numpy.searchsorted(cell_keys, neighbor_keys), len(cell_keys) - 1)
+        a_cells = numpy.flatnonzero(cell_keys[found] == neighbor_keys)
+        b_cells = found[a_cells]
+        pair_counts = counts[a_cells] * counts[b_cells]
+        # Cell pairs split into chunks of about REPULSION_CHUNK_PAIRS node pairs
+        bounds = numpy.searchsorted(
+            numpy.cumsum(pair_counts),
+            numpy.arange(REPULSION_CHUNK_PAIRS, int(pair_counts.sum()), REPULSION_CHUNK_PAIRS),
+        )
+        for chunk in numpy.split(numpy.arange(len(a_cells)), numpy.unique(bounds)):
+            if not len(chunk):
+                continue
+            chunk_counts = pair_counts[chunk]
+            cell_pair = numpy.repeat(chunk, chunk_counts)
+            # Index of every node pair within its cell pair
+            chunk_starts = numpy.cumsum(chunk_counts) - chunk_counts
+            local = numpy.arange(chunk_counts.sum()) - numpy.repeat(chunk_starts, chunk_counts)
+            b_counts = counts[b_cells[cell_pair]]
+            i = order[starts[a_cells[cell_pair]] + local // b_counts]
+            j = order[starts[b_cells[cell_pair]] + local % b_counts]
+            keep = i < j if (dx, dy) == (0, 0) else i != j
+            i, j = i[keep], j[keep]
+            delta = coords[i] - coords[j]
+            distances = numpy.einsum('ij,ij->i', delta, delta)
+            near = distances < cutoff * cutoff
+            i, j, delta = i[near], j[near], delta[near]
+            # Coinciding nodes are pushed apart in a fixed direction
+            delta[~delta.any(axis=1)] = (0.1, 0.1)
+            force = delta * (k * k / numpy.einsum('ij,ij->i', delta, delta))[:, None]
+            for axis in (0, 1):
+                axis_force = force[:, axis]
+                displacement[:, axis] += numpy.bincount(i, weights=axis_force, minlength=node_count)
+                displacement[:, axis] -= numpy.bincount(j, weights=axis_force, minlength=node_count)
+    return displacement
+
+
+def compute_force_directed_coords(coords, sources, targets, iterations=FORCE_DIRECTED_ITERATIONS):
+    """
+    Fruchterman-Reingold force-directed coordinates, starting from the given ones.
+    Moves of every iteration are limited by a temperature cooling down linearly.
+    """
+    node_count = len(coords)
+    if node_count < 2:
+        return coords
+    k = NODE_DISTANCE
+    coords = coords.copy()
+    # Nodes of the same coordinates would never separate
+    coords += numpy.random.default_rng(0).uniform(-1, 1, coords.shape)
+    initial_temperature = max(k, 0.1 * float(numpy.ptp(coords, axis=0).max()))
+    for iteration in range(iterations):
+        displacement = get_repulsion(coords, k)
+        delta = coords[sources] - coords[targets]
+        distances = numpy.sqrt(numpy.einsum('ij,ij->i', delta, delta))
+        # Attraction d²/k along the edges
+        force = delta * (distances / k)[:, None]
+        for axis in (0, 1):
+            axis_force = force[:, axis]
+            displacement[:, axis] -= numpy.bincount(
+                sources, weights=axis_force, minlength=node_count
+            )
+            displacement[:, axis] += numpy.bincount(
+                targets, weights=axis_force, minlength=node_count
+            )
+        displacement -= FORCE_DIRECTED_GRAVITY * (coords - coords.mean(axis=0))
+
+        temperature = initial_temperature * (1 - iteration / iterations)
+        lengths = numpy.sqrt(numpy.einsum('ij,ij->i', displacement, displacement))
+        scale = numpy.minimum(lengths, temperature) / numpy.maximum(lengths, 1e-9)
+        coords += displacement * scale[:, None]
+    return coords
+
+
+def compute_layout(topology_dict, layout, iterations=FORCE_DIRECTED_ITERATIONS):
+    """
+    Return {"node_id": [x, y]} positions of the topology nodes
+    laid out with the 'layered' or 'forceDirected' layout.
+    """
+    if numpy is None:
+        raise RuntimeError("NumPy is required to compute topology layouts")
+    node_ids, layers, sources, targets = get_graph(topology_dict)
+    coords = compute_layered_coords(layers, sources, targets)
+    if layout == 'forceDirected':
+        coords = compute_force_directed_coords(coords, sources, targets, iterations)
+    return get_positions(node_ids, coords)
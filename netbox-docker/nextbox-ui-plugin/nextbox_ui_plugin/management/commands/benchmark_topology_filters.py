@@ -0,0 +1,147 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from dcim.choices import DeviceStatusChoices
+from dcim.models import (
+    ConsolePort, Device, DeviceRole, DeviceType, Interface, Location, Manufacturer, Site, SiteGroup,
+)
+from nextbox_ui_plugin.filters import TopologyFilterSet
+from nextbox_ui_plugin.views import get_topology_queryset
+
+
+BENCHMARK_PREFIX = 'nextbox-bench'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure TopologyFilterSet query times. Synthetic devices are created "
+        "in a transaction that is rolled back, leaving the database unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--devices', type=int, default=50000,
+            help="Number of synthetic devices to create (0 to use the existing ones)",
+        )
+        parser.add_argument('--sites', type=int, default=100, help="Number of synthetic sites")
+        parser.add_argument(
+            '--repeat', type=int, default=5, help="Runs per query, the best one is reported",
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+        try:
+            with transaction.atomic():
+                if options['devices']:
+                    self.create_devices(options['devices'], max(options['sites'], 1))
+                self.run_benchmarks(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_devices(self, device_count, site_count):
+        started = time.perf_counter()
+        group = SiteGroup.objects.create(name=BENCHMARK_PREFIX, slug=BENCHMARK_PREFIX)
+        sites = Site.objects.bulk_create([
+            Site(
+                name=f'{BENCHMARK_PREFIX}-{i}', slug=f'{BENCHMARK_PREFIX}-{i}',
+                group=group if i % 2 else None,
+            )
+            for i in range(site_count)
+        ])
+        # Locations are tree nodes, saved one by one to set up the tree fields
+        locations = []
+        for site in sites[:10]:
+            location = Location(name=site.name, slug=site.slug, site=site)
+            location.save()
+            locations.append(location)
+        manufacturer = Manufacturer.objects.create(name=BENCHMARK_PREFIX, slug=BENCHMARK_PREFIX)
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model=BENCHMARK_PREFIX, slug=BENCHMARK_PREFIX,
+        )
+        roles = DeviceRole.objects.bulk_create([
+            DeviceRole(name=f'{BENCHMARK_PREFIX}-{role}', slug=f'{BENCHMARK_PREFIX}-{role}')
+            for role in ('core', 'distribution', 'access')
+        ])
+        devices = Device.objects.bulk_create([
+            Device(
+                name=f'{BENCHMARK_PREFIX}-{i}',
+                serial=f'SN{i:08d}',
+                site=sites[i % site_count],
+                location=locations[i % site_count] if i % site_count < len(locations) else None,
+                role=roles[i % len(roles)],
+                device_type=device_type,
+                status=DeviceStatusChoices.STATUS_ACTIVE,
+            )
+            for i in range(device_count)
+        ], batch_size=5000)
+        # Components of some devices for the component filters
+        Interface.objects.bulk_create([
+            Interface(device=device, name='eth0', type='1000base-t')
+            for device in devices[::2]
+        ], batch_size=5000)
+        ConsolePort.objects.bulk_create([
+            ConsolePort(device=device, name='con0')
+            for device in devices[::10]
+        ], batch_size=5000)
+        self.stdout.write(
+            f"Created {device_count} devices on {site_count} sites "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def get_queries(self):
+        """(name, query parameters) of the benchmarked filters."""
+        sites = list(Site.objects.order_by('pk').values_list('pk', flat=True)[:10])
+        site_slugs = list(Site.objects.order_by('pk').values_list('slug', flat=True)[:10])
+        roles = list(DeviceRole.objects.order_by('pk').values_list('pk', flat=True))
+        devices = list(Device.objects.order_by('pk').values_list('pk', flat=True)[:1000])
+        site_groups = list(SiteGroup.objects.order_by('pk').values_list('pk', flat=True)[:1])
+        locations = list(Location.objects.order_by('pk').values_list('pk', flat=True)[:5])
+        return [
+            ('all devices', {'status': [DeviceStatusChoices.STATUS_ACTIVE]}),
+            ('10 sites by id', {'site_id': sites}),
+            ('10 sites by slug', {'site': site_slugs}),
+            ('1000 device ids', {'device_id': devices}),
+            ('exclude 1000 device ids', {'exclude_device_id': devices}),
+            ('exclude role and site group', {
+                'exclude_role': roles[:1], 'exclude_site_group': site_groups,
+            }),
+            ('exclude locations', {'exclude_location': locations}),
+            ('has interfaces', {'interfaces': ['true']}),
+            ('without console ports', {'console_ports': ['false']}),
+            ('search', {'q': [f'{BENCHMARK_PREFIX}-1']}),
+        ]
+
+    def run_query(self, params):
+        """Returns (seconds, SQL queries, devices) of filtering and loading the devices."""
+        data = QueryDict(mutable=True)
+        for key, values in params.items():
+            data.setlist(key, [str(v) for v in values])
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            filterset = TopologyFilterSet(data, Device.objects.all())
+            if not filterset.is_valid():
+                raise CommandError(f"Invalid filter {dict(params)}: {filterset.errors}")
+            # Devices are loaded the way topologies load them
+            devices = list(get_topology_queryset(filterset.qs))
+            elapsed = time.perf_counter() - started
+        return elapsed, len(queries), len(devices)
+
+    def run_benchmarks(self, repeat):
+        self.stdout.write(f"{'Filter':<30} {'Devices':>8} {'Queries':>8} {'Best (ms)':>10}")
+        for name, params in self.get_queries():
+            if any(not values for values in params.values()):
+                self.stdout.write(f"{name:<30} skipped, no objects to filter by")
+                continue
+            runs = [self.run_query(params) for _ in range(repeat)]
+            elapsed, query_count, device_count = min(runs)
+            self.stdout.write(
+                f"{name:<30} {device_count:>8} {query_count:>8} {elapsed * 1000:>10.1f}"
+            )
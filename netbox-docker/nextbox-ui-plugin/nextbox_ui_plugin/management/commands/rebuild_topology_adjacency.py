@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from nextbox_ui_plugin.cache import invalidate_topology_cache
+from nextbox_ui_plugin.topology import rebuild_device_adjacency
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the device adjacency table topologies are rendered from. "
+        "It's kept in sync by signals, a rebuild is needed after changes made "
+        "around them, e.g. raw SQL or bridged Interface path changes."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_device_adjacency()
+        invalidate_topology_cache()
+        self.stdout.write(f"Rebuilt {count} adjacencies in {time.perf_counter() - started:.1f}s")
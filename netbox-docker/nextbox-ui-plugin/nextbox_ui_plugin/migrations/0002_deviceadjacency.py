@@ -0,0 +1,65 @@
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The table is filled once all migrations are applied, see signals.populate_device_adjacency()
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dcim', '__first__'),
+        ('nextbox_ui_plugin', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceAdjacency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('is_logical', models.BooleanField(default=False)),
+                ('interface_a_id', models.PositiveBigIntegerField()),
+                ('interface_a', models.CharField(max_length=64)),
+                ('interface_b_id', models.PositiveBigIntegerField()),
+                ('interface_b', models.CharField(max_length=64)),
+                ('path_cable_ids', django.contrib.postgres.fields.ArrayField(
+                    base_field=models.PositiveBigIntegerField(), blank=True, default=list, size=None,
+                )),
+                ('cable', models.ForeignKey(
+                    blank=True, null=True, on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+', to='dcim.cable',
+                )),
+                ('device_a', models.ForeignKey(
+                    blank=True, null=True, on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+', to='dcim.device',
+                )),
+                ('device_b', models.ForeignKey(
+                    blank=True, null=True, on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+', to='dcim.device',
+                )),
+                ('interface_a_type', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype',
+                )),
+                ('interface_b_type', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype',
+                )),
+            ],
+            options={
+                'ordering': ('is_logical', 'cable', 'interface_a_id'),
+                'indexes': [
+                    models.Index(fields=['device_a', 'device_b'], name='nextbox_ui_adjacency_a_b_idx'),
+                    models.Index(fields=['device_b', 'device_a'], name='nextbox_ui_adjacency_b_a_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        condition=models.Q(('is_logical', False)), fields=('cable',),
+                        name='nextbox_ui_plugin_deviceadjacency_unique_cable',
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(('is_logical', True)), fields=('interface_a_type', 'interface_a_id'),
+                        name='nextbox_ui_plugin_deviceadjacency_unique_path_origin',
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nextbox_ui_plugin', '0002_deviceadjacency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopologyBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='savedtopology',
+            options={'ordering': ('-timestamp', '-pk')},
+        ),
+        migrations.AddField(
+            model_name='savedtopology',
+            name='topology_blob',
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.PROTECT,
+                related_name='saved_topologies', to='nextbox_ui_plugin.topologyblob',
+            ),
+        ),
+        migrations.AddField(
+            model_name='savedtopology',
+            name='layout_blob',
+            field=models.ForeignKey(
+                blank=True, null=True, on_delete=django.db.models.deletion.PROTECT,
+                related_name='saved_layouts', to='nextbox_ui_plugin.topologyblob',
+            ),
+        ),
+        migrations.AddField(
+            model_name='savedtopology',
+            name='node_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='savedtopology',
+            name='edge_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
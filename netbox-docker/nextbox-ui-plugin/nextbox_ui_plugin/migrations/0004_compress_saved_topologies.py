@@ -0,0 +1,39 @@
+import hashlib
+import json
+import zlib
+from django.db import migrations
+
+
+def get_blob(TopologyBlob, data):
+    # Same encoding as nextbox_ui_plugin.models.encode_topology_json
+    content = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    blob, _ = TopologyBlob.objects.get_or_create(
+        digest=hashlib.sha256(content).hexdigest(),
+        defaults={'data': zlib.compress(content), 'size': len(content)},
+    )
+    return blob
+
+
+def compress_saved_topologies(apps, schema_editor):
+    SavedTopology = apps.get_model('nextbox_ui_plugin', 'SavedTopology')
+    TopologyBlob = apps.get_model('nextbox_ui_plugin', 'TopologyBlob')
+    for saved_topology in SavedTopology.objects.iterator(chunk_size=100):
+        topology = saved_topology.topology or {}
+        saved_topology.topology_blob = get_blob(TopologyBlob, topology)
+        if saved_topology.layout_context is not None:
+            saved_topology.layout_blob = get_blob(TopologyBlob, saved_topology.layout_context)
+        if isinstance(topology, dict):
+            saved_topology.node_count = len(topology.get('nodes', []))
+            saved_topology.edge_count = len(topology.get('edges', []))
+        saved_topology.save(update_fields=['topology_blob', 'layout_blob', 'node_count', 'edge_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nextbox_ui_plugin', '0003_topologyblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_saved_topologies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+import json
+import zlib
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def restore_saved_topologies(apps, schema_editor):
+    """Reverse: JSON documents of saved topologies are loaded back from their blobs."""
+    SavedTopology = apps.get_model('nextbox_ui_plugin', 'SavedTopology')
+    saved_topologies = SavedTopology.objects.select_related('topology_blob', 'layout_blob')
+    for saved_topology in saved_topologies.iterator(chunk_size=100):
+        saved_topology.topology = json.loads(zlib.decompress(saved_topology.topology_blob.data))
+        layout_blob = saved_topology.layout_blob
+        if layout_blob is not None:
+            saved_topology.layout_context = json.loads(zlib.decompress(layout_blob.data))
+        saved_topology.save(update_fields=['topology', 'layout_context'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nextbox_ui_plugin', '0004_compress_saved_topologies'),
+    ]
+
+    operations = [
+        # Reversed last, once the documents are restored into the re-added column
+        migrations.AlterField(
+            model_name='savedtopology',
+            name='topology',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_saved_topologies),
+        migrations.RemoveField(
+            model_name='savedtopology',
+            name='topology',
+        ),
+        migrations.RemoveField(
+            model_name='savedtopology',
+            name='layout_context',
+        ),
+        migrations.AlterField(
+            model_name='savedtopology',
+            name='topology_blob',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name='saved_topologies', to='nextbox_ui_plugin.topologyblob',
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nextbox_ui_plugin', '0005_remove_savedtopology_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopologyLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('query_digest', models.CharField(max_length=64)),
+                ('layout', models.CharField(max_length=30)),
+                ('query', models.JSONField(default=list)),
+                ('positions', models.JSONField(default=dict)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('query_digest', 'layout'),
+                        name='nextbox_ui_plugin_topologylayout_unique_query_layout',
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -1,7 +1,12 @@
+from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from utilities.querysets import RestrictedQuerySet
 from django.conf import settings
 from packaging import version
+import functools
+import hashlib
+import json
+import zlib
 
 NETBOX_CURRENT_VERSION = version.parse(settings.VERSION)
 
@@ -11,11 +16,68 @@ def get_user_model():
     else:
         return 'users.NetBoxUser'
 
+def encode_topology_json(data):
+    """Canonical JSON encoding, equal documents get equal bytes and digests."""
+    return json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class TopologyBlobManager(models.Manager):
+
+    def get_or_create_for_data(self, data):
+        """Return the TopologyBlob storing the JSON document, created once per content."""
+        content = encode_topology_json(data)
+        blob, _ = self.get_or_create(
+            digest=hashlib.sha256(content).hexdigest(),
+            defaults={'data': zlib.compress(content), 'size': len(content)},
+        )
+        return blob
+
+    def delete_unused(self, blob_ids):
+        """Delete the blobs no SavedTopology refers to anymore."""
+        self.filter(
+            pk__in=blob_ids, saved_topologies__isnull=True, saved_layouts__isnull=True,
+        ).delete()
+
+
+class TopologyBlob(models.Model):
+    """
+    zlib-compressed JSON document of saved topologies and layouts,
+    deduplicated by the SHA-256 digest of its canonical encoding.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()
+    # Size of the uncompressed JSON
+    size = models.PositiveIntegerField()
+
+    objects = TopologyBlobManager()
+
+    def __str__(self):
+        return self.digest
+
+    def load(self):
+        return json.loads(zlib.decompress(self.data))
+
+
 class SavedTopology(models.Model):
 
     name = models.CharField(max_length=100, blank=True)
-    topology = models.JSONField()
-    layout_context = models.JSONField(null=True, blank=True)
+    # Topology and layout documents are kept in blobs, so saved topologies
+    # are listed without loading them
+    topology_blob = models.ForeignKey(
+        to=TopologyBlob,
+        on_delete=models.PROTECT,
+        related_name='saved_topologies',
+    )
+    layout_blob = models.ForeignKey(
+        to=TopologyBlob,
+        on_delete=models.PROTECT,
+        related_name='saved_layouts',
+        blank=True,
+        null=True,
+    )
+    node_count = models.PositiveIntegerField(default=0)
+    edge_count = models.PositiveIntegerField(default=0)
     created_by = models.ForeignKey(
         to=get_user_model(),
         on_delete=models.CASCADE,
@@ -26,5 +88,133 @@ class SavedTopology(models.Model):
 
     objects = RestrictedQuerySet.as_manager()
 
+    class Meta:
+        ordering = ('-timestamp', '-pk')
+
     def __str__(self):
         return str(self.name)
+
+    @functools.cached_property
+    def topology(self):
+        return self.topology_blob.load()
+
+    @functools.cached_property
+    def layout_context(self):
+        return self.layout_blob.load() if self.layout_blob_id else None
+
+    def set_topology(self, topology):
+        self.topology_blob = TopologyBlob.objects.get_or_create_for_data(topology)
+        self.node_count = len(topology.get('nodes', []))
+        self.edge_count = len(topology.get('edges', []))
+        self.__dict__['topology'] = topology
+
+    def set_layout_context(self, layout_context):
+        self.layout_blob = (
+            None if layout_context is None
+            else TopologyBlob.objects.get_or_create_for_data(layout_context)
+        )
+        self.__dict__['layout_context'] = layout_context
+
+
+class DeviceAdjacency(models.Model):
+    """
+    Materialized adjacency of devices, kept in sync with Cables and CablePaths
+    by signals, so a topology is rendered from one indexed query.
+
+    Cable rows link the first A and B terminations of complete Cables.
+    Devices are null on ends terminated on objects without a Device
+    (Circuit Terminations, Power Feeds).
+    Logical rows link the ends of multi-cable Interface paths traced
+    from interface_a, path_cable_ids are the Cables of the path hops.
+    """
+
+    cable = models.ForeignKey(
+        to='dcim.Cable',
+        on_delete=models.CASCADE,
+        related_name='+',
+        blank=True,
+        null=True,
+    )
+    is_logical = models.BooleanField(default=False)
+    device_a = models.ForeignKey(
+        to='dcim.Device',
+        on_delete=models.CASCADE,
+        related_name='+',
+        blank=True,
+        null=True,
+    )
+    interface_a_type = models.ForeignKey(
+        to='contenttypes.ContentType',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    interface_a_id = models.PositiveBigIntegerField()
+    interface_a = models.CharField(max_length=64)
+    device_b = models.ForeignKey(
+        to='dcim.Device',
+        on_delete=models.CASCADE,
+        related_name='+',
+        blank=True,
+        null=True,
+    )
+    interface_b_type = models.ForeignKey(
+        to='contenttypes.ContentType',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    interface_b_id = models.PositiveBigIntegerField()
+    interface_b = models.CharField(max_length=64)
+    path_cable_ids = ArrayField(
+        base_field=models.PositiveBigIntegerField(),
+        blank=True,
+        default=list,
+    )
+
+    class Meta:
+        ordering = ('is_logical', 'cable', 'interface_a_id')
+        indexes = (
+            models.Index(fields=('device_a', 'device_b'), name='nextbox_ui_adjacency_a_b_idx'),
+            models.Index(fields=('device_b', 'device_a'), name='nextbox_ui_adjacency_b_a_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('cable',),
+                condition=models.Q(is_logical=False),
+                name='nextbox_ui_plugin_deviceadjacency_unique_cable',
+            ),
+            # A path is traced once per origin Interface
+            models.UniqueConstraint(
+                fields=('interface_a_type', 'interface_a_id'),
+                condition=models.Q(is_logical=True),
+                name='nextbox_ui_plugin_deviceadjacency_unique_path_origin',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.device_a_id}:{self.interface_a} - {self.device_b_id}:{self.interface_b}'
+
+
+class TopologyLayout(models.Model):
+    """
+    Node coordinates of the topology of a filter query, laid out with the layout algorithm.
+    Page loads reuse them and lay out only the nodes added since.
+    """
+
+    # SHA-256 digest of the normalized filter query
+    query_digest = models.CharField(max_length=64)
+    layout = models.CharField(max_length=30)
+    query = models.JSONField(default=list)
+    # {"node_id": [x, y]}
+    positions = models.JSONField(default=dict)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('query_digest', 'layout'),
+                name='nextbox_ui_plugin_topologylayout_unique_query_layout',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.layout} {self.query_digest}'
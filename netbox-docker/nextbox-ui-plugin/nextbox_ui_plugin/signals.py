@@ -0,0 +1,238 @@
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_save
+from circuits.models import CircuitTermination
+from dcim.models import (
+    Cable, CablePath, CableTermination, ConsolePort, ConsoleServerPort, Device, FrontPort,
+    Interface, PowerFeed, PowerOutlet, PowerPort, RearPort,
+)
+from dcim.utils import decompile_path_node
+from django.contrib.contenttypes.models import ContentType
+from extras.models import SavedFilter, Tag, TaggedItem
+from .cache import invalidate_topology_cache, touch_site_topologies
+from .jobs import TOPOLOGY_PRECOMPUTE_ENABLE, enqueue_topology_precompute
+from .models import DeviceAdjacency, SavedTopology, TopologyBlob
+from .topology import (
+    rebuild_device_adjacency, sync_cable_adjacency, sync_path_adjacency, sync_termination_name,
+)
+
+
+# Changes of these objects affect rendered topologies
+TOPOLOGY_MODELS = (
+    Device,
+    Cable,
+    CableTermination,
+    Interface,
+    Tag,
+    TaggedItem,
+    SavedFilter,
+)
+
+# Cabled objects, their names are kept in the adjacency table
+CABLED_MODELS = (
+    CircuitTermination,
+    ConsolePort,
+    ConsoleServerPort,
+    FrontPort,
+    Interface,
+    PowerFeed,
+    PowerOutlet,
+    PowerPort,
+    RearPort,
+)
+
+# Cabled objects renamed along with their adjacency rows.
+# Circuit Terminations have no name of their own.
+NAMED_CABLED_MODELS = tuple(model for model in CABLED_MODELS if model is not CircuitTermination)
+
+
+def handle_cable_change(sender, instance, **kwargs):
+    """
+    Sync the adjacency of the changed Cable within the transaction of the change,
+    so it's committed along with it.
+    """
+    cable_id = instance.pk if isinstance(instance, Cable) else instance.cable_id
+    if cable_id:
+        sync_cable_adjacency([cable_id])
+
+
+def handle_cable_termination_saved(sender, instance, created, **kwargs):
+    """
+    NetBox creates and deletes CableTerminations as Cable ends change,
+    saves of existing ones leave the adjacency as it is.
+    """
+    if created:
+        handle_cable_change(sender, instance)
+
+
+def remember_termination_name(sender, instance, update_fields=None, **kwargs):
+    """Keep the name of the cabled object being saved, so a rename is synced to its adjacency."""
+    if instance.pk and (update_fields is None or 'name' in update_fields):
+        instance._nextbox_original_name = (
+            sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+        )
+
+
+def handle_termination_rename(sender, instance, created, **kwargs):
+    """Update the name of a renamed cabled object in the adjacency table."""
+    original_name = getattr(instance, '_nextbox_original_name', None)
+    if created or original_name is None or original_name == instance.name:
+        return
+    sync_termination_name(instance)
+    transaction.on_commit(invalidate_topology_cache)
+
+
+def handle_cable_path_change(sender, instance, **kwargs):
+    """
+    Sync the logical adjacency of the path origins once the change is committed.
+    Without a transaction it's synced right away, before NetBox links the origins
+    of a saved CablePath to it, so they are traced from the saved CablePath.
+    """
+    if not instance.path:
+        return
+    interface_type_id = ContentType.objects.get_for_model(Interface).pk
+    origins = [decompile_path_node(node) for node in instance.path[0]]
+    interface_ids = [object_id for type_id, object_id in origins if type_id == interface_type_id]
+    if not interface_ids:
+        return
+    # Deleted CablePaths are no longer traced, origins keep their current path if they have one
+    cable_path_id = instance.pk if kwargs['signal'] is post_save else None
+    transaction.on_commit(lambda: sync_path_adjacency_and_invalidate(interface_ids, cable_path_id))
+
+
+def sync_path_adjacency_and_invalidate(interface_ids, cable_path_id=None):
+    sync_path_adjacency(interface_ids, cable_path_id)
+    invalidate_topology_cache()
+
+
+def populate_device_adjacency(sender, **kwargs):
+    """
+    Fill the adjacency table after the migration creating it. Cable paths are traced
+    with the live models, so it's done once all migrations are applied.
+    manage.py rebuild_topology_adjacency rebuilds a populated table.
+    """
+    if DeviceAdjacency._meta.db_table not in connection.introspection.table_names():
+        return
+    if DeviceAdjacency.objects.exists() or not Cable.objects.exists():
+        return
+    rebuild_device_adjacency()
+
+
+def handle_topology_change(sender, **kwargs):
+    """
+    Invalidate cached topologies once the change is committed,
+    so a concurrent rebuild can't cache pre-change data.
+    """
+    transaction.on_commit(invalidate_topology_cache)
+
+    site_ids = get_changed_site_ids(kwargs.get('instance'))
+    if site_ids:
+        transaction.on_commit(lambda: handle_site_topologies_change(site_ids))
+
+
+def get_changed_site_ids(instance):
+    """IDs of Sites whose topology is affected by the changed object."""
+    site_ids = set()
+    if isinstance(instance, Device):
+        site_ids.add(instance.site_id)
+        # Device moved to another Site
+        original_site_id = getattr(instance, '_nextbox_original_site_id', None)
+        if original_site_id is not None:
+            site_ids.add(original_site_id)
+    elif isinstance(instance, Interface):
+        site_ids.add(
+            Device.objects.filter(pk=instance.device_id).values_list('site_id', flat=True).first()
+        )
+    elif isinstance(instance, CableTermination):
+        site_ids.add(instance._site_id)
+    elif isinstance(instance, Cable):
+        site_ids.update(
+            CableTermination.objects.filter(cable=instance).values_list('_site_id', flat=True)
+        )
+    site_ids.discard(None)
+    return site_ids
+
+
+def handle_site_topologies_change(site_ids):
+    """Mark precomputed Site topologies stale and queue their rebuild."""
+    touch_site_topologies(site_ids)
+    if TOPOLOGY_PRECOMPUTE_ENABLE:
+        for site_id in site_ids:
+            enqueue_topology_precompute('site', site_id)
+
+
+def delete_saved_topology_blobs(sender, instance, **kwargs):
+    """Delete the documents of a deleted SavedTopology unless other ones share them."""
+    TopologyBlob.objects.delete_unused(
+        {instance.topology_blob_id, instance.layout_blob_id} - {None}
+    )
+
+
+def remember_device_site(sender, instance, **kwargs):
+    """Keep the Site of the Device being saved, so its old Site topology gets rebuilt too."""
+    if instance.pk:
+        instance._nextbox_original_site_id = (
+            Device.objects.filter(pk=instance.pk).values_list('site_id', flat=True).first()
+        )
+
+
+# Connected first, so the adjacency is synced before cached topologies are invalidated
+for model in (Cable, CableTermination, *CABLED_MODELS):
+    post_delete.connect(
+        handle_cable_change, sender=model,
+        dispatch_uid=f'nextbox_ui_plugin_{model._meta.model_name}_adjacency_deleted',
+    )
+
+post_save.connect(
+    handle_cable_termination_saved, sender=CableTermination,
+    dispatch_uid='nextbox_ui_plugin_cabletermination_adjacency_saved',
+)
+
+for model in NAMED_CABLED_MODELS:
+    pre_save.connect(
+        remember_termination_name, sender=model,
+        dispatch_uid=f'nextbox_ui_plugin_{model._meta.model_name}_name',
+    )
+    post_save.connect(
+        handle_termination_rename, sender=model,
+        dispatch_uid=f'nextbox_ui_plugin_{model._meta.model_name}_adjacency_saved',
+    )
+
+post_save.connect(
+    handle_cable_path_change, sender=CablePath,
+    dispatch_uid='nextbox_ui_plugin_cablepath_adjacency_saved',
+)
+post_delete.connect(
+    handle_cable_path_change, sender=CablePath,
+    dispatch_uid='nextbox_ui_plugin_cablepath_adjacency_deleted',
+)
+
+for model in TOPOLOGY_MODELS:
+    post_save.connect(
+        handle_topology_change, sender=model,
+        dispatch_uid=f'nextbox_ui_plugin_{model._meta.model_name}_saved',
+    )
+    post_delete.connect(
+        handle_topology_change, sender=model,
+        dispatch_uid=f'nextbox_ui_plugin_{model._meta.model_name}_deleted',
+    )
+
+post_delete.connect(
+    delete_saved_topology_blobs, sender=SavedTopology,
+    dispatch_uid='nextbox_ui_plugin_savedtopology_deleted',
+)
+
+pre_save.connect(
+    remember_device_site, sender=Device,
+    dispatch_uid='nextbox_ui_plugin_device_site',
+)
+
+m2m_changed.connect(
+    handle_topology_change, sender=Device.tags.through,
+    dispatch_uid='nextbox_ui_plugin_device_tags_changed',
+)
+
+post_migrate.connect(
+    populate_device_adjacency, sender=apps.get_app_config('nextbox_ui_plugin'),
+    dispatch_uid='nextbox_ui_plugin_populate_adjacency',
+)
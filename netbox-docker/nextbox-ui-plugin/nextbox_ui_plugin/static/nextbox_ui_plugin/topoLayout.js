@@ -0,0 +1,213 @@
+// topoLayout.js
+// Node positions stored on the server per filter query and layout algorithm.
+// Repeat page loads place known nodes where they were and lay out only the new ones,
+// instead of running the whole layout again.
+
+// Stored positions are reused if they cover at least that share of the nodes
+const STORED_LAYOUT_MIN_COVERAGE = 0.5;
+// Distance of new nodes from their placed neighbors
+const NEW_NODE_DISTANCE = 150;
+// Browsers limit keepalive request bodies to 64 KiB
+const KEEPALIVE_MAX_BODY = 60000;
+// Layouts computed by the server are awaited that long, then topologies are laid out here
+const PRECOMPUTED_LAYOUT_TIMEOUT = 60000;
+const PRECOMPUTED_LAYOUT_POLL_INTERVAL = 2000;
+
+
+class TopologyLayoutStore {
+    constructor(layoutURL, layout) {
+        this.layoutURL = layoutURL;
+        this.layout = layout;
+        // Positions applied to the topology, { "node_id": [x, y] }
+        this.positions = null;
+        // JSON of the last stored positions, to skip saving unchanged ones
+        this.storedJSON = null;
+    }
+
+    getURL() {
+        const url = new URL(this.layoutURL, window.location.href);
+        url.searchParams.set('layout', this.layout);
+        return url;
+    }
+
+    // Fetch stored positions, null if there are none or they can't be loaded
+    async load() {
+        if (!this.layoutURL) return null;
+        try {
+            const response = await fetch(this.getURL(), {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' },
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const { positions } = await response.json();
+            if (positions) this.storedJSON = JSON.stringify(positions);
+            return positions;
+        } catch (error) {
+            console.warn('Failed to load stored layout:', error);
+            return null;
+        }
+    }
+
+    // Have the server lay out the topology and wait for the positions,
+    // null if the server doesn't compute layouts or they aren't done in time
+    async loadPrecomputed() {
+        if (!this.layoutURL) return null;
+        try {
+            const response = await fetch(this.getURL(), {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: {
+                    'Accept': 'application/json',
+                    'X-CSRFToken': window.netbox_csrf_token,
+                },
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const { positions, pending } = await response.json();
+            if (!pending) {
+                if (positions) this.storedJSON = JSON.stringify(positions);
+                return positions;
+            }
+        } catch (error) {
+            console.warn('Failed to request layout computation:', error);
+            return null;
+        }
+        const deadline = Date.now() + PRECOMPUTED_LAYOUT_TIMEOUT;
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, PRECOMPUTED_LAYOUT_POLL_INTERVAL));
+            const positions = await this.load();
+            if (positions) return positions;
+        }
+        return null;
+    }
+
+    // Set coordinates of the topology data nodes from stored positions, new nodes
+    // are placed around their neighbors. Returns false, leaving the data unchanged,
+    // if the positions cover too few nodes to be reused.
+    applyTo(data, positions) {
+        if (!positions || !data.nodes.length) return false;
+        const known = data.nodes.filter(node => positions[node.id]);
+        if (known.length < data.nodes.length * STORED_LAYOUT_MIN_COVERAGE) return false;
+
+        this.positions = {};
+        for (const node of known) this.positions[node.id] = positions[node.id];
+
+        const neighbors = new Map(data.nodes.map(node => [node.id, []]));
+        for (const edge of data.edges) {
+            neighbors.get(edge.source)?.push(edge.target);
+            neighbors.get(edge.target)?.push(edge.source);
+        }
+        // New nodes next to placed ones are placed first, so chains of them spread outwards
+        let pending = data.nodes.filter(node => !this.positions[node.id]);
+        while (pending.length) {
+            const unplaced = [];
+            for (const node of pending) {
+                const placed = neighbors.get(node.id).map(id => this.positions[id]).filter(Boolean);
+                if (placed.length) {
+                    this.positions[node.id] = this.placeNear(placed);
+                } else {
+                    unplaced.push(node);
+                }
+            }
+            if (unplaced.length === pending.length) {
+                // Not connected to placed nodes, lined up below the topology
+                this.placeBelow(unplaced);
+                break;
+            }
+            pending = unplaced;
+        }
+
+        for (const node of data.nodes) {
+            const [x, y] = this.positions[node.id];
+            node.coord = { x, y };
+        }
+        return true;
+    }
+
+    // Position around the centroid of the given positions
+    placeNear(positions) {
+        const x = positions.reduce((sum, p) => sum + p[0], 0) / positions.length;
+        const y = positions.reduce((sum, p) => sum + p[1], 0) / positions.length;
+        const angle = Math.random() * 2 * Math.PI;
+        return [x + Math.cos(angle) * NEW_NODE_DISTANCE, y + Math.sin(angle) * NEW_NODE_DISTANCE];
+    }
+
+    placeBelow(nodes) {
+        const placed = Object.values(this.positions);
+        const minX = placed.length ? Math.min(...placed.map(p => p[0])) : 0;
+        const maxY = placed.length ? Math.max(...placed.map(p => p[1])) : 0;
+        nodes.forEach((node, i) => {
+            this.positions[node.id] = [minX + i * NEW_NODE_DISTANCE, maxY + NEW_NODE_DISTANCE];
+        });
+    }
+
+    // Call callback once the initial layout of a topology created with
+    // TopoSphere.create() is applied. It's applied once node icons are loaded,
+    // which may happen after create() resolves.
+    afterInitialLayout(topology, callback) {
+        if (topology.touchHandler) {
+            callback();
+            return;
+        }
+        const applyLayout = topology.applyLayout;
+        topology.applyLayout = function (...args) {
+            topology.applyLayout = applyLayout;
+            const result = applyLayout.apply(this, args);
+            callback();
+            return result;
+        };
+    }
+
+    // Move nodes to the applied positions, the initial layout only fits them into the view
+    restore(topology) {
+        for (const node of topology.nodes) {
+            const position = this.positions[node.id];
+            if (!position) continue;
+            const [x, y] = position;
+            node.coord = { x, y };
+            node.startPosition = { x, y };
+            node.targetPosition = { x, y };
+            node.resetLabelPosition?.();
+        }
+        topology.edges.forEach(edge => edge.updateInterfaceLabels?.());
+        topology.zoomToFit();
+    }
+
+    // Positions of the rendered nodes. Layouts are animated towards
+    // the target positions, which are the final ones right after a layout.
+    getPositions(topology, useTarget = false) {
+        const positions = {};
+        for (const node of topology.nodes) {
+            const { x, y } = (useTarget && node.targetPosition) || node.coord;
+            if (Number.isFinite(x) && Number.isFinite(y)) {
+                positions[node.id] = [Math.round(x * 10) / 10, Math.round(y * 10) / 10];
+            }
+        }
+        return positions;
+    }
+
+    // Store node positions unless they are stored already.
+    // keepalive lets the request complete while the page is being closed.
+    async save(topology, { useTarget = false, keepalive = false } = {}) {
+        if (!this.layoutURL) return;
+        const positionsJSON = JSON.stringify(this.getPositions(topology, useTarget));
+        if (positionsJSON === this.storedJSON) return;
+        const body = `{"positions": ${positionsJSON}}`;
+        try {
+            const response = await fetch(this.getURL(), {
+                method: 'PUT',
+                credentials: 'same-origin',
+                keepalive: keepalive && body.length <= KEEPALIVE_MAX_BODY,
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json',
+                    'X-CSRFToken': window.netbox_csrf_token,
+                },
+                body,
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            this.storedJSON = positionsJSON;
+        } catch (error) {
+            console.warn('Failed to store layout:', error);
+        }
+    }
+}
@@ -34,17 +34,68 @@ function initNBColorModeToggle() {
     })
 }
 
-function initTopoSphere(config) {
+function initTopoSphere(config, hasStoredLayout) {
     // Create the topology visualization
     TopoSphere.create('topology-container', config)
     .then(instance => {
         window.topoSphere = instance;
         console.log('TopoSphere initialized and available as window.topoSphere');
+        initLayoutPersistence(instance.topology, hasStoredLayout);
     })
     .catch(error => console.error('Initialization failed:', error));
 }
 
-const topologyData = window.topologyData;
+// Move nodes to their stored positions or store the computed ones,
+// and store positions changed by dragging nodes when the page is left
+function initLayoutPersistence(topology, hasStoredLayout) {
+    const layoutStore = window.topologyLayoutStore;
+    layoutStore.afterInitialLayout(topology, () => {
+        if (hasStoredLayout) {
+            topology.config.layoutConfigAlgorithm.layout = layoutStore.layout;
+            layoutStore.restore(topology);
+        }
+        // New nodes have been placed or the whole topology laid out
+        layoutStore.save(topology, { useTarget: true });
+    });
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') layoutStore.save(topology, { keepalive: true });
+    });
+}
+
+// Config of a topology with stored node positions. Layered layout is the fast one,
+// nodes are moved to their stored positions right after it.
+function withStoredLayout(config) {
+    return {
+        ...config,
+        layoutConfigAlgorithm: { ...config.layoutConfigAlgorithm, layout: 'layered' },
+    };
+}
+
+// Fetch topology from the API so the page renders before the graph is built,
+// the response is parsed in the topology worker
+async function fetchTopologyData(url) {
+    // Worker resolves relative URLs against its own script URL
+    const { data, version, stale } = await window.topoWorker.call('fetchTopology', [new URL(url, window.location.href).href]);
+    // Version is used to request topology changes later on
+    window.topologyVersion = version;
+    setTopologyStale(stale);
+    return data;
+}
+
+// Dispatched by setTopologyStale when the topology becomes stale or is rebuilt
+const TOPOLOGY_STALE_EVENT = 'nextbox:topologystale';
+
+// Show whether the topology is a stale snapshot being rebuilt on the server side
+function setTopologyStale(stale) {
+    window.topologyStale = stale;
+    const indicator = document.getElementById('topology-stale');
+    if (indicator) indicator.hidden = !stale;
+    document.dispatchEvent(new CustomEvent(TOPOLOGY_STALE_EVENT, { detail: { stale } }));
+}
+
+// Topology and status data are processed off the main thread
+window.topoWorker = new TopoWorkerClient(window.topoWorkerURL);
+
 const initialLayout = window.initialLayout || 'forceDirected'; // 'layered' or 'forceDirected'
 
 let themeName = 'network-blue';
@@ -53,7 +104,6 @@ if (detectNBColorMode() === 'dark') {
 }
 
 const config = {
-    data: topologyData,
     theme: themeName,
     layoutConfigAlgorithm: {
         layout: initialLayout,
@@ -71,8 +121,26 @@ const config = {
     },
 };
 
-// Initialize topoSphere
-initTopoSphere(config);
+// Node positions stored for the topology, see topoLayout.js
+window.topologyLayoutStore = new TopologyLayoutStore(window.topologyLayoutURL, initialLayout);
+
+// Initialize topoSphere once topology data and its stored layout are loaded
+Promise.all([fetchTopologyData(window.topologyDataURL), window.topologyLayoutStore.load()])
+    .then(async ([topologyData, positions]) => {
+        window.topologyData = topologyData;
+        // Large topologies are laid out by the server if it computes layouts
+        const precomputeMinNodes = Number(window.topologyLayoutPrecomputeMinNodes) || 0;
+        if (!positions && precomputeMinNodes && topologyData.nodes.length >= precomputeMinNodes) {
+            positions = await window.topologyLayoutStore.loadPrecomputed();
+        }
+        // Only new nodes are laid out if positions are stored
+        const hasStoredLayout = window.topologyLayoutStore.applyTo(topologyData, positions);
+        initTopoSphere(
+            { ...(hasStoredLayout ? withStoredLayout(config) : config), data: topologyData },
+            hasStoredLayout,
+        );
+    })
+    .catch(error => console.error('Failed to load topology data:', error));
 
 // Initialize NB Color Mode Toggle handler
 initNBColorModeToggle();
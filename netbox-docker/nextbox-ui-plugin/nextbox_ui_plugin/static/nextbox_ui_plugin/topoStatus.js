@@ -0,0 +1,326 @@
+// topoStatus.js
+// Topology and status data processing shared by the page and its Web Worker (topoWorker.js).
+// Nothing here touches the DOM or topoSphere objects.
+
+
+// Compact JSON of the endpoints plugin: keys interned into a string table, rates in bit/s
+const COMPACT_CONTENT_TYPE = 'application/vnd.nextbox.compact+json';
+const RATE_UNITS = ['bit/s', 'kbit/s', 'Mbit/s', 'Gbit/s', 'Tbit/s'];
+
+// Status data key -> endpoint name
+const STATUS_ENDPOINTS = {
+    alertsData: 'alerts',
+    bwData: 'bw',
+};
+
+function decodeCompact({ strings, data }) {
+    const decode = value => {
+        if (Array.isArray(value)) return value.map(decode);
+        if (value && typeof value === 'object') {
+            return Object.fromEntries(Object.entries(value).map(([key, item]) => [strings[key], decode(item)]));
+        }
+        return value;
+    };
+    return decode(data);
+}
+
+// Format bit/s the same way as the telemetry services, e.g. '3.5 Mbit/s'
+function formatRate(bps) {
+    let value = bps;
+    let unit = 0;
+    while (Math.abs(value) >= 1000 && unit < RATE_UNITS.length - 1) {
+        value /= 1000;
+        unit++;
+    }
+    return `${Math.round(value * 10) / 10} ${RATE_UNITS[unit]}`;
+}
+
+// Deep equality of decoded JSON values
+function isSameData(a, b) {
+    if (a === b) return true;
+    if (!a || !b || typeof a !== 'object' || typeof b !== 'object') return false;
+    const keys = Object.keys(a);
+    if (keys.length !== Object.keys(b).length) return false;
+    return keys.every(key => isSameData(a[key], b[key]));
+}
+
+// Fetch and parse topology data, returns { data, version, stale }
+async function fetchTopologyJSON(url) {
+    const response = await fetch(url, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' },
+    });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    // Version is used to request topology changes later on,
+    // stale topologies are being rebuilt on the server side
+    return {
+        data: await response.json(),
+        version: response.headers.get('X-Topology-Version'),
+        stale: response.headers.get('X-Topology-Stale') === 'true',
+    };
+}
+
+
+// Keeps the last applied status of every device and turns raw poll responses
+// and stream events into lists of changes for the rendered topology:
+//   { nodes: [[device_name, status], ...], edges: [[edge_key, status, label_a, label_b], ...] }
+// Only nodes and edges of devices whose data has changed are listed.
+class StatusReconciler {
+    constructor() {
+        // Device names of the rendered topology
+        this.devices = new Set();
+        // Map of { "device_name": [edge_ends, ...] } of edges attached to the device,
+        // where edge_ends are [edge_key, source, source_interface, target, target_interface]
+        this.edgesByName = new Map();
+        // Last applied status data, { "alertsData": Map of { "device_name": device_data or null }, ... }
+        this.statusData = Object.fromEntries(Object.keys(STATUS_ENDPOINTS).map(key => [key, new Map()]));
+        // { "endpoint": { "device_name": device_data } } of the status stream, null without the stream
+        this.streamState = null;
+    }
+
+    // Set the rendered topology, { devices: [device_name, ...], edges: [edge_ends, ...] }.
+    // Status of changed devices, with a new node or changed edges, is applied again.
+    setTopology({ devices, edges }, changed) {
+        this.devices = new Set(devices);
+        this.edgesByName = new Map();
+        for (const ends of edges) {
+            for (const deviceName of new Set([ends[1], ends[3]])) {
+                if (!this.edgesByName.has(deviceName)) this.edgesByName.set(deviceName, []);
+                this.edgesByName.get(deviceName).push(ends);
+            }
+        }
+
+        changed = new Set(changed);
+        for (const state of Object.values(this.statusData)) {
+            for (const deviceName of state.keys()) {
+                if (changed.has(deviceName) || !this.devices.has(deviceName)) state.delete(deviceName);
+            }
+        }
+        // Polled devices get their status on the next poll, streamed ones won't be sent again
+        return this.reconcile(this.streamState ? this.getStreamData(changed) : {});
+    }
+
+    // Apply poll responses of device chunks, [{ devices, compact, body }, ...] with JSON bodies
+    // as ArrayBuffers, or null for failed requests. Devices of failed requests keep their status.
+    // Alerts polled with 'since' are changes after that revision, see elk_alerts get_changes().
+    // Returns { changes, failed, revisions } with the alerts revision token of every response or null.
+    applyPoll(responses) {
+        const decoder = new TextDecoder();
+        let failed = false;
+        const chunks = [];
+        const revisions = responses.map(() => null);
+        responses.forEach((response, index) => {
+            if (!response) {
+                failed = true;
+                return;
+            }
+            try {
+                const data = JSON.parse(decoder.decode(response.body));
+                chunks.push({ index, devices: response.devices, data: response.compact ? decodeCompact(data) : data });
+            } catch (error) {
+                console.warn('Failed to parse nodes data:', error);
+                failed = true;
+            }
+        });
+
+        const topologyData = {};
+        for (const [key, endpoint] of Object.entries(STATUS_ENDPOINTS)) {
+            topologyData[key] = new Map();
+            for (const { index, devices, data } of chunks) {
+                const endpointData = data[endpoint];
+                if (!endpointData || endpointData.error) {
+                    if (endpointData?.error) console.warn(`Failed to fetch ${key}:`, endpointData.error);
+                    failed = true;
+                    continue;
+                }
+                if (key === 'alertsData' && typeof endpointData.revision === 'string') {
+                    // Devices missing from the changes keep their status, unless all are listed
+                    const changed = endpointData.devices || {};
+                    for (const deviceName of devices) {
+                        if (deviceName in changed) topologyData[key].set(deviceName, changed[deviceName]);
+                        else if (endpointData.full) topologyData[key].set(deviceName, null);
+                    }
+                    revisions[index] = endpointData.revision;
+                    continue;
+                }
+                for (const deviceName of devices) {
+                    topologyData[key].set(deviceName, endpointData[deviceName] ?? null);
+                }
+            }
+        }
+        return { changes: this.reconcile(topologyData), failed, revisions };
+    }
+
+    // Apply an 'update' event of the status stream, the full state if resync is set
+    applyStreamUpdate(eventData, resync) {
+        const delta = JSON.parse(eventData);
+        if (resync || !this.streamState) this.streamState = {};
+        this.applyDelta(delta);
+        // Only devices of the delta have changed, except after (re)connecting
+        const deviceNames = new Set(resync ? this.devices : []);
+        if (!resync) {
+            for (const devices of Object.values(delta)) {
+                for (const deviceName of Object.keys(devices)) deviceNames.add(deviceName);
+            }
+        }
+        return this.reconcile(this.getStreamData(deviceNames));
+    }
+
+    resetStream() {
+        this.streamState = {};
+    }
+
+    // Merge changed entries into the stream state, null values are removed entries.
+    // Changed device entries are replaced, as the applied ones are kept for comparison.
+    applyDelta(delta) {
+        for (const [endpoint, devices] of Object.entries(delta)) {
+            const endpointState = this.streamState[endpoint] ??= {};
+            for (const [deviceName, deviceData] of Object.entries(devices)) {
+                const current = endpointState[deviceName];
+                if (deviceData === null) {
+                    delete endpointState[deviceName];
+                } else if (current && typeof current === 'object' && typeof deviceData === 'object' && !Array.isArray(deviceData)) {
+                    const merged = { ...current };
+                    for (const [key, value] of Object.entries(deviceData)) {
+                        if (value === null) delete merged[key];
+                        else merged[key] = value;
+                    }
+                    endpointState[deviceName] = merged;
+                } else {
+                    endpointState[deviceName] = deviceData;
+                }
+            }
+        }
+    }
+
+    // Status data of the given devices from the stream state
+    getStreamData(deviceNames) {
+        const topologyData = {};
+        for (const [key, endpoint] of Object.entries(STATUS_ENDPOINTS)) {
+            const endpointState = this.streamState[endpoint] || {};
+            topologyData[key] = new Map(Array.from(deviceNames, deviceName => [deviceName, endpointState[deviceName] ?? null]));
+        }
+        return topologyData;
+    }
+
+    // Store status data, { "alertsData": Map of { "device_name": device_data or null }, ... },
+    // and list changes of nodes and edges of devices whose data differs from the stored one
+    reconcile(topologyData) {
+        const changedNodes = new Set();
+        const changedEdges = new Set();
+
+        for (const [key, devices] of Object.entries(topologyData)) {
+            const state = this.statusData[key];
+            if (!state) continue;
+            for (const [deviceName, deviceData] of devices) {
+                if (!this.devices.has(deviceName)) continue;
+                if (state.has(deviceName) && isSameData(state.get(deviceName), deviceData)) continue;
+                state.set(deviceName, deviceData);
+                if (key === 'alertsData') changedNodes.add(deviceName);
+                for (const ends of this.edgesByName.get(deviceName) || []) changedEdges.add(ends);
+            }
+        }
+
+        const alerts = this.statusData.alertsData;
+        return {
+            nodes: Array.from(changedNodes, deviceName => [deviceName, alerts.get(deviceName)?.status || "ok"]),
+            edges: Array.from(changedEdges, ends => this.getEdgeStatus(ends)),
+        };
+    }
+
+    getEdgeStatus([edgeKey, source, sourceInterface, target, targetInterface]) {
+        const alerts = this.statusData.alertsData;
+        const bw = this.statusData.bwData;
+
+        // Determine edge status from alerts data
+        const edgeStatus = alerts.get(source)?.interfaces?.[sourceInterface]
+                        ?? alerts.get(target)?.interfaces?.[targetInterface]
+                        ?? "ok";
+
+        // Get bandwidth values
+        let speedA = bw.get(source)?.[sourceInterface]?.out ?? bw.get(target)?.[targetInterface]?.in;
+        if (typeof speedA === 'number') speedA = formatRate(speedA);
+        const labelA = speedA ? `${sourceInterface} -> ${speedA}` : sourceInterface;
+
+        let speedB = bw.get(target)?.[targetInterface]?.out ?? bw.get(source)?.[sourceInterface]?.in;
+        if (typeof speedB === 'number') speedB = formatRate(speedB);
+        const labelB = speedB ? `${targetInterface} -> ${speedB}` : targetInterface;
+
+        return [edgeKey, edgeStatus, labelA, labelB];
+    }
+}
+
+
+// Calls made to the worker, run in the worker and in the page when workers are not available
+class TopoWorkerHandler {
+    static METHODS = ['setTopology', 'applyPoll', 'applyStreamUpdate', 'resetStream'];
+
+    constructor() {
+        this.reconciler = new StatusReconciler();
+    }
+
+    handle(method, args) {
+        if (method === 'fetchTopology') return fetchTopologyJSON(...args);
+        if (!TopoWorkerHandler.METHODS.includes(method)) throw new Error(`Unknown method '${method}'`);
+        return this.reconciler[method](...args);
+    }
+}
+
+
+// Page side of the worker, every call returns a promise of its result
+class TopoWorkerClient {
+    constructor(workerURL) {
+        this.worker = null;
+        this.handler = null;
+        this.nextId = 1;
+        // Map of { request_id: { resolve, reject } } of calls waiting for the worker
+        this.requests = new Map();
+        // Last topology set, to be set again if the worker fails
+        this.topologyArgs = null;
+
+        if (workerURL && window.Worker) {
+            try {
+                this.worker = new Worker(workerURL);
+                this.worker.addEventListener('message', event => this.onMessage(event.data));
+                this.worker.addEventListener('error', event => this.onError(event));
+            } catch (error) {
+                console.warn('Web Worker is not available, processing data in the page:', error);
+                this.worker = null;
+            }
+        }
+        if (!this.worker) this.handler = new TopoWorkerHandler();
+    }
+
+    call(method, args = [], transfer = []) {
+        if (method === 'setTopology') this.topologyArgs = args;
+        if (!this.worker) {
+            return Promise.resolve().then(() => this.handler.handle(method, args));
+        }
+        const id = this.nextId++;
+        return new Promise((resolve, reject) => {
+            this.requests.set(id, { resolve, reject });
+            this.worker.postMessage({ id, method, args }, transfer);
+        });
+    }
+
+    onMessage({ id, result, error }) {
+        const request = this.requests.get(id);
+        if (!request) return;
+        this.requests.delete(id);
+        if (error) request.reject(new Error(error));
+        else request.resolve(result);
+    }
+
+    // Worker failed to load or crashed, continue in the page
+    onError(event) {
+        console.error('Topology worker failed, processing data in the page:', event.message);
+        this.worker.terminate();
+        this.worker = null;
+        this.handler = new TopoWorkerHandler();
+        if (this.topologyArgs) this.handler.handle('setTopology', this.topologyArgs);
+        for (const request of this.requests.values()) {
+            request.reject(new Error('Topology worker failed'));
+        }
+        this.requests.clear();
+    }
+}
@@ -1,9 +1,122 @@
+// Dispatched on the document when nodes or edges of the rendered topology are changed
+const TOPOLOGY_CHANGE_EVENT = 'nextbox:topologychange';
+// Stale topologies are checked for their rebuilt version more often
+const STALE_POLL_INTERVAL = 5000;
+
+// Lookup tables of the rendered topology. They are built once and rebuilt only when
+// nodes or edges are added, removed or modified, instead of on every status update.
+class TopologyIndex {
+    constructor() {
+        this.nodes = null;
+        this.edges = null;
+        this.nodeCount = 0;
+        this.edgeCount = 0;
+        this.isStale = true;
+        // Map of { "device_name": node_object }
+        this.nodesByName = new Map();
+        // Map of { "device_name": [edge_ends, ...] } of edges attached to the device, where edge_ends
+        // are { key, edge, source, sourceInterface, target, targetInterface } with device names
+        this.edgesByName = new Map();
+        // Map of { edge_key: edge_ends }
+        this.edgesByKey = new Map();
+        // Edge keys are kept for the edge objects' lifetime, the status worker refers to edges by them
+        this.edgeKeys = new WeakMap();
+        this.nextEdgeKey = 1;
+        document.addEventListener(TOPOLOGY_CHANGE_EVENT, () => { this.isStale = true; });
+    }
+
+    // Rebuild the tables if the topology has changed. Returns names of devices
+    // with a new node or changed edges, null if the tables are up to date.
+    refresh(topology) {
+        const { nodes, edges } = topology;
+        if (!this.isStale && nodes === this.nodes && edges === this.edges
+            && nodes.length === this.nodeCount && edges.length === this.edgeCount) {
+            return null;
+        }
+
+        const nodesByName = new Map(nodes.map(node => [node.customAttributes.name, node]));
+        const edgesByName = new Map();
+        const edgesByKey = new Map();
+        for (const edge of edges) {
+            let key = this.edgeKeys.get(edge);
+            if (key === undefined) {
+                key = this.nextEdgeKey++;
+                this.edgeKeys.set(edge, key);
+            }
+            const ends = {
+                key,
+                edge,
+                source: edge.sourceNode.customAttributes.name,
+                sourceInterface: edge.sourceNodeInterface,
+                target: edge.targetNode.customAttributes.name,
+                targetInterface: edge.targetNodeInterface,
+            };
+            edgesByKey.set(key, ends);
+            for (const deviceName of new Set([ends.source, ends.target])) {
+                if (!edgesByName.has(deviceName)) edgesByName.set(deviceName, []);
+                edgesByName.get(deviceName).push(ends);
+            }
+        }
+
+        const changed = new Set();
+        for (const [deviceName, node] of nodesByName) {
+            const previousEdges = this.edgesByName.get(deviceName) || [];
+            const currentEdges = edgesByName.get(deviceName) || [];
+            if (this.nodesByName.get(deviceName) !== node
+                || previousEdges.length !== currentEdges.length
+                || currentEdges.some((ends, i) => ends.edge !== previousEdges[i].edge)) {
+                changed.add(deviceName);
+            }
+        }
+
+        Object.assign(this, {
+            nodes, edges, nodesByName, edgesByName, edgesByKey,
+            nodeCount: nodes.length,
+            edgeCount: edges.length,
+            isStale: false,
+        });
+        return changed;
+    }
+
+    // Topology as set in the StatusReconciler
+    describe() {
+        return {
+            devices: Array.from(this.nodesByName.keys()),
+            edges: Array.from(this.edgesByKey.values(), ({ key, source, sourceInterface, target, targetInterface }) =>
+                [key, source, sourceInterface, target, targetInterface]
+            ),
+        };
+    }
+}
+
+// Devices are requested in parallel chunks of this size
+const DEVICE_CHUNK_SIZE = 500;
+
+// Polling backs off exponentially up to this interval (ms) while upstreams fail
+const MAX_BACKOFF_INTERVAL = 5 * 60 * 1000;
+
+// Nodes within this share of the viewport size around it are polled as visible
+const VIEWPORT_MARGIN = 0.2;
+
 class NodeStatusPoller {
     constructor(nbEnpointsURL, pollInterval) {
         this.nbEnpointsURL = nbEnpointsURL;
         this.pollInterval = pollInterval;
         this.isPolling = false;
+        this.isFetching = false;
         this.pollTimer = null;
+        // Number of consecutive polls with failed upstreams
+        this.failures = 0;
+        // Map of { "device_a,device_b": subscription_id } of the requested device chunks
+        this.subscriptions = new Map();
+        // Map of { "device_a,device_b": revision } of the last alerts polled for the device chunks,
+        // later polls get only alerts changed after it. Revisions are opaque "<epoch>:<n>" tokens,
+        // those of a restarted service get all alerts again.
+        this.alertsRevisions = new Map();
+        this.index = new TopologyIndex();
+        // Status data is parsed and compared with the applied one in the topology worker
+        this.worker = window.topoWorker || new TopoWorkerClient();
+        this.onVisibilityChange = this.onVisibilityChange.bind(this);
     }
 
     // Start polling
@@ -11,25 +124,92 @@ class NodeStatusPoller {
         if (this.isPolling) return;
 
         this.isPolling = true;
+        document.addEventListener('visibilitychange', this.onVisibilityChange);
         this.poll();
     }
 
     // Stop polling
     stop() {
         this.isPolling = false;
+        document.removeEventListener('visibilitychange', this.onVisibilityChange);
         if (this.pollTimer) {
             clearTimeout(this.pollTimer);
             this.pollTimer = null;
         }
     }
 
-    // Get topology Nodes and return a map of { "device_name": node_object }
-    getNodes() {
-        if (!window.topoSphere?.topology?.nodes) {
+    // Polling is paused while the tab is hidden and resumed right away when it's shown
+    onVisibilityChange() {
+        if (!this.isPolling) return;
+        if (document.hidden) {
+            clearTimeout(this.pollTimer);
+            this.pollTimer = null;
+        } else if (!this.pollTimer && !this.isFetching) {
+            this.poll();
+        }
+    }
+
+    // Poll interval, backed off with jitter after failed polls
+    getPollDelay() {
+        if (!this.failures) return this.pollInterval;
+        const delay = Math.min(this.pollInterval * 2 ** this.failures, MAX_BACKOFF_INTERVAL);
+        return delay * (0.8 + Math.random() * 0.4);
+    }
+
+    // Nodes in the current viewport and their peers over edges, as { "device_name": node_object }
+    getVisibleNodes(topologyNodes, topologyEdges) {
+        const topology = window.topoSphere?.topology;
+        const canvas = topology?.canvas;
+        if (!canvas?.width || !canvas?.height || !topology.zoom) return topologyNodes;
+
+        // Canvas pixels = panOffset + coord * zoom * dpr
+        const scale = topology.zoom * (topology.dpr || 1);
+        const width = canvas.width / scale;
+        const height = canvas.height / scale;
+        const left = -topology.panOffset.x / scale - width * VIEWPORT_MARGIN;
+        const top = -topology.panOffset.y / scale - height * VIEWPORT_MARGIN;
+        const right = left + width * (1 + 2 * VIEWPORT_MARGIN);
+        const bottom = top + height * (1 + 2 * VIEWPORT_MARGIN);
+
+        const visibleIds = new Set();
+        for (const node of topologyNodes.values()) {
+            const { x, y } = node.coord || {};
+            // Nodes without a position yet are treated as visible
+            if (!Number.isFinite(x) || (x >= left && x <= right && y >= top && y <= bottom)) {
+                visibleIds.add(node.id);
+            }
+        }
+        // Peers are needed for status and labels of edges leaving the viewport
+        const polledIds = new Set(visibleIds);
+        for (const edge of topologyEdges) {
+            if (visibleIds.has(edge.sourceNode.id)) polledIds.add(edge.targetNode.id);
+            if (visibleIds.has(edge.targetNode.id)) polledIds.add(edge.sourceNode.id);
+        }
+        return new Map([...topologyNodes].filter(([, node]) => polledIds.has(node.id)));
+    }
+
+    // Get the topology index, rebuilt if the topology has changed since the last call
+    getIndex() {
+        const topology = window.topoSphere?.topology;
+        if (!topology?.nodes || !topology?.edges) {
             console.error('Nodes are not available');
-            return new Map();
+            return null;
+        }
+        const changed = this.index.refresh(topology);
+        if (changed) {
+            // Status of changed devices is forgotten by the worker, all alerts are polled again
+            this.alertsRevisions.clear();
+            // Status of new nodes and edges is applied on the next update of their devices
+            this.worker.call('setTopology', [this.index.describe(), Array.from(changed)])
+                .then(changes => this.updateTopologyStatus(changes))
+                .catch(error => console.error('Error setting topology of status updates:', error));
         }
-        return new Map(window.topoSphere.topology.nodes.map(node => [node.customAttributes.name, node]));
+        return this.index;
+    }
+
+    // Get topology Nodes as a map of { "device_name": node_object }, the map must not be modified
+    getNodes() {
+        return this.getIndex()?.nodesByName ?? new Map();
     }
 
     // Get topology Edges
@@ -41,94 +221,126 @@ class NodeStatusPoller {
         return window.topoSphere.topology.edges;
     }
 
-    // Fetch status for nodes from multiple endpoints
+    // Split sorted device names into chunks of DEVICE_CHUNK_SIZE
+    static getDeviceChunks(deviceNames) {
+        const sorted = Array.from(deviceNames).sort();
+        const chunks = [];
+        for (let i = 0; i < sorted.length; i += DEVICE_CHUNK_SIZE) {
+            chunks.push(sorted.slice(i, i + DEVICE_CHUNK_SIZE));
+        }
+        return chunks;
+    }
+
+    // Post the device set once, polls reference it by the returned subscription id
+    async subscribe(deviceNames) {
+        const key = deviceNames.join(",");
+        if (this.subscriptions.has(key)) return this.subscriptions.get(key);
+
+        const res = await fetch(`${this.nbEnpointsURL}/`, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': window.netbox_csrf_token,
+            },
+            body: JSON.stringify({ device: deviceNames }),
+        });
+        if (!res.ok) throw new Error(`Subscription failed with HTTP ${res.status}`);
+        const { subscription } = await res.json();
+        this.subscriptions.set(key, subscription);
+        return subscription;
+    }
+
+    // Fetch a chunk of devices, subscribing again if the subscription has expired.
+    // Alerts are requested as changes since the last polled revision, all of them at first.
+    // Returns { devices, compact, body } with the unparsed body, parsed in the worker.
+    async fetchChunk(deviceNames, endpointNames) {
+        const since = encodeURIComponent(this.alertsRevisions.get(deviceNames.join(",")) ?? 0);
+        const request = async () => {
+            const subscription = await this.subscribe(deviceNames);
+            const url = `${this.nbEnpointsURL}/?endpoint=${endpointNames.join(",")}&subscription=${subscription}&since=${since}`;
+            return fetch(url, { headers: { 'Accept': COMPACT_CONTENT_TYPE } });
+        };
+        let res = await request();
+        if (res.status === 404) {
+            this.subscriptions.delete(deviceNames.join(","));
+            res = await request();
+        }
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return {
+            devices: deviceNames,
+            compact: Boolean(res.headers.get('Content-Type')?.startsWith(COMPACT_CONTENT_TYPE)),
+            body: await res.arrayBuffer(),
+        };
+    }
+
+    // Fetch status for nodes from multiple endpoints with combined requests of device chunks.
+    // Returns the changes to apply, devices of failed requests keep their last status.
     async fetchNodesData(topologyNodes) {
         try {
-            let result = {};
-            const nodesFilter = Array.from(topologyNodes.keys()).join(",");
-    
-            const endpoints = {
-                alertsData: `${this.nbEnpointsURL}/?endpoint=alerts&device=${nodesFilter}`,
-                bwData: `${this.nbEnpointsURL}/?endpoint=bw&device=${nodesFilter}`,
-            };
-    
-            // Fetch all endpoints in parallel and process responses together
-            const responses = await Promise.all(
-                Object.entries(endpoints).map(async ([key, url]) => {
-                    try {
-                        const res = await fetch(url);
-                        if (!res.ok) throw new Error(`HTTP ${res.status}`);
-                        return [key, await res.json()];
-                    } catch (err) {
-                        console.warn(`Failed to fetch ${key}:`, err);
-                        return [key, {}]; // Return an empty object on failure
-                    }
-                })
+            const chunks = NodeStatusPoller.getDeviceChunks(topologyNodes.keys());
+            // Forget subscriptions of device sets no longer displayed
+            const chunkKeys = new Set(chunks.map(chunk => chunk.join(",")));
+            for (const key of this.subscriptions.keys()) {
+                if (!chunkKeys.has(key)) this.subscriptions.delete(key);
+            }
+            for (const key of this.alertsRevisions.keys()) {
+                if (!chunkKeys.has(key)) this.alertsRevisions.delete(key);
+            }
+
+            const endpointNames = Object.values(STATUS_ENDPOINTS);
+            const chunkResults = await Promise.allSettled(
+                chunks.map(chunk => this.fetchChunk(chunk, endpointNames))
             );
-    
-            // Convert response array into an object
-            for (const [key, jsonData] of responses) {
-                result[key] = Object.fromEntries(
-                    Object.entries(jsonData)
-                        .map(([deviceName, deviceData]) => 
-                            [topologyNodes.get(deviceName)?.id, deviceData]
-                        )
-                        .filter(([deviceId]) => deviceId)
-                );
-            }
-    
-            return result;
+            const responses = chunkResults.map(chunkResult => {
+                if (chunkResult.status === 'fulfilled') return chunkResult.value;
+                console.warn('Failed to fetch nodes data:', chunkResult.reason);
+                return null;
+            });
+
+            // Bodies are moved to the worker without copying
+            const bodies = responses.filter(Boolean).map(response => response.body);
+            const { changes, failed, revisions } = await this.worker.call('applyPoll', [responses], bodies);
+            this.failures = failed ? this.failures + 1 : 0;
+            revisions.forEach((revision, i) => {
+                if (revision !== null) this.alertsRevisions.set(chunks[i].join(","), revision);
+            });
+
+            return changes;
         } catch (error) {
             console.error('Unexpected error fetching node data:', error);
-            return {};
+            return { nodes: [], edges: [] };
         }
     }
-    
-    
 
-    // Update node statuses in topology
-    updateTopologyStatus(topologyNodes, topologyEdges, topologyData) {
-        const { alertsData, bwData } = topologyData;
-    
+    // Apply changes listed by the StatusReconciler,
+    // { nodes: [[device_name, status], ...], edges: [[edge_key, status, label_a, label_b], ...] }
+    updateTopologyStatus({ nodes, edges }) {
+        const index = this.index;
+
         // Process node statuses
-        topologyNodes.forEach((node, nodeName) => {
+        for (const [deviceName, nodeStatus] of nodes) {
             try {
-                let nodeStatus = alertsData?.[node.id]?.status || "ok";
-                if (node.status !== nodeStatus) {
+                const node = index.nodesByName.get(deviceName);
+                if (node && node.status !== nodeStatus) {
                     node.setStatus(nodeStatus);
                 }
             } catch (error) {
-                console.error(`Error updating status for node ${nodeName}:`, error);
+                console.error(`Error updating status for node ${deviceName}:`, error);
             }
-        });
-    
+        }
+
         // Process edge statuses and bandwidth updates
-        topologyEdges.forEach(edge => {
+        for (const [edgeKey, edgeStatus, labelA, labelB] of edges) {
             try {
-                const sourceDeviceId = edge.sourceNode.id;
-                const targetDeviceId = edge.targetNode.id;
-                const sourceInterface = edge.sourceNodeInterface;
-                const targetInterface = edge.targetNodeInterface;
-    
-                // Determine edge status from alertsData
-                let edgeStatus = alertsData?.[sourceDeviceId]?.interfaces?.[sourceInterface] 
-                              ?? alertsData?.[targetDeviceId]?.interfaces?.[targetInterface]
-                              ?? "ok";
-    
+                const ends = index.edgesByKey.get(edgeKey);
+                if (!ends) continue;
+                const { edge, sourceInterface, targetInterface } = ends;
                 if (edge.status !== edgeStatus) {
                     edge.setStatus(edgeStatus);
                 }
-    
-                // Get bandwidth values
-                let speedA = bwData?.[sourceDeviceId]?.[sourceInterface]?.out
-                          ?? bwData?.[targetDeviceId]?.[targetInterface]?.in;
-                let labelA = speedA ? `${sourceInterface} -> ${speedA}` : sourceInterface;
-
-                let speedB = bwData?.[targetDeviceId]?.[targetInterface]?.out
-                          ?? bwData?.[sourceDeviceId]?.[sourceInterface]?.in;
-                let labelB = speedB ? `${targetInterface} -> ${speedB}` : targetInterface;
-                
-                // Function to update interface label and expansion state
+
+                // Update interface label and expansion state
                 for (const [iface, newLabel] of [
                     [edge.sourceNode.interfaces[sourceInterface], labelA],
                     [edge.targetNode.interfaces[targetInterface], labelB]
@@ -138,39 +350,317 @@ class NodeStatusPoller {
                         newLabel.includes(" -> ") ? iface.expand() : iface.collapse();
                     }
                 }
-    
             } catch (error) {
                 console.error(`Error updating status or bandwidth for edge`, error);
             }
-        });
+        }
     }
-    
-    // Main polling function
-    async poll() {
-        if (!this.isPolling) return;
 
+    // Fetch and apply status of the nodes in the viewport
+    async pollNodes() {
         try {
-            // Get Nodes and Edges
-            const nodeList = this.getNodes();
-            const edgeList = this.getEdges();
+            const nodeList = this.getVisibleNodes(this.getNodes(), this.getEdges());
             if (!nodeList.size) return;
-            const statusData = await this.fetchNodesData(nodeList);
-            this.updateTopologyStatus(nodeList, edgeList, statusData);
+            const changes = await this.fetchNodesData(nodeList);
+            this.updateTopologyStatus(changes);
         } catch (error) {
             console.error('Error during polling:', error);
+        }
+    }
+
+    // Main polling function
+    async poll() {
+        this.pollTimer = null;
+        if (!this.isPolling || document.hidden) return;
+
+        this.isFetching = true;
+        try {
+            await this.pollNodes();
         } finally {
+            this.isFetching = false;
             // Schedule next poll if still active
+            if (this.isPolling && !document.hidden) {
+                this.pollTimer = setTimeout(() => this.poll(), this.getPollDelay());
+            }
+        }
+    }
+}
+
+
+// Receives status updates pushed by the endpoints plugin over Server-Sent Events
+// instead of polling. The stream is reopened when the set of rendered nodes changes.
+// Status is polled from nbEnpointsURL while the server doesn't serve the stream.
+class NodeStatusStream extends NodeStatusPoller {
+    constructor(nbEndpointsStreamURL, nbEnpointsURL, checkInterval) {
+        super(nbEnpointsURL, checkInterval);
+        this.nbEndpointsStreamURL = nbEndpointsStreamURL;
+        this.eventSource = null;
+        this.nodesFilter = null;
+        // Next update is the full state of the stream
+        this.isResync = false;
+        // Time (ms) the stream closed by the server is retried at
+        this.streamRetryAt = 0;
+    }
+
+    start() {
+        if (this.isPolling) return;
+
+        this.isPolling = true;
+        this.connect();
+    }
+
+    stop() {
+        super.stop();
+        this.close();
+    }
+
+    close() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        this.nodesFilter = null;
+        this.worker.call('resetStream').catch(() => {});
+    }
+
+    // Open the stream for the rendered nodes and keep checking them for changes
+    async connect() {
+        if (!this.isPolling) return;
+
+        try {
+            if (document.hidden) {
+                // No stream while the tab is hidden, reopened on the first check after it's shown
+                this.close();
+                return;
+            }
+            if (Date.now() < this.streamRetryAt) {
+                await this.pollNodes();
+                return;
+            }
+            const deviceNames = Array.from(this.getNodes().keys()).sort();
+            const nodesFilter = deviceNames.join(",");
+            if (nodesFilter !== this.nodesFilter) {
+                this.close();
+                this.nodesFilter = nodesFilter;
+                if (nodesFilter) {
+                    this.subscriptions.clear();
+                    const subscription = await this.subscribe(deviceNames);
+                    if (this.nodesFilter !== nodesFilter) return;
+                    const url = `${this.nbEndpointsStreamURL}/?endpoint=${Object.values(STATUS_ENDPOINTS).join(",")}&subscription=${subscription}`;
+                    const eventSource = new EventSource(url);
+                    this.eventSource = eventSource;
+                    // Server sends the full state again on every (re)connect
+                    eventSource.addEventListener('open', () => { this.isResync = true; });
+                    eventSource.addEventListener('update', event => this.onUpdate(event.data));
+                    // Server has no stream slot left or the stream went idle
+                    eventSource.addEventListener('close', event => {
+                        if (this.eventSource !== eventSource) return;
+                        const { reason, retry } = JSON.parse(event.data);
+                        console.info(`Status stream closed (${reason}), polling for ${retry}s`);
+                        this.close();
+                        this.streamRetryAt = Date.now() + retry * 1000;
+                    });
+                    eventSource.addEventListener('error', () => {
+                        if (eventSource.readyState === EventSource.CLOSED && this.eventSource === eventSource) {
+                            // Reconnect rejected (e.g. expired subscription), subscribe again on the next check
+                            this.close();
+                        } else {
+                            console.warn('Status stream interrupted, reconnecting');
+                        }
+                    });
+                }
+            }
+        } catch (error) {
+            // Retry on the next check
+            this.nodesFilter = null;
+            console.error('Error opening status stream:', error);
+        } finally {
+            this.pollTimer = setTimeout(() => this.connect(), this.getPollDelay());
+        }
+    }
+
+    // Event data is parsed and merged into the stream state in the worker
+    async onUpdate(eventData) {
+        try {
+            // Keep the topology set in the worker up to date
+            this.getIndex();
+            const resync = this.isResync;
+            this.isResync = false;
+            const changes = await this.worker.call('applyStreamUpdate', [eventData, resync]);
+            this.updateTopologyStatus(changes);
+        } catch (error) {
+            console.error('Error applying status update:', error);
+        }
+    }
+}
+
+
+class TopologyChangesPoller {
+    // Without pollInterval topology changes are polled only while the topology is stale
+    constructor(changesURL, pollInterval) {
+        this.changesURL = changesURL;
+        this.pollInterval = pollInterval;
+        this.isPolling = false;
+        this.pollTimer = null;
+        document.addEventListener(TOPOLOGY_STALE_EVENT, ({ detail }) => {
+            if (detail.stale) this.start();
+        });
+    }
+
+    getInterval() {
+        if (!window.topologyStale) return this.pollInterval;
+        return this.pollInterval > 0 ? Math.min(this.pollInterval, STALE_POLL_INTERVAL) : STALE_POLL_INTERVAL;
+    }
+
+    start() {
+        if (this.isPolling) return;
+        const interval = this.getInterval();
+        if (!(interval > 0)) return;
+
+        this.isPolling = true;
+        this.pollTimer = setTimeout(() => this.poll(), interval);
+    }
+
+    stop() {
+        this.isPolling = false;
+        if (this.pollTimer) {
+            clearTimeout(this.pollTimer);
+            this.pollTimer = null;
+        }
+    }
+
+    // Same key as get_edge_key() on the server side
+    static edgeKey(source, sourceInterface, target, targetInterface, isLogical) {
+        return [source, sourceInterface, target, targetInterface, isLogical ? 'logical' : 'cable'].join('|');
+    }
+
+    // Map of { "edge_key": [edge_object, ...] } of the rendered topology
+    getEdgesByKey(topology) {
+        const edgesByKey = new Map();
+        for (const edge of topology.edges) {
+            const key = TopologyChangesPoller.edgeKey(
+                edge.sourceNode.id, edge.sourceNodeInterface,
+                edge.targetNode.id, edge.targetNodeInterface,
+                // Logical edge flag is not kept by topoSphere edges
+                edge.customAttributes?.name === 'Multi-Cable Connection'
+            );
+            if (!edgesByKey.has(key)) edgesByKey.set(key, []);
+            edgesByKey.get(key).push(edge);
+        }
+        return edgesByKey;
+    }
+
+    async fetchChanges(since) {
+        const res = await fetch(`${this.changesURL}&since=${encodeURIComponent(since)}`, {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' },
+        });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return res.json();
+    }
+
+    // Apply added, modified and removed nodes and edges to the rendered topology
+    async applyChanges(topology, changes) {
+        const { nodes, edges } = changes;
+        const edgesByKey = this.getEdgesByKey(topology);
+
+        for (const edgeData of edges.removed) {
+            const key = TopologyChangesPoller.edgeKey(
+                edgeData.source, edgeData.sourceInterface,
+                edgeData.target, edgeData.targetInterface, edgeData.isLogicalMultiCable
+            );
+            const edge = edgesByKey.get(key)?.shift();
+            if (edge) topology.removeEdge(edge.id);
+        }
+
+        for (const nodeId of nodes.removed) {
+            topology.removeNode(nodeId);
+        }
+
+        for (const nodeData of nodes.modified) {
+            const node = topology.nodes.find(n => n.id === nodeData.id);
+            if (!node) continue;
+            node.customAttributes = nodeData.customAttributes;
+            node.layer = nodeData.layer;
+            node.labelText = nodeData.label;
+            if (node.iconName !== nodeData.iconName) {
+                node.iconName = nodeData.iconName;
+                node.loadIcon();
+            }
+        }
+
+        // New nodes are placed in the center of the currently rendered ones
+        const rendered = topology.nodes.filter(n => Number.isFinite(n.coord?.x));
+        const center = {
+            x: rendered.reduce((sum, n) => sum + n.coord.x, 0) / (rendered.length || 1),
+            y: rendered.reduce((sum, n) => sum + n.coord.y, 0) / (rendered.length || 1),
+        };
+        for (const nodeData of nodes.added) {
+            await topology.addNode({ coord: { ...center }, ...nodeData });
+        }
+
+        for (const edgeData of edges.modified) {
+            const key = TopologyChangesPoller.edgeKey(
+                edgeData.source, edgeData.sourceInterface,
+                edgeData.target, edgeData.targetInterface, edgeData.isLogicalMultiCable
+            );
+            const edge = edgesByKey.get(key)?.[0];
+            if (edge) edge.customAttributes = edgeData.customAttributes;
+        }
+
+        for (const edgeData of edges.added) {
+            topology.addEdge(edgeData);
+        }
+
+        document.dispatchEvent(new Event(TOPOLOGY_CHANGE_EVENT));
+        topology.scheduleRender();
+    }
+
+    async poll() {
+        if (!this.isPolling) return;
+
+        try {
+            const topology = window.topoSphere?.topology;
+            if (!topology || !window.topologyVersion) return;
+            const changes = await this.fetchChanges(window.topologyVersion);
+            if (changes.full) {
+                // Known version has expired on the server side
+                console.log('Topology has changed, reloading');
+                window.location.reload();
+                return;
+            }
+            if (changes.version !== window.topologyVersion) {
+                await this.applyChanges(topology, changes);
+                window.topologyVersion = changes.version;
+            }
+            if (changes.stale !== window.topologyStale) setTopologyStale(changes.stale);
+        } catch (error) {
+            console.error('Error during topology changes polling:', error);
+        } finally {
             if (this.isPolling) {
-                this.pollTimer = setTimeout(() => this.poll(), this.pollInterval);
+                const interval = this.getInterval();
+                if (interval > 0) {
+                    this.pollTimer = setTimeout(() => this.poll(), interval);
+                } else {
+                    this.isPolling = false;
+                }
             }
         }
     }
 }
 
 
+if (window.topologyChangesURL) {
+    const changesPollIntervalMs = (window.topologyChangesInterval || 0) * 1000;
+    const changesPoller = new TopologyChangesPoller(window.topologyChangesURL, changesPollIntervalMs);
+    changesPoller.start();
+}
+
 if (window.dynamicUpdateEnabled == "True") {
     const pollIntervalMs = window.dynamicUpdateInterval * 1000;  // Convert seconds to milliseconds
-    const poller = new NodeStatusPoller(window.nbEnpointsURL, pollIntervalMs);
+    const poller = (window.nbEndpointsStreamURL && window.nbEnpointsURL && window.EventSource)
+        ? new NodeStatusStream(window.nbEndpointsStreamURL, window.nbEnpointsURL, pollIntervalMs)
+        : new NodeStatusPoller(window.nbEnpointsURL, pollIntervalMs);
     console.log("Start dynamic topology updating");
     poller.start();
 }
@@ -0,0 +1,16 @@
+// topoWorker.js
+// Web Worker parsing topology data and reconciling node status off the main thread,
+// so rendering stays smooth while updates arrive. Called through TopoWorkerClient.
+
+importScripts('topoStatus.js');
+
+const handler = new TopoWorkerHandler();
+
+self.addEventListener('message', async ({ data: { id, method, args } }) => {
+    try {
+        const result = await handler.handle(method, args);
+        self.postMessage({ id, result });
+    } catch (error) {
+        self.postMessage({ id, error: String(error?.message || error) });
+    }
+});
@@ -0,0 +1,89 @@
+from django.http import QueryDict
+from django.test import TestCase
+from dcim.models import (
+    ConsolePort, Device, DeviceRole, DeviceType, Interface, InventoryItem, Manufacturer, Site,
+    SiteGroup,
+)
+from nextbox_ui_plugin.filters import TopologyFilterSet
+from nextbox_ui_plugin.views import get_topology_queryset
+
+
+class TopologyFilterSetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        group = SiteGroup.objects.create(name='group', slug='group')
+        cls.sites = [
+            Site.objects.create(name='site-1', slug='site-1', group=group),
+            Site.objects.create(name='site-2', slug='site-2'),
+        ]
+        manufacturer = Manufacturer.objects.create(name='manufacturer', slug='manufacturer')
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model='model', slug='model',
+        )
+        cls.roles = [
+            DeviceRole.objects.create(name='core', slug='core'),
+            DeviceRole.objects.create(name='access', slug='access'),
+        ]
+        cls.devices = [
+            Device.objects.create(
+                name=f'device-{i}', serial=f'SN{i}', site=cls.sites[i % 2], role=cls.roles[i // 2],
+                device_type=device_type,
+            )
+            for i in range(4)
+        ]
+        Interface.objects.create(device=cls.devices[0], name='eth0', type='1000base-t')
+        Interface.objects.create(device=cls.devices[0], name='eth1', type='1000base-t')
+        ConsolePort.objects.create(device=cls.devices[1], name='con0')
+        for name in ('item-1', 'item-2'):
+            InventoryItem.objects.create(device=cls.devices[2], name=name, serial='INV1')
+
+    def filter(self, **params):
+        data = QueryDict(mutable=True)
+        for key, values in params.items():
+            data.setlist(key, [str(v) for v in values])
+        filterset = TopologyFilterSet(data, Device.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return sorted(device.name for device in filterset.qs)
+
+    def test_site(self):
+        self.assertEqual(self.filter(site=['site-1']), ['device-0', 'device-2'])
+        self.assertEqual(self.filter(site_id=[self.sites[1].pk]), ['device-1', 'device-3'])
+
+    def test_role(self):
+        self.assertEqual(self.filter(role=['core']), ['device-0', 'device-1'])
+        self.assertEqual(self.filter(role_id=[self.roles[1].pk]), ['device-2', 'device-3'])
+
+    def test_excludes(self):
+        self.assertEqual(
+            self.filter(exclude_site_group=[self.sites[0].group_id]), ['device-1', 'device-3'],
+        )
+        self.assertEqual(self.filter(exclude_role=[self.roles[0].pk]), ['device-2', 'device-3'])
+        self.assertEqual(
+            self.filter(exclude_device_id=[self.devices[0].pk, self.devices[3].pk]),
+            ['device-1', 'device-2'],
+        )
+
+    def test_components(self):
+        # Devices with several interfaces are matched once
+        self.assertEqual(self.filter(interfaces=['true']), ['device-0'])
+        self.assertEqual(self.filter(interfaces=['false']), ['device-1', 'device-2', 'device-3'])
+        self.assertEqual(self.filter(console_ports=['true']), ['device-1'])
+
+    def test_search_inventory_serial(self):
+        self.assertEqual(self.filter(q=['INV1']), ['device-2'])
+        self.assertEqual(self.filter(q=['SN3']), ['device-3'])
+
+    def test_invalid_choice(self):
+        data = QueryDict(mutable=True)
+        data.setlist('site', ['missing'])
+        self.assertFalse(TopologyFilterSet(data, Device.objects.all()).is_valid())
+
+    def test_topology_queryset(self):
+        filterset = TopologyFilterSet(QueryDict('name=device-1'), Device.objects.all())
+        # Filtering alone loads whole Devices for other consumers of the filterset
+        self.assertFalse(filterset.qs.first().get_deferred_fields())
+        device = get_topology_queryset(filterset.qs).first()
+        self.assertIn('comments', device.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertEqual((device.role.slug, device.device_type.model), ('core', 'model'))
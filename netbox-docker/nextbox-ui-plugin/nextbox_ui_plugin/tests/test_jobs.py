@@ -0,0 +1,41 @@
+from unittest import mock
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from nextbox_ui_plugin import jobs
+
+
+@mock.patch.object(jobs, 'get_queue')
+class ScheduleTest(SimpleTestCase):
+
+    def setUp(self):
+        cache = LocMemCache('nextbox_ui_plugin.tests', {})
+        patcher = mock.patch.object(jobs, 'cache', cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.clear)
+        jobs._schedule_checked_at = float('-inf')
+
+    def test_schedule_once_per_interval(self, get_queue):
+        jobs.schedule_topology_precompute()
+        jobs.cache.clear()
+        jobs.schedule_topology_precompute()
+        get_queue.return_value.enqueue.assert_called_once_with(
+            jobs.precompute_all_topologies, mock.ANY,
+        )
+
+    def test_single_chain(self, get_queue):
+        self.assertTrue(jobs.hold_schedule('a'))
+        self.assertTrue(jobs.hold_schedule('a'))
+        # Chain started while another one holds the key stops
+        self.assertFalse(jobs.hold_schedule('b'))
+        # The key expired, the next chain to run takes over, the other one stops
+        jobs.cache.delete(jobs.SCHEDULE_KEY)
+        self.assertTrue(jobs.hold_schedule('b'))
+        self.assertFalse(jobs.hold_schedule('a'))
+
+    @mock.patch.object(jobs, 'Site')
+    def test_chain_stops_without_the_key(self, site, get_queue):
+        jobs.cache.set(jobs.SCHEDULE_KEY, 'a')
+        jobs.precompute_all_topologies('b')
+        site.objects.values_list.assert_not_called()
+        get_queue.return_value.enqueue_in.assert_not_called()
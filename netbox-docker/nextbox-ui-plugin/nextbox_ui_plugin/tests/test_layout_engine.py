@@ -0,0 +1,51 @@
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from nextbox_ui_plugin import layout_engine
+
+
+def get_topology(layers, edges=()):
+    return {
+        'nodes': [{'id': f'device-{i}', 'layer': layer} for i, layer in enumerate(layers)],
+        'edges': [{'source': f'device-{a}', 'target': f'device-{b}'} for a, b in edges],
+    }
+
+
+@skipUnless(layout_engine.layout_engine_available(), "NumPy is not installed")
+class LayoutEngineTest(SimpleTestCase):
+
+    def test_empty_topology(self):
+        self.assertEqual(layout_engine.compute_layout(get_topology([]), 'layered'), {})
+
+    def test_layered(self):
+        topology = get_topology([3, 1, 1, 2], [(1, 3), (2, 3), (3, 0)])
+        positions = layout_engine.compute_layout(topology, 'layered')
+        self.assertEqual(set(positions), {'device-0', 'device-1', 'device-2', 'device-3'})
+        # Layers are stacked vertically in ascending order, a single row each
+        y = {node_id: position[1] for node_id, position in positions.items()}
+        row_distance = layout_engine.NODE_DISTANCE + layout_engine.LAYER_DISTANCE
+        self.assertEqual(y['device-1'], y['device-2'])
+        self.assertEqual(y['device-3'] - y['device-1'], row_distance)
+        self.assertEqual(y['device-0'] - y['device-3'], row_distance)
+        self.assertEqual(
+            abs(positions['device-1'][0] - positions['device-2'][0]), layout_engine.NODE_DISTANCE
+        )
+        # Centered around (0, 0)
+        for axis in (0, 1):
+            self.assertAlmostEqual(
+                sum(position[axis] for position in positions.values()), 0, places=0
+            )
+
+    def test_force_directed(self):
+        topology = get_topology([1, 1, 2, 2, 2], [(0, 2), (0, 3), (1, 4), (0, 1), (2, 2)])
+        positions = layout_engine.compute_layout(topology, 'forceDirected', iterations=50)
+        self.assertEqual(len(positions), 5)
+        self.assertEqual(len({tuple(position) for position in positions.values()}), 5)
+        # Runs are deterministic, so stored layouts don't change between rebuilds
+        self.assertEqual(
+            layout_engine.compute_layout(topology, 'forceDirected', iterations=50), positions
+        )
+
+    def test_edges_to_unknown_nodes_are_ignored(self):
+        topology = get_topology([1, 2])
+        topology['edges'].append({'source': 'device-0', 'target': 'device-9'})
+        self.assertEqual(len(layout_engine.compute_layout(topology, 'forceDirected')), 2)
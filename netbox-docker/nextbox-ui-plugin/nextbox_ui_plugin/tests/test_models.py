@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from nextbox_ui_plugin.models import SavedTopology, TopologyBlob
+
+
+TOPOLOGY = {'nodes': [{'id': 'device-1'}, {'id': 'device-2'}], 'edges': [{'source': 'device-1'}]}
+
+
+class TopologyBlobTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user')
+
+    def save_topology(self, topology, layout_context=None):
+        saved_topology = SavedTopology(
+            name='topology', created_by=self.user, timestamp=timezone.now(),
+        )
+        saved_topology.set_topology(topology)
+        saved_topology.set_layout_context(layout_context)
+        saved_topology.save()
+        return saved_topology
+
+    def test_deduplicated_by_content(self):
+        blob = TopologyBlob.objects.get_or_create_for_data(TOPOLOGY)
+        # Same document with keys in another order
+        reordered = {'edges': TOPOLOGY['edges'], 'nodes': TOPOLOGY['nodes']}
+        self.assertEqual(TopologyBlob.objects.get_or_create_for_data(reordered), blob)
+        self.assertNotEqual(TopologyBlob.objects.get_or_create_for_data({'nodes': []}), blob)
+        self.assertEqual(TopologyBlob.objects.get(pk=blob.pk).load(), TOPOLOGY)
+
+    def test_saved_topology(self):
+        saved_topology = self.save_topology(TOPOLOGY, {'layout': 'layered'})
+        saved_topology = SavedTopology.objects.get(pk=saved_topology.pk)
+        self.assertEqual((saved_topology.node_count, saved_topology.edge_count), (2, 1))
+        self.assertEqual(saved_topology.topology, TOPOLOGY)
+        self.assertEqual(saved_topology.layout_context, {'layout': 'layered'})
+
+    def test_shared_blobs_deleted_with_last_topology(self):
+        first = self.save_topology(TOPOLOGY)
+        second = self.save_topology(TOPOLOGY)
+        self.assertEqual(first.topology_blob_id, second.topology_blob_id)
+        self.assertIsNone(first.layout_blob_id)
+
+        first.delete()
+        self.assertTrue(TopologyBlob.objects.filter(pk=second.topology_blob_id).exists())
+        second.delete()
+        self.assertFalse(TopologyBlob.objects.exists())
@@ -0,0 +1,142 @@
+from django.test import SimpleTestCase, TestCase
+from dcim.models import (
+    Cable, Device, DeviceRole, DeviceType, FrontPort, Interface, Manufacturer, RearPort, Site,
+)
+from nextbox_ui_plugin.models import DeviceAdjacency
+from nextbox_ui_plugin.signals import populate_device_adjacency
+from nextbox_ui_plugin.topology import get_edge_key, get_topology_delta
+
+
+class DeviceAdjacencySyncTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        site = Site.objects.create(name='site', slug='site')
+        manufacturer = Manufacturer.objects.create(name='manufacturer', slug='manufacturer')
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model='model', slug='model',
+        )
+        role = DeviceRole.objects.create(name='role', slug='role')
+        cls.devices = {
+            name: Device.objects.create(name=name, site=site, role=role, device_type=device_type)
+            for name in ('a', 'b', 'panel-1', 'panel-2')
+        }
+        cls.interfaces = {
+            name: Interface.objects.create(device=cls.devices[name], name='eth0', type='1000base-t')
+            for name in ('a', 'b')
+        }
+
+    def connect(self, a, b):
+        with self.captureOnCommitCallbacks(execute=True):
+            cable = Cable(a_terminations=[a], b_terminations=[b])
+            cable.save()
+        return cable
+
+    def create_pass_through(self, device):
+        rear_port = RearPort.objects.create(device=device, name='rear1', type='8p8c', positions=1)
+        front_port = FrontPort.objects.create(
+            device=device, name='front1', type='8p8c', rear_port=rear_port, rear_port_position=1,
+        )
+        return front_port, rear_port
+
+    def test_cable(self):
+        cable = self.connect(self.interfaces['a'], self.interfaces['b'])
+        adjacency = DeviceAdjacency.objects.get()
+        self.assertEqual(
+            (adjacency.cable_id, adjacency.is_logical, adjacency.device_a, adjacency.device_b),
+            (cable.pk, False, self.devices['a'], self.devices['b']),
+        )
+        self.assertEqual((adjacency.interface_a, adjacency.interface_b), ('eth0', 'eth0'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cable.delete()
+        self.assertFalse(DeviceAdjacency.objects.exists())
+
+    def test_rename(self):
+        self.connect(self.interfaces['a'], self.interfaces['b'])
+        interface = Interface.objects.get(pk=self.interfaces['b'].pk)
+        interface.name = 'eth1'
+        with self.captureOnCommitCallbacks(execute=True):
+            interface.save()
+        self.assertEqual(DeviceAdjacency.objects.get().interface_b, 'eth1')
+
+    def test_multi_cable_path(self):
+        front_1, rear_1 = self.create_pass_through(self.devices['panel-1'])
+        front_2, rear_2 = self.create_pass_through(self.devices['panel-2'])
+        cables = [
+            self.connect(self.interfaces['a'], front_1),
+            self.connect(rear_1, rear_2),
+            self.connect(front_2, self.interfaces['b']),
+        ]
+        logical = DeviceAdjacency.objects.filter(is_logical=True)
+        # Traced from both ends
+        self.assertEqual(
+            sorted((row.device_a.name, row.device_b.name) for row in logical),
+            [('a', 'b'), ('b', 'a')],
+        )
+        for row in logical:
+            self.assertEqual(sorted(row.path_cable_ids), sorted(cable.pk for cable in cables))
+        self.assertEqual(DeviceAdjacency.objects.filter(is_logical=False).count(), 3)
+
+        # Names of the path ends are synced too
+        interface = Interface.objects.get(pk=self.interfaces['a'].pk)
+        interface.name = 'eth1'
+        with self.captureOnCommitCallbacks(execute=True):
+            interface.save()
+        self.assertEqual(logical.get(device_a=self.devices['a']).interface_a, 'eth1')
+        self.assertEqual(logical.get(device_b=self.devices['a']).interface_b, 'eth1')
+
+        # Path broken in the middle
+        with self.captureOnCommitCallbacks(execute=True):
+            cables[1].delete()
+        self.assertFalse(logical.exists())
+
+    def test_populate_after_migrations(self):
+        self.connect(self.interfaces['a'], self.interfaces['b'])
+        DeviceAdjacency.objects.all().delete()
+        populate_device_adjacency(sender=None)
+        self.assertEqual(DeviceAdjacency.objects.count(), 1)
+
+
+def get_edge(source, target, interface='eth0', **attributes):
+    return {
+        'source': source, 'sourceInterface': interface,
+        'target': target, 'targetInterface': interface,
+        **attributes,
+    }
+
+
+class TopologyDeltaTest(SimpleTestCase):
+
+    def test_nodes(self):
+        old = {'nodes': [{'id': 'device-1'}, {'id': 'device-2', 'label': 'a'}], 'edges': []}
+        new = {'nodes': [{'id': 'device-2', 'label': 'b'}, {'id': 'device-3'}], 'edges': []}
+        self.assertEqual(get_topology_delta(old, new)['nodes'], {
+            'added': [{'id': 'device-3'}],
+            'modified': [{'id': 'device-2', 'label': 'b'}],
+            'removed': ['device-1'],
+        })
+
+    def test_edges(self):
+        cable = get_edge('device-1', 'device-2')
+        logical = get_edge('device-1', 'device-2', isLogicalMultiCable=True)
+        self.assertNotEqual(get_edge_key(cable), get_edge_key(logical))
+        old = {'nodes': [], 'edges': [cable, get_edge('device-1', 'device-3', label='Cable 1')]}
+        new = {'nodes': [], 'edges': [logical, get_edge('device-1', 'device-3', label='Cable 2')]}
+        self.assertEqual(get_topology_delta(old, new)['edges'], {
+            'added': [logical],
+            'modified': [get_edge('device-1', 'device-3', label='Cable 2')],
+            'removed': [cable],
+        })
+
+    def test_parallel_edges(self):
+        # Edges of the same endpoints are compared pairwise
+        edge = get_edge('device-1', 'device-2')
+        old = {'nodes': [], 'edges': [edge]}
+        new = {'nodes': [], 'edges': [edge, edge]}
+        self.assertEqual(get_topology_delta(old, new)['edges'], {
+            'added': [edge], 'modified': [], 'removed': [],
+        })
+        self.assertEqual(get_topology_delta(new, new)['edges'], {
+            'added': [], 'modified': [], 'removed': [],
+        })
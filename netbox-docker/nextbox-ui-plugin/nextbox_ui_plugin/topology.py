@@ -0,0 +1,330 @@
+from collections import Counter, defaultdict
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from dcim.models import Cable, CablePath, CableTermination, Interface
+from dcim.utils import decompile_path_node
+from .models import DeviceAdjacency
+
+
+class CablePathIndex:
+    """
+    Bulk equivalent of Interface.trace() for a set of Interfaces.
+
+    Traces are assembled from the CablePath records NetBox precomputes
+    for every path endpoint instead of tracing each Interface live.
+    CablePaths are loaded with one query per bridged hop and
+    path objects with one query per object type for all paths at once.
+    """
+
+    def __init__(self, interfaces):
+        # interface id -> list of (A terminations, cables, B terminations)
+        self.paths = {}
+        interfaces = {i.pk: i for i in interfaces if i._path_id}
+        if interfaces:
+            self._load(interfaces)
+
+    def _load(self, interfaces):
+        interface_type_id = ContentType.objects.get_for_model(Interface).pk
+        # origin interface id -> path nodes collected so far
+        path_nodes = {}
+        # cable path id -> origin interface ids continuing with the path
+        pending = defaultdict(list)
+        # origin interface id -> cable path ids already followed
+        followed = defaultdict(set)
+        for interface in interfaces.values():
+            path_nodes[interface.pk] = []
+            pending[interface._path_id].append(interface.pk)
+            followed[interface.pk].add(interface._path_id)
+
+        while pending:
+            # destination interface id -> origin interface ids
+            bridged = defaultdict(list)
+            cable_paths = CablePath.objects.filter(pk__in=pending.keys()).only(
+                'path', 'is_complete'
+            )
+            for cable_path in cable_paths:
+                for origin_id in pending[cable_path.pk]:
+                    path = path_nodes[origin_id]
+                    path.extend(cable_path.path)
+                    # If the path ends at a non-connected pass-through port,
+                    # pad out the link and far-end terminations
+                    if len(path) % 3 == 1:
+                        path.extend(([], []))
+                    # If the path ends at a site or provider network,
+                    # inject a null "link" to render an attachment
+                    elif len(path) % 3 == 2:
+                        path.insert(-1, [])
+                    # Check for a bridged relationship to continue the trace
+                    destinations = cable_path.path[-1] if cable_path.is_complete else []
+                    if len(destinations) == 1:
+                        ct_id, object_id = decompile_path_node(destinations[0])
+                        if ct_id == interface_type_id:
+                            bridged[object_id].append(origin_id)
+            pending = defaultdict(list)
+            if not bridged:
+                break
+            bridges = Interface.objects.filter(
+                pk__in=bridged.keys(), bridge___path__isnull=False
+            ).values_list('pk', 'bridge___path')
+            for interface_id, cable_path_id in bridges:
+                for origin_id in bridged[interface_id]:
+                    # Stop on bridge loops
+                    if cable_path_id in followed[origin_id]:
+                        continue
+                    followed[origin_id].add(cable_path_id)
+                    pending[cable_path_id].append(origin_id)
+
+        path_objects = self._get_path_objects(path_nodes.values())
+        for origin_id, path in path_nodes.items():
+            path = [
+                [path_objects[node] for node in step if node in path_objects]
+                for step in path
+            ]
+            # Return the path as a list of three-tuples
+            # (A termination(s), cable(s), B termination(s))
+            self.paths[origin_id] = list(zip(*[iter(path)] * 3))
+
+    @staticmethod
+    def _get_path_objects(paths):
+        """
+        Prefetch objects of all path nodes using one query per model type.
+        Stale (deleted) objects are missing in the result.
+        """
+        to_prefetch = defaultdict(set)
+        for path in paths:
+            for step in path:
+                for node in step:
+                    ct_id, object_id = decompile_path_node(node)
+                    to_prefetch[ct_id].add(object_id)
+        path_objects = {}
+        for ct_id, object_ids in to_prefetch.items():
+            model_class = ContentType.objects.get_for_id(ct_id).model_class()
+            queryset = model_class.objects.filter(pk__in=object_ids)
+            if hasattr(model_class, 'device'):
+                queryset = queryset.select_related('device')
+            for obj in queryset:
+                path_objects[f'{ct_id}:{obj.pk}'] = obj
+        return path_objects
+
+    def trace(self, interface):
+        return self.paths.get(interface.pk, [])
+
+    @staticmethod
+    def get_cable_ids(cable_path):
+        """Hashable key of a traced path: IDs of the Cables of its hops."""
+        return frozenset(step[1][0].pk if step[1] else None for step in cable_path)
+
+
+# Number of Cables or Interfaces loaded at once by a full rebuild
+ADJACENCY_SYNC_BATCH_SIZE = 1000
+
+
+def _get_termination_name(termination):
+    """Name of a terminating object, as stored in the 64 characters long adjacency columns."""
+    return (getattr(termination, 'name', None) or str(termination))[:64]
+
+
+def get_cable_adjacencies(cable_ids):
+    """
+    Return unsaved cable DeviceAdjacency rows of the complete Cables among cable_ids.
+
+    CableTerminations and terminating objects (Interfaces, Front/Rear Ports,
+    Console Ports, etc.) are loaded with one bulk query per object type.
+    A Cable is complete if it has terminations on both of its ends,
+    the first terminating object of each end is linked.
+    """
+    cable_terminations = list(
+        CableTermination.objects.filter(cable_id__in=cable_ids)
+        .order_by('cable_id', 'cable_end', 'pk')
+    )
+
+    # Resolve generic termination objects using one query per object type
+    to_fetch = defaultdict(set)
+    for ct in cable_terminations:
+        to_fetch[ct.termination_type_id].add(ct.termination_id)
+    terminations = {}
+    for termination_type_id, termination_ids in to_fetch.items():
+        model_class = ContentType.objects.get_for_id(termination_type_id).model_class()
+        for obj in model_class.objects.filter(pk__in=termination_ids):
+            terminations[(termination_type_id, obj.pk)] = obj
+
+    # cable id -> {cable end: (termination type id, first terminating object)}
+    cable_ends = defaultdict(dict)
+    for ct in cable_terminations:
+        termination = terminations.get((ct.termination_type_id, ct.termination_id))
+        if termination is None:
+            # Ignore stale (deleted) termination objects
+            continue
+        cable_ends[ct.cable_id].setdefault(ct.cable_end, (ct.termination_type_id, termination))
+
+    adjacencies = []
+    for cable_id, ends in cable_ends.items():
+        if 'A' not in ends or 'B' not in ends:
+            continue
+        (a_type_id, a_termination), (b_type_id, b_termination) = ends['A'], ends['B']
+        adjacencies.append(DeviceAdjacency(
+            cable_id=cable_id,
+            # Circuit Terminations and Power Feeds have no Device
+            device_a_id=getattr(a_termination, 'device_id', None),
+            interface_a_type_id=a_type_id,
+            interface_a_id=a_termination.pk,
+            interface_a=_get_termination_name(a_termination),
+            device_b_id=getattr(b_termination, 'device_id', None),
+            interface_b_type_id=b_type_id,
+            interface_b_id=b_termination.pk,
+            interface_b=_get_termination_name(b_termination),
+        ))
+    return adjacencies
+
+
+def get_path_adjacencies(interfaces):
+    """
+    Return unsaved logical DeviceAdjacency rows of the Interfaces
+    whose (bridged) cable paths span several Cables to another Interface.
+    """
+    interface_type_id = ContentType.objects.get_for_model(Interface).pk
+    cable_path_index = CablePathIndex(interfaces)
+    adjacencies = []
+    for interface in interfaces:
+        cable_path = cable_path_index.trace(interface)
+        # identify segmented cable paths between end-devices
+        if len(cable_path) < 2 or not cable_path[-1][2]:
+            continue
+        far_end = cable_path[-1][2][0]
+        if not isinstance(far_end, Interface):
+            continue
+        adjacencies.append(DeviceAdjacency(
+            is_logical=True,
+            device_a_id=interface.device_id,
+            interface_a_type_id=interface_type_id,
+            interface_a_id=interface.pk,
+            interface_a=_get_termination_name(interface),
+            device_b_id=far_end.device_id,
+            interface_b_type_id=interface_type_id,
+            interface_b_id=far_end.pk,
+            interface_b=_get_termination_name(far_end),
+            path_cable_ids=[cables[0].pk for _, cables, _ in cable_path if cables],
+        ))
+    return adjacencies
+
+
+def _get_path_origins(interface_ids):
+    return list(
+        Interface.objects.filter(pk__in=interface_ids, _path__isnull=False)
+        .only('pk', 'name', 'device', '_path')
+    )
+
+
+def sync_cable_adjacency(cable_ids):
+    """Replace cable DeviceAdjacency rows of the Cables, deleted Cables lose their rows."""
+    cable_ids = set(cable_ids)
+    with transaction.atomic():
+        DeviceAdjacency.objects.filter(is_logical=False, cable_id__in=cable_ids).delete()
+        DeviceAdjacency.objects.bulk_create(get_cable_adjacencies(cable_ids))
+
+
+def sync_path_adjacency(interface_ids, cable_path_id=None):
+    """
+    Replace logical DeviceAdjacency rows of the cable paths traced from the Interfaces.
+    With cable_path_id the Interfaces are traced from that CablePath, as NetBox links
+    the origins of a saved CablePath to it only after its post_save signal.
+    """
+    interface_ids = set(interface_ids)
+    interface_type = ContentType.objects.get_for_model(Interface)
+    if cable_path_id is None:
+        origins = _get_path_origins(interface_ids)
+    else:
+        origins = list(Interface.objects.filter(pk__in=interface_ids).only('pk', 'name', 'device'))
+        for interface in origins:
+            interface._path_id = cable_path_id
+    with transaction.atomic():
+        DeviceAdjacency.objects.filter(
+            is_logical=True, interface_a_type=interface_type, interface_a_id__in=interface_ids,
+        ).delete()
+        DeviceAdjacency.objects.bulk_create(get_path_adjacencies(origins))
+
+
+def sync_termination_name(termination):
+    """Update the name of a renamed cabled object in the DeviceAdjacency rows it's stored in."""
+    termination_type = ContentType.objects.get_for_model(termination)
+    name = _get_termination_name(termination)
+    device_id = getattr(termination, 'device_id', None)
+    for end in ('a', 'b'):
+        rows = DeviceAdjacency.objects.filter(**{
+            f'interface_{end}_type': termination_type, f'interface_{end}_id': termination.pk,
+        })
+        if device_id is not None:
+            # Narrowed down with the device indexes
+            rows = rows.filter(**{f'device_{end}': device_id})
+        rows.update(**{f'interface_{end}': name})
+
+
+def rebuild_device_adjacency(batch_size=ADJACENCY_SYNC_BATCH_SIZE):
+    """Rebuild the whole DeviceAdjacency table, returns the number of rows."""
+    count = 0
+    with transaction.atomic():
+        DeviceAdjacency.objects.all().delete()
+        cable_ids = list(Cable.objects.order_by('pk').values_list('pk', flat=True))
+        for i in range(0, len(cable_ids), batch_size):
+            count += len(DeviceAdjacency.objects.bulk_create(
+                get_cable_adjacencies(cable_ids[i:i + batch_size])
+            ))
+        interface_ids = list(
+            Interface.objects.filter(_path__isnull=False)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        for i in range(0, len(interface_ids), batch_size):
+            count += len(DeviceAdjacency.objects.bulk_create(
+                get_path_adjacencies(_get_path_origins(interface_ids[i:i + batch_size]))
+            ))
+    return count
+
+
+def get_edge_key(edge):
+    """
+    Edges carry no IDs, so they are identified by their endpoints.
+    Returns a string key matching topoUpdate.js edge lookups.
+    """
+    return '|'.join((
+        edge['source'], edge['sourceInterface'],
+        edge['target'], edge['targetInterface'],
+        'logical' if edge.get('isLogicalMultiCable') else 'cable',
+    ))
+
+
+def _index_by_key(objects, get_key):
+    """
+    Index objects by key. Repeated keys get an occurrence number
+    so that duplicate objects are compared pairwise.
+    """
+    seen = Counter()
+    index = {}
+    for obj in objects:
+        key = get_key(obj)
+        index[(key, seen[key])] = obj
+        seen[key] += 1
+    return index
+
+
+def _diff(old_objects, new_objects, get_key):
+    old_index = _index_by_key(old_objects, get_key)
+    new_index = _index_by_key(new_objects, get_key)
+    return {
+        'added': [obj for key, obj in new_index.items() if key not in old_index],
+        'modified': [
+            obj for key, obj in new_index.items() if key in old_index and old_index[key] != obj
+        ],
+        'removed': [obj for key, obj in old_index.items() if key not in new_index],
+    }
+
+
+def get_topology_delta(old_topology, new_topology):
+    """
+    Return added, modified and removed nodes and edges
+    of new_topology compared to old_topology.
+    Removed nodes are listed by their IDs.
+    """
+    nodes = _diff(old_topology['nodes'], new_topology['nodes'], lambda n: n['id'])
+    nodes['removed'] = [node['id'] for node in nodes['removed']]
+    edges = _diff(old_topology['edges'], new_topology['edges'], get_edge_key)
+    return {'nodes': nodes, 'edges': edges}
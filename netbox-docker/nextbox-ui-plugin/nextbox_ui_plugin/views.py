@@ -1,21 +1,48 @@
 #!./venv/bin/python
 
 from django.shortcuts import render
+from django.urls import reverse
 from django.views.generic import View
 from dcim.models import *
 from ipam.models import *
 from circuits.models import *
-from extras.models import SavedFilter
+from extras.models import SavedFilter, Tag, TaggedItem
 from . import forms, filters
+from .layout import get_layout_precompute_min_nodes
+from .models import DeviceAdjacency
+from .cache import (
+    get_cached_topology, get_change_token, get_precomputed_topology, store_precomputed_topology,
+    store_topology_snapshot,
+)
+from .jobs import (
+    enqueue_topology_precompute, get_precompute_query, get_precompute_target,
+    schedule_topology_precompute,
+)
 from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.contrib.contenttypes.models import ContentType
 from django.conf import settings
+from django.db.models import Q
 from packaging import version
+from collections import defaultdict
+import functools
+import hashlib
 import json
+import operator
 import re
 
 
 NETBOX_CURRENT_VERSION = version.parse(settings.VERSION)
 
+if NETBOX_CURRENT_VERSION >= version.parse("4.0.0"):
+    DEVICE_ROLE_FIELD = 'role'
+else:
+    DEVICE_ROLE_FIELD = 'device_role'
+
+# Device columns and related objects rendered by get_topology(),
+# the only ones loaded for the Devices of a topology
+TOPOLOGY_RELATED_FIELDS = (DEVICE_ROLE_FIELD, 'device_type', 'primary_ip4', 'primary_ip6')
+TOPOLOGY_DEVICE_FIELDS = ('id', 'name', 'serial', *TOPOLOGY_RELATED_FIELDS)
+
 # Default NeXt UI icons
 SUPPORTED_ICONS = {
     'network.switch',
@@ -143,8 +170,12 @@ UNDISPLAYED_DEVICE_ROLE_SLUGS = PLUGIN_SETTINGS.get("undisplayed_device_role_slu
 UNDISPLAYED_DEVICE_TAGS = PLUGIN_SETTINGS.get("undisplayed_device_tags", tuple())
 
 # Filter device tags listed in Select Layers menu
-SELECT_LAYERS_LIST_INCLUDE_DEVICE_TAGS = PLUGIN_SETTINGS.get("select_layers_list_include_device_tags", tuple())
-SELECT_LAYERS_LIST_EXCLUDE_DEVICE_TAGS = PLUGIN_SETTINGS.get("select_layers_list_exclude_device_tags", tuple())
+SELECT_LAYERS_LIST_INCLUDE_DEVICE_TAGS = PLUGIN_SETTINGS.get(
+    "select_layers_list_include_device_tags", tuple()
+)
+SELECT_LAYERS_LIST_EXCLUDE_DEVICE_TAGS = PLUGIN_SETTINGS.get(
+    "select_layers_list_exclude_device_tags", tuple()
+)
 
 # Defines the initial layer alignment direction on the view
 INITIAL_LAYOUT = PLUGIN_SETTINGS.get("INITIAL_LAYOUT", 'forceDirected')
@@ -181,39 +212,80 @@ def get_node_layer_sort_preference(device_role):
     return 1
 
 
-def get_icon_type(device_id):
+def normalize_icon_type(icon_type):
+    if icon_type.startswith('network.'):
+        return icon_type
+    return f'network.{icon_type}'
+
+
+# Icon maps precompiled once for the icon lookups below.
+# Model map keeps its order since the first matching
+# model substring wins.
+ICON_MODEL_LOOKUP = tuple(
+    (str(model_base), normalize_icon_type(icon_type))
+    for model_base, icon_type in ICON_MODEL_MAP.items()
+)
+ICON_ROLE_LOOKUP = {
+    str(role_slug): normalize_icon_type(icon_type)
+    for role_slug, icon_type in ICON_ROLE_MAP.items()
+}
+
+
+def get_tag_icon_type(tag_names):
+    """Return icon type from the first supported 'icon_{icon_type}' tag or None."""
+    for tag in tag_names:
+        if 'icon_' in tag:
+            if tag.replace('icon_', 'network.') in SUPPORTED_ICONS:
+                return tag.replace('icon_', 'network.')
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_icon_type(device_model, device_role_slug, tag_icon_type=None):
     """
-    Node icon getter function.
+    Icon lookup memoized per (device model, device role, icon tag).
     Selection order:
     1. Based on 'icon_{icon_type}' tag in Netbox device
     2. Based on Netbox device type and ICON_MODEL_MAP
     3. Based on Netbox device role and ICON_ROLE_MAP
-    4. Default 'undefined'
+    4. Default 'network.unknown'
     """
-    nb_device = Device.objects.get(id=device_id)
-    if NETBOX_CURRENT_VERSION >= version.parse("4.0.0"):
-        device_role_obj = nb_device.role
-    else:
-        device_role_obj = nb_device.device_role
+    if tag_icon_type:
+        return tag_icon_type
+    for model_base, icon_type in ICON_MODEL_LOOKUP:
+        if model_base in device_model:
+            return icon_type
+    return ICON_ROLE_LOOKUP.get(device_role_slug, 'network.unknown')
+
+
+def get_icon_types(nb_devices):
+    """
+    Resolve node icons for a set of devices at once.
+    Devices are expected to come with device type, role
+    and tags already loaded. Returns {device_id: icon_type}.
+    """
+    icon_types = {}
+    for nb_device in nb_devices:
+        device_role_obj = getattr(nb_device, DEVICE_ROLE_FIELD)
+        icon_types[nb_device.id] = resolve_icon_type(
+            str(nb_device.device_type.model),
+            str(device_role_obj.slug),
+            get_tag_icon_type(tag.name for tag in nb_device.tags.all()),
+        )
+    return icon_types
+
+
+def get_icon_type(device_id):
+    """
+    Node icon getter function.
+    See resolve_icon_type() for the selection order.
+    """
+    nb_device = Device.objects.select_related(
+        DEVICE_ROLE_FIELD, 'device_type',
+    ).prefetch_related('tags').filter(id=device_id).first()
     if not nb_device:
-        return 'unknown'
-    for tag in nb_device.tags.names():
-        if 'icon_' in tag:
-            if tag.replace('icon_', 'network.') in SUPPORTED_ICONS:
-                return tag.replace('icon_', 'network.')
-    for model_base, icon_type in ICON_MODEL_MAP.items():
-        if model_base in str(nb_device.device_type.model):
-            if icon_type.startswith('network.'):
-                return icon_type
-            else:
-                return f'network.{icon_type}'
-    for role_slug, icon_type in ICON_ROLE_MAP.items():
-        if str(device_role_obj.slug) == role_slug:
-            if icon_type.startswith('network.'):
-                return icon_type
-            else:
-                return f'network.{icon_type}'
-    return 'network.unknown'
+        return 'network.unknown'
+    return get_icon_types([nb_device])[nb_device.id]
 
 
 def tag_is_hidden(tag):
@@ -247,6 +319,30 @@ def filter_tags(tags):
         tags = filtered_tags
     return tags
 
+def get_termination_tags(adjacencies):
+    """
+    Return {(content type id, object id): [tag names]} of the cable terminations
+    linked by the adjacencies, loaded with one query.
+    """
+    to_fetch = defaultdict(set)
+    for adjacency in adjacencies:
+        to_fetch[adjacency.interface_a_type_id].add(adjacency.interface_a_id)
+        to_fetch[adjacency.interface_b_type_id].add(adjacency.interface_b_id)
+    termination_tags = defaultdict(list)
+    if not to_fetch:
+        return termination_tags
+    query = functools.reduce(operator.or_, (
+        Q(content_type_id=content_type_id, object_id__in=object_ids)
+        for content_type_id, object_ids in to_fetch.items()
+    ))
+    tagged_items = TaggedItem.objects.filter(query).order_by(
+        *(f'tag__{field}' for field in Tag._meta.ordering)
+    ).values_list('content_type_id', 'object_id', 'tag__name')
+    for content_type_id, object_id, tag_name in tagged_items:
+        termination_tags[(content_type_id, object_id)].append(tag_name)
+    return termination_tags
+
+
 def get_topology(nb_devices_qs, params):
     display_unconnected = params.get('display_unconnected')
     display_passive = params.get('display_passive')
@@ -254,11 +350,38 @@ def get_topology(nb_devices_qs, params):
     device_roles = set()
     all_device_tags = set()
     multi_cable_connections = []
-    if not nb_devices_qs:
+    # Load devices along with everything rendered on their nodes at once
+    nb_devices = list(nb_devices_qs.select_related(
+        DEVICE_ROLE_FIELD, 'device_type', 'primary_ip4', 'primary_ip6',
+    ).prefetch_related('tags'))
+    if not nb_devices:
         return topology_dict, device_roles, multi_cable_connections, list(all_device_tags)
+    devices_by_id = {d.id: d for d in nb_devices}
+    interface_type_id = ContentType.objects.get_for_model(Interface).pk
+    # Cable and logical links of the devices come from the adjacency table in one query
+    device_ids = list(devices_by_id)
+    adjacencies = DeviceAdjacency.objects.filter(
+        Q(device_a__in=device_ids) | Q(device_b__in=device_ids)
+    )
+    # device id -> Cable adjacencies with the device on the A/B cable end
+    links_from = defaultdict(list)
+    links_to = defaultdict(list)
+    # Devices with Interfaces terminating their Cables
+    interface_device_ids = set()
+    logical_links = []
+    for adjacency in adjacencies:
+        if adjacency.is_logical:
+            logical_links.append(adjacency)
+            continue
+        links_from[adjacency.device_a_id].append(adjacency)
+        links_to[adjacency.device_b_id].append(adjacency)
+        if adjacency.interface_a_type_id == interface_type_id:
+            interface_device_ids.add(adjacency.device_a_id)
+        if adjacency.interface_b_type_id == interface_type_id:
+            interface_device_ids.add(adjacency.device_b_id)
     links = []
-    device_ids = [d.id for d in nb_devices_qs]
-    for nb_device in nb_devices_qs:
+    icon_types = get_icon_types(nb_devices)
+    for nb_device in nb_devices:
         device_is_passive = False
         device_url = nb_device.get_absolute_url()
         primary_ip = ''
@@ -268,34 +391,17 @@ def get_topology(nb_devices_qs, params):
             device_role_obj = nb_device.device_role
         if nb_device.primary_ip:
             primary_ip = str(nb_device.primary_ip.address)
-        tags = [str(tag) for tag in nb_device.tags.names()] or []
+        tags = [tag.name for tag in nb_device.tags.all()]
         tags = filter_tags(tags)
         for tag in tags:
             all_device_tags.add((tag, not tag_is_hidden(tag)))
         # Device is considered passive if it has no linked Interfaces.
         # Passive cabling devices use Rear and Front Ports.
-        links_from_device = Cable.objects.filter(terminations__cable_end='A', terminations___device_id=nb_device.id)
-        links_to_device = Cable.objects.filter(terminations__cable_end='B', terminations___device_id=nb_device.id)
-
-        # Filter out cables with incomplete terminations
-        links_from_device = [c for c in links_from_device if (c.a_terminations and c.b_terminations)]
-        links_to_device = [c for c in links_to_device if (c.a_terminations and c.b_terminations)]
-
-        interfaces_found = False
-        if links_from_device:
-            for link in links_from_device:
-                for ab_link in link.a_terminations + link.b_terminations:
-                    if isinstance(ab_link, Interface) and ab_link.device.id == nb_device.id:
-                        interfaces_found = True
-                        break
-        if links_to_device:
-            for link in links_to_device:
-                for ab_link in link.a_terminations + link.b_terminations:
-                    if isinstance(ab_link, Interface) and ab_link.device.id == nb_device.id:
-                        interfaces_found = True
-                        break
+        links_from_device = links_from[nb_device.id]
+        links_to_device = links_to[nb_device.id]
+
         if links_to_device or links_from_device:
-            device_is_passive = not interfaces_found
+            device_is_passive = nb_device.id not in interface_device_ids
 
         if not (links_from_device or links_to_device):
             divice_is_unconnected = True
@@ -312,9 +418,7 @@ def get_topology(nb_devices_qs, params):
             'layer': get_node_layer_sort_preference(
                 device_role_obj.slug
             ),
-            'iconName': get_icon_type(
-                nb_device.id
-            ),
+            'iconName': icon_types[nb_device.id],
             'isPassive': device_is_passive,
             'isUnconnected': divice_is_unconnected,
             'tags': tags,
@@ -337,154 +441,198 @@ def get_topology(nb_devices_qs, params):
             device_roles.add((device_role_obj.slug, device_role_obj.name, is_visible))
             topology_dict['nodes'].append(node_data)
 
-        if not links_from_device:
-            continue
-        for link in links_from_device:
-            # Exclude PowerFeed-connected links
-            if (isinstance(link.a_terminations[0], PowerFeed) or (isinstance(link.b_terminations[0], PowerFeed))):
-                continue
-            # Exclude CircuitTermination-connected links
-            if (isinstance(link.a_terminations[0], CircuitTermination) or (isinstance(link.b_terminations[0], CircuitTermination))):
-                continue
-            # Include links to discovered devices only
-            if link.b_terminations[0].device_id in device_ids:
-                links.append(link)
+        # Include links to discovered devices only.
+        # PowerFeed and CircuitTermination-connected links have no device on the far end.
+        # Edges keep the order of the device, then Cable ID of their A end.
+        links.extend(link for link in links_from_device if link.device_b_id in devices_by_id)
 
     device_roles = list(device_roles)
     device_roles.sort(key=lambda i: get_node_layer_sort_preference(i[0]))
     all_device_tags = list(all_device_tags)
     all_device_tags.sort()
-    if not links:
-        return topology_dict, device_roles, multi_cable_connections, list(all_device_tags)
-    link_ids = set()
+    if not display_passive:
+        links = [
+            link for link in links
+            if link.interface_a_type_id == interface_type_id
+            and link.interface_b_type_id == interface_type_id
+        ]
+    termination_tags = get_termination_tags(links)
     for link in links:
-        interface_to_interface = isinstance(link.a_terminations[0], Interface) and isinstance(link.b_terminations[0], Interface)
-        at_least_one_interface = isinstance(link.a_terminations[0], Interface) or isinstance(link.b_terminations[0], Interface)
-        link_url = link.get_absolute_url()
-        edge_data = {
-            "label": f"Cable {link.id}",
-            "source": f"device-{link.a_terminations[0].device.id}",
-            "target": f"device-{link.b_terminations[0].device.id}",
-            "sourceInterface": link.a_terminations[0].name,
-            "sourceInterfaceLabel": {'text': if_shortname(link.a_terminations[0].name)},
-            "targetInterface": link.b_terminations[0].name,
-            "targetInterfaceLabel": {'text': if_shortname(link.b_terminations[0].name)},
+        source_device = devices_by_id[link.device_a_id]
+        target_device = devices_by_id[link.device_b_id]
+        topology_dict['edges'].append({
+            "label": f"Cable {link.cable_id}",
+            "source": f"device-{source_device.id}",
+            "target": f"device-{target_device.id}",
+            "sourceInterface": link.interface_a,
+            "sourceInterfaceLabel": {'text': if_shortname(link.interface_a)},
+            "targetInterface": link.interface_b,
+            "targetInterfaceLabel": {'text': if_shortname(link.interface_b)},
             "customAttributes": {
-                "name": f"Cable {link.id}",
-                "dcimCableURL": link_url,
-                "source": link.a_terminations[0].device.name,
-                "target": link.b_terminations[0].device.name,
-                "sourceTags": [tag.name for tag in link.a_terminations[0].tags.all()] if hasattr(link.a_terminations[0], 'tags') else [],
-                "targetTags": [tag.name for tag in link.b_terminations[0].tags.all()] if hasattr(link.b_terminations[0], 'tags') else [],
+                "name": f"Cable {link.cable_id}",
+                "dcimCableURL": reverse('dcim:cable', args=[link.cable_id]),
+                "source": source_device.name,
+                "target": target_device.name,
+                "sourceTags": termination_tags[(link.interface_a_type_id, link.interface_a_id)],
+                "targetTags": termination_tags[(link.interface_b_type_id, link.interface_b_id)],
             }
-        }
-        if display_passive:
-            link_ids.add(link.id)
-            topology_dict['edges'].append(edge_data)
-
-        if not display_passive and interface_to_interface:
-            link_ids.add(link.id)
-            topology_dict['edges'].append(edge_data)
-
-        if not at_least_one_interface:
-            # Skip trace if none of cable terminations is an Interface
-            continue
-        if display_passive:
-            # Do not calculate logical links if passive devices are displayed
-            continue
-        interface_side = None
-        if isinstance(link.a_terminations[0], Interface):
-            interface_side = link.a_terminations[0]
-        elif isinstance(link.b_terminations[0], Interface):
-            interface_side = link.b_terminations[0]
-        trace_result = interface_side.trace()
-        if not trace_result:
-            continue
-        cable_path = trace_result
-        # identify segmented cable paths between end-devices
-        if len(cable_path) < 2:
+        })
+    if display_passive:
+        # Do not render logical links if passive devices are displayed
+        return topology_dict, device_roles, multi_cable_connections, all_device_tags
+    multi_cable_connection_ids = set()
+    for link in logical_links:
+        if not (link.device_a_id in devices_by_id and link.device_b_id in devices_by_id):
             continue
-
-        side_a_interface = cable_path[0][0]
-        side_b_interface = cable_path[-1][2]
-        if not (side_a_interface and side_b_interface):
+        # Paths traced from both of their ends are rendered once
+        cable_ids = frozenset(link.path_cable_ids)
+        if cable_ids in multi_cable_connection_ids:
             continue
-        else:
-            side_a_interface = side_a_interface[0]
-            side_b_interface = side_b_interface[0]
-
-        if isinstance(side_a_interface, Interface) and isinstance(side_b_interface, Interface):
-            if set([c[1][0] for c in cable_path]) in [set([c[1][0] for c in x]) for x in multi_cable_connections]:
-                continue
-            multi_cable_connections.append(cable_path)
-    for cable_path in multi_cable_connections:
-        source_device_id = f"device-{side_a_interface.device.id}"
-        target_device_id = f"device-{side_b_interface.device.id}"
-        side_a_interface = cable_path[0][0][0]
-        side_b_interface = cable_path[-1][2][0]
+        multi_cable_connection_ids.add(cable_ids)
+        multi_cable_connections.append(link.path_cable_ids)
+        source_device = devices_by_id[link.device_a_id]
+        target_device = devices_by_id[link.device_b_id]
         topology_dict['edges'].append({
-            "source": source_device_id,
-            "target": target_device_id,
-            "sourceInterface": side_a_interface.name,
-            "sourceInterfaceLabel": {'text': if_shortname(side_a_interface.name)},
-            "targetInterface": side_b_interface.name,
-            "targetInterfaceLabel": {'text': if_shortname(side_b_interface.name)},
+            "source": f"device-{source_device.id}",
+            "target": f"device-{target_device.id}",
+            "sourceInterface": link.interface_a,
+            "sourceInterfaceLabel": {'text': if_shortname(link.interface_a)},
+            "targetInterface": link.interface_b,
+            "targetInterfaceLabel": {'text': if_shortname(link.interface_b)},
             "isLogicalMultiCable": True,
             "customAttributes": {
                 "name": f"Multi-Cable Connection",
-                "dcimCableURL": f"/dcim/interfaces/{side_a_interface.id}/trace/",
-                "source": side_a_interface.device.name,
-                "target": side_b_interface.device.name,
+                "dcimCableURL": f"/dcim/interfaces/{link.interface_a_id}/trace/",
+                "source": source_device.name,
+                "target": target_device.name,
             }
         })
     return topology_dict, device_roles, multi_cable_connections, all_device_tags
 
 
-class TopologyView(PermissionRequiredMixin, View):
-    """Generic Topology View"""
-    permission_required = ('dcim.view_site', 'dcim.view_device', 'dcim.view_cable')
-    queryset = Device.objects.all()
-    filterset = filters.TopologyFilterSet
-    template_name = 'nextbox_ui_plugin/topology_4.x.html'
-
-    def get(self, request):
+def build_cacheable_topology(nb_devices_qs, params):
+    """
+    get_topology() results without the cable IDs of multi-cable connections.
+    Topology version is a digest of the topology that changes
+    whenever its content does. It is used as the API ETag.
+    """
+    topology_dict, device_roles, multi_cable_connections, device_tags = get_topology(
+        nb_devices_qs, params
+    )
+    topology_version = hashlib.sha1(
+        json.dumps(topology_dict, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    return topology_dict, device_roles, device_tags, topology_version
+
+
+def get_topology_params(query):
+    """Resolve plugin-specific topology preferences for the filter query."""
+    saved_filter = None
+    if 'filter_id' in query and query['filter_id']:
+        filter_id = query['filter_id']
+        saved_filter = SavedFilter.objects.get(pk=filter_id)
+
+    if saved_filter:
+        # Extract only plugin-specific filters from the SavedFilter.
+        # All NetBox-native filters are handled by filtersets.
+        parameters = saved_filter.parameters
+        display_unconnected = parameters.get('display_unconnected', [DISPLAY_UNCONNECTED])[0]
+        display_passive = parameters.get('display_passive', [DISPLAY_PASSIVE_DEVICES])[0]
+    else:
+        display_unconnected = DISPLAY_UNCONNECTED
+        display_passive = DISPLAY_PASSIVE_DEVICES
 
-        clean_request = request.GET.copy()
+    if query.get('display_unconnected') is not None:
+        display_unconnected = query.get('display_unconnected')
 
-        if not clean_request:
-            self.queryset = Device.objects.none()
+    if query.get('display_passive') is not None:
+        display_passive = query.get('display_passive')
 
-        self.queryset = self.filterset(clean_request, self.queryset).qs
+    return {
+        'display_unconnected': str(display_unconnected).lower() == 'true',
+        'display_passive': str(display_passive).lower() == 'true',
+    }
 
-        saved_filter = None
-        if 'filter_id' in clean_request and clean_request['filter_id']:
-            filter_id = clean_request['filter_id']
-            saved_filter = SavedFilter.objects.get(pk=filter_id)
 
-        if saved_filter:
-            # Extract only plugin-specific filters from the SavedFilter.
-            # All NetBox-native filters are handled by filtersets.
-            display_unconnected = saved_filter.parameters.get('display_unconnected', [DISPLAY_UNCONNECTED])[0]
-            display_passive = saved_filter.parameters.get('display_passive', [DISPLAY_PASSIVE_DEVICES])[0]
-        else:
-            display_unconnected = DISPLAY_UNCONNECTED
-            display_passive = DISPLAY_PASSIVE_DEVICES
+def get_topology_queryset(queryset):
+    """Devices of the queryset loading only what get_topology() renders."""
+    return queryset.select_related(*TOPOLOGY_RELATED_FIELDS).only(*TOPOLOGY_DEVICE_FIELDS)
 
-        if clean_request.get('display_unconnected') is not None:
-            display_unconnected = clean_request.get('display_unconnected')
 
-        if clean_request.get('display_passive') is not None:
-            display_passive = clean_request.get('display_passive')
+def precompute_topology_data(query, target, filterset=filters.TopologyFilterSet):
+    """
+    Build and store the topology of a precomputed (kind, object_id) target.
+    Return (topology_dict, device_roles, device_tags, topology_version).
+    """
+    params = get_topology_params(query)
+    # Changes made while building mark the result stale
+    token = get_change_token(*target)
+    queryset = get_topology_queryset(filterset(query, Device.objects.all()).qs)
+    result = build_cacheable_topology(queryset, params)
+    topology_dict, device_roles, device_tags, topology_version = result
+    store_topology_snapshot(topology_version, topology_dict)
+    store_precomputed_topology(*target, params, token, result)
+    return result
+
+
+def get_topology_data(query, queryset=None, filterset=filters.TopologyFilterSet):
+    """
+    Return (topology_dict, device_roles, device_tags, topology_version, is_stale)
+    for Devices matching the filter query.
+    Topologies of a Site are served as precomputed by the RQ worker,
+    is_stale is set while a changed one is being rebuilt.
+    """
+    target = get_precompute_target(query) if queryset is None else None
+    if target is not None:
+        schedule_topology_precompute()
+        params = get_topology_params(query)
+        precomputed = get_precomputed_topology(*target, params)
+        if precomputed is not None:
+            result, is_stale = precomputed
+            if is_stale:
+                enqueue_topology_precompute(*target)
+            return (*result, is_stale)
+        if params == get_topology_params(get_precompute_query(*target)):
+            # Not precomputed yet, built here once for both
+            return (*precompute_topology_data(query, target, filterset), False)
+
+    if queryset is None:
+        queryset = Device.objects.all()
+
+    if not query:
+        queryset = Device.objects.none()
+
+    queryset = get_topology_queryset(filterset(query, queryset).qs)
+    params = get_topology_params(query)
+
+    def build_topology():
+        result = build_cacheable_topology(queryset, params)
+        topology_dict, device_roles, device_tags, topology_version = result
+        store_topology_snapshot(topology_version, topology_dict)
+        return result
+
+    return (*get_cached_topology(query, params, build_topology), False)
 
-        params = {
-            'display_unconnected': str(display_unconnected).lower() == 'true',
-            'display_passive': str(display_passive).lower() == 'true',
-        }
 
-        topology_dict, device_roles, multi_cable_connections, device_tags = get_topology(self.queryset, params)
+class TopologyView(PermissionRequiredMixin, View):
+    """
+    Generic Topology View.
+    The page is rendered without topology data.
+    It is fetched asynchronously from the topology API endpoint.
+    """
+    permission_required = ('dcim.view_site', 'dcim.view_device', 'dcim.view_cable')
+    queryset = Device.objects.all()
+    filterset = filters.TopologyFilterSet
+    template_name = 'nextbox_ui_plugin/topology_4.x.html'
 
+    def get(self, request):
         return render(request, self.template_name, {
-            'source_data': json.dumps(topology_dict),
+            'topology_data_url': reverse('plugins-api:nextbox_ui_plugin-api:topology'),
+            'topology_changes_url': reverse('plugins-api:nextbox_ui_plugin-api:topology_changes'),
+            'topology_layout_url': reverse('plugins-api:nextbox_ui_plugin-api:topology_layout'),
+            'topology_layout_precompute_min_nodes': get_layout_precompute_min_nodes(),
+            'topology_changes_interval': PLUGIN_SETTINGS.get('topology_changes_interval', 60),
+            'topology_query': request.GET.urlencode(),
             'initial_layout': INITIAL_LAYOUT,
             'filter_form': forms.TopologyFilterForm(
                 request.GET,
@@ -495,6 +643,7 @@ class TopologyView(PermissionRequiredMixin, View):
             'dynamic_update_enable': PLUGIN_SETTINGS.get('dynamic_update_enable', False),
             'dynamic_update_interval': PLUGIN_SETTINGS.get('dynamic_update_interval', 5),
             'nb_endpoints_url': PLUGIN_SETTINGS.get('nb_endpoints_url', ""),
+            'nb_endpoints_stream_url': PLUGIN_SETTINGS.get('nb_endpoints_stream_url', ""),
             'alerts_device_base_url': PLUGIN_SETTINGS.get('alerts_device_base_url'),
             'interface_bw_base_url': PLUGIN_SETTINGS.get('interface_bw_base_url'),
         })
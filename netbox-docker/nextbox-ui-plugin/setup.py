@@ -16,6 +16,10 @@ setup(
     author='Igor Korotchenkov',
     author_email='iDebugAll@gmail.com',
     install_requires=[],
+    extras_require={
+        # Server-side topology layouts
+        'layout': ['numpy'],
+    },
     packages=find_packages(),
     license='MIT',
     license_files=('LICENSE', 'LICENSE-topoSphere'),
@@ -0,0 +1,112 @@
+import gzip
+import json
+import threading
+from service_core.rates import parse_rate
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Compact JSON: keys are interned into a string table and referenced by index,
+# rates like "3.5 Mbit/s" are sent as numbers of bit/s:
+#   {"strings": ["core_sw_1", "g0/3", "in", "out"],
+#    "data": {"0": {"1": {"2": 3500000, "3": 19500000}}}}
+COMPACT_CONTENT_TYPE = "application/vnd.nextbox.compact+json"
+
+# Smaller responses are not compressed
+MIN_COMPRESS_SIZE = 1024
+# Compressed copies of responses at least this large are kept while the
+# response is being served again (e.g. a whole document between updates)
+COMPRESS_CACHE_MIN_SIZE = 64 * 1024
+COMPRESS_CACHE_SIZE = 16
+
+_compress_cache = {}
+_compress_cache_lock = threading.Lock()
+
+
+def parse_header_values(header):
+    """Values of an Accept-like header ordered by their quality, excluding q=0."""
+    values = []
+    for i, item in enumerate((header or "").split(",")):
+        value, *params = [p.strip() for p in item.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, q = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            values.append((-quality, i, value.lower()))
+    return [value for _, _, value in sorted(values)]
+
+
+def accepts_compact(accept):
+    return COMPACT_CONTENT_TYPE in parse_header_values(accept)
+
+
+def negotiate_encoding(accept_encoding):
+    """Preferred supported content encoding of the client, None for identity."""
+    for encoding in parse_header_values(accept_encoding):
+        if encoding == "br" and brotli is not None:
+            return encoding
+        if encoding in ("gzip", "*"):
+            return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if len(body) < COMPRESS_CACHE_MIN_SIZE:
+        return _compress(body, encoding)
+    key = (id(body), encoding)
+    cached = _compress_cache.get(key)
+    # The cached body is kept referenced, so its id can't be reused by another object
+    if cached is not None and cached[0] is body:
+        return cached[1]
+    compressed = _compress(body, encoding)
+    with _compress_cache_lock:
+        if len(_compress_cache) >= COMPRESS_CACHE_SIZE:
+            _compress_cache.clear()
+        _compress_cache[key] = (body, compressed)
+    return compressed
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=5)
+
+
+def compact_encode(data):
+    """
+    Encode a JSON document as compact JSON bytes.
+    The endpoints plugin re-encodes the service documents with its own copy
+    (endpoints_plugin/encoding.py), kept in line with this one by test_encoding.
+    """
+    strings, index = [], {}
+
+    def encode(value):
+        if isinstance(value, dict):
+            encoded = {}
+            for key, item in value.items():
+                if key not in index:
+                    index[key] = len(strings)
+                    strings.append(key)
+                encoded[str(index[key])] = encode(item)
+            return encoded
+        if isinstance(value, list):
+            return [encode(item) for item in value]
+        if isinstance(value, str):
+            bps = parse_rate(value)
+            if bps is None:
+                return value
+            return int(bps) if bps.is_integer() else bps
+        return value
+
+    encoded = encode(data)
+    return json.dumps({"strings": strings, "data": encoded}, separators=(",", ":")).encode("utf-8")
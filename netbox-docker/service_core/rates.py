@@ -0,0 +1,30 @@
+COUNTER_MAX = 2 ** 64
+RATE_UNITS = ("bit/s", "kbit/s", "Mbit/s", "Gbit/s", "Tbit/s")
+
+
+def format_rate(bps):
+    """Format bits per second as e.g. '3.5 Mbit/s'."""
+    value = float(bps)
+    for unit in RATE_UNITS[:-1]:
+        if abs(value) < 1000:
+            break
+        value /= 1000
+    else:
+        unit = RATE_UNITS[-1]
+    return f"{round(value, 1):g} {unit}"
+
+
+def counter_delta(new, old):
+    """Difference of two 64-bit counter values, handling a single wrap."""
+    return new - old if new >= old else new + COUNTER_MAX - old
+
+
+def parse_rate(rate):
+    """Bits per second of a rate formatted like '3.5 Mbit/s', None if it isn't a rate."""
+    value, _, unit = rate.partition(" ")
+    if unit not in RATE_UNITS:
+        return None
+    try:
+        return float(value) * 1000 ** RATE_UNITS.index(unit)
+    except ValueError:
+        return None
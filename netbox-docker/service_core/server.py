@@ -0,0 +1,350 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+from service_core.encoding import (
+    COMPACT_CONTENT_TYPE, MIN_COMPRESS_SIZE, accepts_compact, compact_encode, compress,
+    negotiate_encoding,
+)
+
+
+# Number of connections served concurrently
+WORKERS = int(os.environ.get("SERVICE_WORKERS", 16))
+
+# Idle keep-alive connections are closed after this many seconds,
+# releasing the worker serving them
+KEEPALIVE_TIMEOUT = int(os.environ.get("SERVICE_KEEPALIVE_TIMEOUT", 15))
+# Idle connections check for connections waiting for a worker with this interval (seconds)
+IDLE_CHECK_INTERVAL = 0.5
+
+# Max size of POST request bodies (bytes)
+MAX_BODY_SIZE = int(os.environ.get("SERVICE_MAX_BODY_SIZE", 64 * 1024 * 1024))
+
+ERROR_RESPONSE = json.dumps({"error": "Internal Server Error"}).encode("utf-8")
+
+
+class EncodedDocument:
+    """
+    {key: value} JSON document with every value encoded once.
+    Responses for the whole document or a subset of its keys
+    are assembled from the encoded fragments without serializing.
+    Output is the same as of json.dumps().
+    Values are kept as well to render the compact encoding.
+
+    Writers replace the fragments dict instead of changing it in place,
+    so threads serving the document never see it partially updated.
+    """
+
+    def __init__(self, data=None):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._fragments = {}
+        self._body = None
+        self._compact = None
+        self.update(data or {})
+
+    @staticmethod
+    def encode(key, value):
+        return f"{json.dumps(key)}: {json.dumps(value)}".encode("utf-8")
+
+    def update(self, data):
+        """Replace the document content."""
+        fragments = {key: self.encode(key, value) for key, value in data.items()}
+        with self._lock:
+            self._values, self._fragments = dict(data), fragments
+            self._body = self._compact = None
+
+    def set_many(self, data):
+        """Add or replace entries, only the given values are encoded."""
+        if not data:
+            return
+        encoded = {key: self.encode(key, value) for key, value in data.items()}
+        with self._lock:
+            values, fragments = dict(self._values), dict(self._fragments)
+            values.update(data)
+            fragments.update(encoded)
+            self._values, self._fragments = values, fragments
+            self._body = self._compact = None
+
+    def remove_many(self, keys):
+        keys = set(keys)
+        with self._lock:
+            self._values = {key: v for key, v in self._values.items() if key not in keys}
+            self._fragments = {key: f for key, f in self._fragments.items() if key not in keys}
+            self._body = self._compact = None
+
+    def __contains__(self, key):
+        return key in self._fragments
+
+    def __len__(self):
+        return len(self._fragments)
+
+    @staticmethod
+    def join(fragments):
+        return b"{" + b", ".join(fragments) + b"}"
+
+    def render(self, keys=None):
+        """Encoded document, limited to the given keys if any."""
+        if keys is None:
+            body = self._body
+            if body is None:
+                # Whole document is joined once per update
+                with self._lock:
+                    if self._body is None:
+                        self._body = self.join(self._fragments.values())
+                    body = self._body
+            return body
+        fragments = self._fragments
+        return self.join(fragments[key] for key in dict.fromkeys(keys) if key in fragments)
+
+    def render_compact(self, keys=None):
+        """Compact encoding of the document, limited to the given keys if any."""
+        if keys is None:
+            compact = self._compact
+            if compact is None:
+                with self._lock:
+                    if self._compact is None:
+                        self._compact = compact_encode(self._values)
+                    compact = self._compact
+            return compact
+        values = self._values
+        return compact_encode({key: values[key] for key in dict.fromkeys(keys) if key in values})
+
+
+def get_device_filter(query_components):
+    """Device names of the 'device=a,b' parameter, None if not filtered."""
+    device_filter = query_components.get("device", [])
+    if not device_filter:
+        return None
+    return [d for d in device_filter[0].split(",") if d]
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    Base request handler of the telemetry services.
+    Connections are kept alive between requests (HTTP/1.1),
+    so every response must have a Content-Length.
+    Reads and writes of every connection time out after KEEPALIVE_TIMEOUT.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Socket timeout of every connection, set by StreamRequestHandler.setup()
+    timeout = KEEPALIVE_TIMEOUT
+
+    def handle(self):
+        """
+        Serve requests of the connection until it's closed. Idle keep-alive
+        connections are closed after KEEPALIVE_TIMEOUT, or as soon as other
+        connections wait for a worker, so idle clients can't hold the pool.
+        """
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.wait_for_request():
+            self.handle_one_request()
+
+    def wait_for_request(self):
+        """Wait for the next request of the connection, False if it should be closed instead."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self.server.has_queued_connections():
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select(
+                [self.connection], [], [], min(remaining, IDLE_CHECK_INTERVAL)
+            )
+            if readable:
+                return True
+
+    def do_GET(self):
+        try:
+            url = urlparse(self.path)
+
+            # Health check endpoint
+            if url.path == "/health":
+                self.send_body(b"OK", content_type="text/plain")
+                return
+
+            self.handle_get(url.path, parse_qs(url.query))
+
+            logging.info(f"Responded to request: {self.path}")
+
+        except Exception as e:
+            logging.error(f"Error handling request: {e}")
+            self.send_body(ERROR_RESPONSE, status=500)
+
+    def do_POST(self):
+        try:
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_SIZE:
+                self.close_connection = True
+                self.send_json({"error": "Request body is too large"}, status=413)
+                return
+
+            self.handle_post(url.path, parse_qs(url.query), self.rfile.read(length))
+
+            logging.info(f"Responded to request: POST {self.path}")
+
+        except ValueError as e:
+            # Malformed request body
+            self.send_json({"error": str(e)}, status=400)
+        except Exception as e:
+            logging.error(f"Error handling request: {e}")
+            self.send_body(ERROR_RESPONSE, status=500)
+
+    def handle_get(self, path, query_components):
+        self.send_json({"error": "Not Found"}, status=404)
+
+    def handle_post(self, path, query_components, body):
+        self.send_json({"error": "Method Not Allowed"}, status=405)
+
+    def wants_compact(self):
+        return accepts_compact(self.headers.get("Accept"))
+
+    def send_json(self, data, status=200, headers=None):
+        if status < 400 and self.wants_compact():
+            self.send_body(
+                compact_encode(data), status=status, content_type=COMPACT_CONTENT_TYPE,
+                headers=headers,
+            )
+            return
+        self.send_body(json.dumps(data).encode("utf-8"), status=status, headers=headers)
+
+    def send_document(self, document, keys=None, headers=None):
+        """Send an EncodedDocument as JSON or in the compact encoding if accepted."""
+        if self.wants_compact():
+            self.send_body(
+                document.render_compact(keys), content_type=COMPACT_CONTENT_TYPE, headers=headers
+            )
+            return
+        self.send_body(document.render(keys), headers=headers)
+
+    def send_body(self, body, status=200, content_type="application/json", headers=None):
+        """Send the body, compressed with gzip or brotli if accepted by the client."""
+        encoding = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"))
+            if encoding:
+                body = compress(body, encoding)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if content_type != "text/plain":
+            self.send_header("Vary", "Accept, Accept-Encoding")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Disable default access logs (useful for clean Docker logs)."""
+        return
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """
+    HTTP server handling connections in a fixed pool of worker threads.
+    Connections beyond the pool size wait in the queue for a free worker.
+    """
+
+    def __init__(self, server_address, handler_class, workers=WORKERS):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="worker")
+        # Listen backlog, set before the server is activated
+        self.request_queue_size = max(self.request_queue_size, workers * 4)
+        # Accepted connections waiting for a worker
+        self._queued = 0
+        self._queued_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+
+    def has_queued_connections(self):
+        return self._queued > 0
+
+    def process_request(self, request, client_address):
+        with self._queued_lock:
+            self._queued += 1
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        with self._queued_lock:
+            self._queued -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+def watch_file(path, callback, interval=5):
+    """
+    Call callback(path) in a background thread now and
+    whenever the file changes, checking it every interval seconds.
+    """
+    def watch():
+        last_stat = None
+        while True:
+            try:
+                stat = os.stat(path)
+                if (stat.st_mtime_ns, stat.st_size) != last_stat:
+                    last_stat = (stat.st_mtime_ns, stat.st_size)
+                    callback(path)
+            except FileNotFoundError:
+                last_stat = None
+            except Exception as e:
+                logging.error(f"Error loading {path}: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=watch, name="file_watcher", daemon=True).start()
+
+
+def tail_file(path, callback, interval=1):
+    """
+    Call callback(lines) in a background thread with lines appended to the file,
+    checking it every interval seconds. The file is read from the start
+    when it's created, truncated or replaced (e.g. rotated).
+    """
+    def tail():
+        f, inode, buffer = None, None, ""
+        while True:
+            try:
+                stat = os.stat(path)
+                if f is None or stat.st_ino != inode or stat.st_size < f.tell():
+                    if f is not None:
+                        f.close()
+                    f, inode, buffer = open(path), stat.st_ino, ""
+                data = buffer + f.read()
+                lines = data.split("\n")
+                # Keep a partially written last line for the next check
+                buffer = lines.pop()
+                if lines:
+                    callback(lines)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.error(f"Error reading {path}: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=tail, name="file_tail", daemon=True).start()
+
+
+def run_server(handler_class, host="0.0.0.0", port=8000, workers=WORKERS):
+    server = ThreadPoolHTTPServer((host, port), handler_class, workers=workers)
+    logging.info(f"Starting server on {host}:{port} with {workers} workers")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,55 @@
+import importlib.util
+import json
+import os
+import unittest
+from service_core.encoding import compact_encode, negotiate_encoding
+from service_core.rates import format_rate, parse_rate
+
+# Copy of the encoder shipped with the endpoints plugin, loaded without the plugin package
+PLUGIN_ENCODING = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "endpoints-plugin", "endpoints_plugin", "encoding.py",
+)
+
+DATA = {
+    "bw": {"r1": {"g0/1": {"in": "3.5 Mbit/s", "out": "1 Gbit/s"}}},
+    "alerts": {"r1": {"status": "error", "interfaces": {}}},
+    "history": [{"in": "2 kbit/s"}, "n/a", "0.5 bit/s", "fast Mbit/s"],
+}
+
+
+class EncodingTest(unittest.TestCase):
+
+    def test_compact_encode(self):
+        self.assertEqual(json.loads(compact_encode(DATA)), {
+            "strings": [
+                "bw", "r1", "g0/1", "in", "out", "alerts", "status", "interfaces", "history",
+            ],
+            "data": {
+                "0": {"1": {"2": {"3": 3500000, "4": 1000000000}}},
+                "5": {"1": {"6": "error", "7": {}}},
+                "8": [{"3": 2000}, "n/a", 0.5, "fast Mbit/s"],
+            },
+        })
+
+    @unittest.skipUnless(os.path.exists(PLUGIN_ENCODING), "endpoints plugin is not available")
+    def test_endpoints_plugin_encoder(self):
+        spec = importlib.util.spec_from_file_location("endpoints_plugin_encoding", PLUGIN_ENCODING)
+        plugin_encoding = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(plugin_encoding)
+        self.assertEqual(plugin_encoding.compact_encode(DATA), compact_encode(DATA))
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate(format_rate(3500000)), 3500000)
+        self.assertEqual(parse_rate("0.5 bit/s"), 0.5)
+        self.assertIsNone(parse_rate("3.5 Mbit"))
+        self.assertIsNone(parse_rate("fast Mbit/s"))
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding("gzip;q=0.5, identity"), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0"))
+        self.assertIsNone(negotiate_encoding(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import http.client
+import threading
+import time
+import unittest
+from service_core.server import ServiceRequestHandler, ThreadPoolHTTPServer
+
+
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadPoolHTTPServer(("127.0.0.1", 0), ServiceRequestHandler, workers=1)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, path):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        return connection, response
+
+    def test_health(self):
+        connection, response = self.request("/health")
+        self.assertEqual(response.status, 200)
+        connection.close()
+
+    def test_unknown_path_is_not_found(self):
+        connection, response = self.request("/data")
+        self.assertEqual(response.status, 404)
+        connection.close()
+
+    def test_idle_connection_releases_worker(self):
+        # The only worker serves the idle keep-alive connection
+        idle_connection, _ = self.request("/health")
+        started = time.monotonic()
+        connection, response = self.request("/health")
+        self.assertEqual(response.status, 200)
+        # Served well before the keep-alive timeout of the idle connection
+        self.assertLess(time.monotonic() - started, 3)
+        connection.close()
+        idle_connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()